@@ -2,7 +2,7 @@
 Knowledge Base Ingestion Script
 
 This script loads all knowledge base content (formulas, examples, templates)
-into the ChromaDB vector store. Run this script:
+into the vector store (FAISS or ChromaDB). Run this script:
 - Once during initial setup
 - Whenever you update the knowledge base content
 
@@ -11,6 +11,12 @@ Usage:
     
     # To force re-ingestion (clear existing data):
     python ingest_knowledge.py --force
+
+    # To apply only what changed since the last run (upsert/delete chunks):
+    python ingest_knowledge.py --incremental
+
+    # To parse and embed on several CPU processes:
+    python ingest_knowledge.py --force --workers 4
 """
 
 import sys
@@ -33,17 +39,31 @@ def main():
         action="store_true",
         help="Force re-ingestion by clearing existing collection"
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-index files changed since the last ingestion"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for parsing and embedding (default: 1)"
+    )
     args = parser.parse_args()
     
+    if args.force and args.incremental:
+        parser.error("--force and --incremental are mutually exclusive")
+    
     logger.info("=" * 60)
     logger.info("KNOWLEDGE BASE INGESTION")
     logger.info("=" * 60)
     
     # Check if collection already exists and has documents
-    vs = VectorStore()
-    collection_count = vs.collection.count()
+    vs = VectorStore(background_bm25=False)
+    collection_count = vs.count()
     
-    if collection_count > 0 and not args.force:
+    if collection_count > 0 and not (args.force or args.incremental):
         logger.warning(f"Collection already contains {collection_count} documents")
         logger.warning("Use --force flag to re-ingest and overwrite existing data")
         
@@ -55,20 +75,15 @@ def main():
     # Clear existing data if force flag is set
     if args.force and collection_count > 0:
         logger.info(f"Clearing existing collection ({collection_count} documents)...")
-        # Delete and recreate collection
-        vs.client.delete_collection("math_knowledge")
-        vs.collection = vs.client.create_collection(
-            name="math_knowledge",
-            metadata={"hnsw:space": "cosine"}
-        )
+        vs.reset()
         logger.info("Collection cleared")
     
     # Build knowledge base
     logger.info("Starting knowledge base ingestion...")
-    build_knowledge_base()
+    build_knowledge_base(incremental=args.incremental, workers=args.workers)
     
     # Verify
-    final_count = vs.collection.count()
+    final_count = vs.count()
     logger.info("=" * 60)
     logger.info(f"INGESTION COMPLETE: {final_count} documents indexed")
     logger.info("=" * 60)
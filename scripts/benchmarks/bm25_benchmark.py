@@ -0,0 +1,154 @@
+"""
+BM25 Benchmark
+
+Compares the CSR inverted-index BM25Retriever with a full-scan baseline
+(rank_bm25's BM25Okapi, the implementation the retriever replaced) on
+synthetic corpora with a Zipfian vocabulary.
+
+Usage:
+    python scripts/benchmarks/bm25_benchmark.py
+
+    # Custom corpus sizes, skipping the (slow) baseline above 100k chunks:
+    python scripts/benchmarks/bm25_benchmark.py --sizes 1000 100000 1000000 --baseline-max 100000
+
+    # Save results as JSON:
+    python scripts/benchmarks/bm25_benchmark.py --output data/bm25_benchmark.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.rag.bm25_retriever import BM25Retriever
+
+
+def make_corpus(size: int, vocab_size: int, doc_len: int, rng: np.random.Generator):
+    """Synthetic chunks whose term frequencies follow a Zipf distribution."""
+    ranks = np.arange(1, vocab_size + 1)
+    probs = 1.0 / ranks
+    probs /= probs.sum()
+
+    lengths = rng.poisson(doc_len, size).clip(min=1)
+    term_ids = rng.choice(vocab_size, size=int(lengths.sum()), p=probs)
+
+    texts, offset = [], 0
+    for length in lengths:
+        texts.append(" ".join(f"t{t}" for t in term_ids[offset:offset + length]))
+        offset += length
+
+    return texts, probs
+
+
+def make_queries(count: int, probs: np.ndarray, rng: np.random.Generator):
+    """Queries of 2-4 terms drawn from the same distribution as the corpus."""
+    return [
+        " ".join(f"t{t}" for t in rng.choice(len(probs), size=rng.integers(2, 5), p=probs))
+        for _ in range(count)
+    ]
+
+
+def time_queries(search, queries):
+    """Per-query latency in milliseconds."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def summarize(build_seconds: float, latencies: np.ndarray) -> dict:
+    return {
+        'build_s': round(build_seconds, 2),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'qps': round(1000 * len(latencies) / float(latencies.sum()), 1)
+    }
+
+
+def bench_csr(texts, queries, top_k):
+    documents = [{'id': f"c{i}", 'text': text, 'metadata': {}} for i, text in enumerate(texts)]
+
+    start = time.perf_counter()
+    retriever = BM25Retriever(documents)
+    build = time.perf_counter() - start
+
+    return summarize(build, time_queries(lambda q: retriever.search(q, top_k), queries))
+
+
+def bench_full_scan(texts, queries, top_k):
+    from rank_bm25 import BM25Okapi
+
+    # Same tokenizer as the retriever, so both rank identical token streams
+    tokenize = BM25Retriever([])._tokenize
+
+    start = time.perf_counter()
+    bm25 = BM25Okapi([tokenize(text) for text in texts])
+    build = time.perf_counter() - start
+
+    def search(query):
+        scores = bm25.get_scores(tokenize(query))
+        return np.argsort(scores)[::-1][:top_k]
+
+    return summarize(build, time_queries(search, queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25 retrieval")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000],
+                        help="Corpus sizes (chunks)")
+    parser.add_argument('--queries', type=int, default=50, help="Queries per size")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--vocab', type=int, default=50000, help="Vocabulary size")
+    parser.add_argument('--doc-len', type=int, default=40, help="Mean tokens per chunk")
+    parser.add_argument('--baseline-max', type=int, default=None,
+                        help="Skip the full-scan baseline above this corpus size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None, help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    # Per-query log lines would dominate the latencies being measured
+    logger.disable("src")
+
+    try:
+        import rank_bm25  # noqa: F401
+        have_baseline = True
+    except ImportError:
+        print("rank_bm25 not installed: reporting the CSR retriever only")
+        have_baseline = False
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+
+    print(f"{'chunks':>9}  {'impl':<9} {'build s':>8} {'p50 ms':>9} {'p95 ms':>9} {'qps':>9}")
+
+    for size in args.sizes:
+        texts, probs = make_corpus(size, args.vocab, args.doc_len, rng)
+        queries = make_queries(args.queries, probs, rng)
+
+        runs = [('csr', bench_csr)]
+        if have_baseline and (args.baseline_max is None or size <= args.baseline_max):
+            runs.append(('full-scan', bench_full_scan))
+
+        for name, bench in runs:
+            row = {'chunks': size, 'impl': name, **bench(texts, queries, args.top_k)}
+            results.append(row)
+            print(f"{size:>9}  {name:<9} {row['build_s']:>8} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['qps']:>9}")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
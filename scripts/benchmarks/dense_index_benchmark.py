@@ -0,0 +1,128 @@
+"""
+Dense Index Benchmark
+
+Compares query latency of the exact in-memory ExactDenseIndex with the
+persistent ANN backends (ChromaDB, and FAISS when installed) on random
+normalized embeddings, and reports each backend's recall@k against the
+exact results.
+
+Usage:
+    python scripts/benchmarks/dense_index_benchmark.py
+
+    # Custom corpus sizes and query count:
+    python scripts/benchmarks/dense_index_benchmark.py --sizes 500 5000 50000 --queries 200
+
+    # Save results as JSON:
+    python scripts/benchmarks/dense_index_benchmark.py --output data/dense_index_benchmark.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.rag.dense_index import ExactDenseIndex
+from src.rag.backends.chroma_backend import ChromaBackend
+
+
+def make_vectors(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load(index, vectors: np.ndarray, batch_size: int = 5000):
+    """Add vectors in batches (Chroma limits the batch size)."""
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        ids = [f"c{i}" for i in range(start, start + len(batch))]
+        index.add(ids, batch, [""] * len(batch), [{"type": "formula"}] * len(batch))
+    if hasattr(index, 'persist'):
+        index.persist()
+
+
+def run_queries(index, queries: np.ndarray, top_k: int):
+    """Per-query latency (ms) and result IDs."""
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.query(query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([hit['id'] for hit in hits])
+    return np.array(latencies), results
+
+
+def recall(results, truth) -> float:
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exact vs ANN dense search")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 20000, 50000],
+                        help="Corpus sizes (chunks)")
+    parser.add_argument('--queries', type=int, default=200, help="Queries per size")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--dim', type=int, default=384, help="Embedding dimension")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None, help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    # Per-call log lines would dominate the latencies being measured
+    logger.disable("src")
+
+    try:
+        from src.rag.backends.faiss_backend import FaissBackend
+    except ImportError:
+        print("faiss not installed: skipping the FAISS backend")
+        FaissBackend = None
+
+    rng = np.random.default_rng(args.seed)
+    rows = []
+
+    print(f"{'chunks':>8}  {'index':<14} {'p50 ms':>8} {'p99 ms':>8} {'recall':>7}")
+
+    for size in args.sizes:
+        vectors = make_vectors(size, args.dim, rng)
+        queries = make_vectors(args.queries, args.dim, rng)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            indexes = [('exact', ExactDenseIndex()), ('chroma', ChromaBackend(tmp, f"bench_{size}"))]
+            if FaissBackend is not None:
+                indexes += [
+                    (f"faiss-{index_type.lower()}", FaissBackend(Path(tmp) / index_type, "bench", index_type=index_type))
+                    for index_type in ("IVFFlat", "HNSW")
+                ]
+
+            truth = None
+            for name, index in indexes:
+                load(index, vectors)
+                latencies, results = run_queries(index, queries, args.top_k)
+                if truth is None:
+                    truth = results
+
+                row = {
+                    'chunks': size,
+                    'index': name,
+                    'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+                    'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+                    'recall': round(recall(results, truth), 3)
+                }
+                rows.append(row)
+                print(f"{size:>8}  {name:<14} {row['p50_ms']:>8} {row['p99_ms']:>8} {row['recall']:>7}")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(rows, indent=2))
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Embedding Backend Benchmark
+
+Compares CPU throughput of the embedding backends (PyTorch, ONNX Runtime,
+and ONNX Runtime with int8 dynamic quantization) on the knowledge base
+chunks, and reports each backend's cosine agreement with PyTorch.
+
+Backends that cannot be loaded (e.g. Optimum / ONNX Runtime not
+installed) are reported and skipped.
+
+Usage:
+    python scripts/benchmarks/embedding_benchmark.py
+
+    # Selected backends and batch sizes:
+    python scripts/benchmarks/embedding_benchmark.py --backends torch onnx-int8 --batch-sizes 1 32
+
+    # Save results as JSON:
+    python scripts/benchmarks/embedding_benchmark.py --output data/embedding_benchmark.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.rag.embeddings import EMBEDDING_BACKENDS, load_sentence_transformer
+from src.rag.knowledge_builder import iter_knowledge_files
+from src.utils.config import config
+
+
+def load_texts(limit: int) -> list:
+    """Knowledge base chunk texts (the real ingestion workload)."""
+    texts = []
+    for path, loader in iter_knowledge_files(Path(config.KNOWLEDGE_BASE_PATH)):
+        texts.extend(chunk['text'] for chunk in loader(path))
+    return texts[:limit]
+
+
+def encode(model, texts: list, batch_size: int) -> np.ndarray:
+    return np.asarray(model.encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    ), dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends on the CPU")
+    parser.add_argument('--backends', nargs='+', default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument('--model', type=str, default=config.EMBEDDING_MODEL)
+    parser.add_argument('--texts', type=int, default=512, help="Knowledge base chunks to encode")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32])
+    parser.add_argument('--queries', type=int, default=100, help="Single-text calls timed for latency")
+    parser.add_argument('--output', type=str, default=None, help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    logger.disable("src")
+
+    texts = load_texts(args.texts)
+    print(f"Model: {args.model}, {len(texts)} knowledge base chunks")
+    print(f"{'backend':<10} {'batch':>6} {'texts/s':>9} {'p50 ms':>8} {'min cos':>8} {'mean cos':>9}")
+
+    rows = []
+    reference = None
+
+    for name in args.backends:
+        model, loaded = load_sentence_transformer(args.model, name)
+        if loaded != name:
+            print(f"{name:<10} unavailable (loaded {loaded})")
+            continue
+
+        # Warm-up: first calls include graph / kernel initialization
+        encode(model, texts[:8], 8)
+
+        embeddings = encode(model, texts, max(args.batch_sizes))
+        if reference is None and name == 'torch':
+            reference = embeddings
+        cosines = np.einsum('ij,ij->i', embeddings, reference) if reference is not None else None
+
+        latencies = []
+        for text in texts[:args.queries]:
+            start = time.perf_counter()
+            encode(model, [text], 1)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            encode(model, texts, batch_size)
+            throughput = len(texts) / (time.perf_counter() - start)
+
+            row = {
+                'backend': name,
+                'batch_size': batch_size,
+                'texts_per_s': round(throughput, 1),
+                'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+                'min_cosine': round(float(cosines.min()), 4) if cosines is not None else None,
+                'mean_cosine': round(float(cosines.mean()), 4) if cosines is not None else None
+            }
+            rows.append(row)
+            print(
+                f"{name:<10} {batch_size:>6} {row['texts_per_s']:>9} {row['p50_ms']:>8} "
+                f"{row['min_cosine'] if cosines is not None else '-':>8} {row['mean_cosine'] if cosines is not None else '-':>9}"
+            )
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(rows, indent=2))
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
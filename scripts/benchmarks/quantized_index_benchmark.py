@@ -0,0 +1,134 @@
+"""
+Quantized Index Benchmark
+
+Compares the quantized backend (int8 and binary codes with float32
+rescoring) against exact float32 search on clustered normalized
+embeddings, reporting the memory held in RAM, query latency and
+recall@k against the float results.
+
+Usage:
+    python scripts/benchmarks/quantized_index_benchmark.py
+
+    # Custom corpus sizes and rescore factors:
+    python scripts/benchmarks/quantized_index_benchmark.py --sizes 10000 100000 --rescore 4 10 20
+
+    # Save results as JSON:
+    python scripts/benchmarks/quantized_index_benchmark.py --output data/quantized_index_benchmark.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.rag.dense_index import ExactDenseIndex
+from src.rag.backends.quantized_backend import QuantizedBackend
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_corpus(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Embeddings grouped around topic centroids, like sentence embeddings of a KB."""
+    centroids = normalize(rng.normal(size=(clusters, dim)))
+    labels = rng.integers(0, clusters, size=n)
+    return normalize(centroids[labels] + 0.08 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def load(index, vectors: np.ndarray, batch_size: int = 5000):
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        ids = [f"c{i}" for i in range(start, start + len(batch))]
+        index.add(ids, batch, [""] * len(batch), [{}] * len(batch))
+    if hasattr(index, 'persist'):
+        index.persist()
+
+
+def run_queries(index, queries: np.ndarray, top_k: int):
+    """Per-query latency (ms) and result IDs."""
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.query(query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([hit['id'] for hit in hits])
+    return np.array(latencies), results
+
+
+def recall(results, truth) -> float:
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized vs float32 dense search")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help="Corpus sizes (vectors)")
+    parser.add_argument('--queries', type=int, default=200, help="Queries per size")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--dim', type=int, default=384, help="Embedding dimension")
+    parser.add_argument('--clusters', type=int, default=200, help="Topic clusters in the synthetic corpus")
+    parser.add_argument('--rescore', type=int, nargs='+', default=[4, 10], help="Rescore factors to test")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None, help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    # Per-call log lines would dominate the latencies being measured
+    logger.disable("src")
+
+    rng = np.random.default_rng(args.seed)
+    rows = []
+
+    print(f"{'vectors':>8}  {'index':<16} {'RAM MB':>8} {'p50 ms':>8} {'p99 ms':>8} {'recall':>7}")
+
+    for size in args.sizes:
+        vectors = make_corpus(size, args.dim, args.clusters, rng)
+        # Queries are perturbed corpus vectors: realistic near neighbours exist
+        picks = rng.integers(0, size, size=args.queries)
+        queries = normalize(vectors[picks] + 0.05 * rng.normal(size=(args.queries, args.dim))).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = ExactDenseIndex()
+            load(baseline, vectors)
+            indexes = [('float32', baseline, vectors.nbytes)]
+
+            for mode in ("int8", "binary"):
+                for factor in args.rescore:
+                    backend = QuantizedBackend(Path(tmp) / f"{mode}_{factor}", "bench", mode=mode, rescore_factor=factor)
+                    load(backend, vectors)
+                    indexes.append((f"{mode}-x{factor}", backend, backend.memory_bytes()))
+
+            truth = None
+            for name, index, ram in indexes:
+                latencies, results = run_queries(index, queries, args.top_k)
+                if truth is None:
+                    truth = results
+
+                row = {
+                    'vectors': size,
+                    'index': name,
+                    'ram_mb': round(ram / 2**20, 2),
+                    'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+                    'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+                    f'recall@{args.top_k}': round(recall(results, truth), 3)
+                }
+                rows.append(row)
+                print(f"{size:>8}  {name:<16} {row['ram_mb']:>8} {row['p50_ms']:>8} {row['p99_ms']:>8} {row[f'recall@{args.top_k}']:>7}")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(rows, indent=2))
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
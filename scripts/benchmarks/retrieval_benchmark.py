@@ -0,0 +1,104 @@
+"""
+Retrieval Benchmark
+
+Measures retrieval quality (recall@k, MRR, nDCG@k) and latency (p50/p95/p99,
+throughput) of dense search, BM25, hybrid search and diverse search (fixed
+and adaptive depth) on the ingested knowledge base.
+
+Queries are the problem statements of the worked examples in
+knowledge_base/examples/; the formulas and template sections of each
+example's topic are its relevant chunks (see src/rag/evaluation.py).
+Caches are cleared before each method so every query is measured cold.
+
+Usage:
+    python scripts/benchmarks/retrieval_benchmark.py
+
+    # Ingest the knowledge base first, then benchmark at k=10:
+    python scripts/benchmarks/retrieval_benchmark.py --build --k 10
+
+    # Save results as JSON (e.g. per release, to track regressions):
+    python scripts/benchmarks/retrieval_benchmark.py --output data/retrieval_benchmark.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+from loguru import logger
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.rag.evaluation import build_query_set, evaluate
+from src.rag.knowledge_builder import build_knowledge_base
+from src.rag.vector_store import VectorStore
+from src.utils.config import config
+
+
+def search_methods(vs: VectorStore) -> dict:
+    """Method name -> function (query, k) -> ranked chunk IDs."""
+    return {
+        'dense': lambda query, k: [doc['id'] for doc in vs.search(query, top_k=k)],
+        'bm25': lambda query, k: [doc['id'] for doc, _ in vs.bm25_retriever.search(query, top_k=k, expander=vs.query_expander)],
+        'hybrid': lambda query, k: [doc['id'] for doc in vs.hybrid_search(query, top_k=k)],
+        'diverse': lambda query, k: [doc['id'] for doc in vs.search_diverse(query, top_k=k, adaptive=False)],
+        'adaptive': lambda query, k: [doc['id'] for doc in vs.search_diverse(query, top_k=k, adaptive=True)],
+    }
+
+
+def main():
+    methods = ['dense', 'bm25', 'hybrid', 'diverse', 'adaptive']
+
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and latency on the knowledge base")
+    parser.add_argument('--methods', nargs='+', default=methods, choices=methods)
+    parser.add_argument('--k', type=int, default=config.TOP_K, help="Results per query (recall/nDCG cutoff)")
+    parser.add_argument('--build', action='store_true', help="Ingest the knowledge base before benchmarking")
+    parser.add_argument('--output', type=str, default=None, help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    # Per-call log lines would dominate the latencies being measured
+    logger.disable("src")
+
+    vs = build_knowledge_base(incremental=True) if args.build else VectorStore(background_bm25=False)
+    if not vs.count():
+        print("The vector store is empty: run python ingest_knowledge.py or pass --build")
+        return
+    if vs.bm25_retriever is None:
+        vs.build_bm25_index(persist=False)
+
+    queries = build_query_set(Path(config.KNOWLEDGE_BASE_PATH))
+    print(f"{len(queries)} labelled queries, {vs.count()} chunks, k={args.k}")
+    print(f"{'method':<8} {'recall':>7} {'MRR':>7} {'nDCG':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/s':>8}")
+
+    rows = []
+    for name, search in search_methods(vs).items():
+        if name not in args.methods:
+            continue
+
+        vs.clear_caches()
+        search(queries[0]['query'], args.k)  # Warm-up (model and index initialization)
+        vs.clear_caches()
+
+        row = {'method': name, 'k': args.k, **evaluate(search, queries, args.k)}
+        rows.append(row)
+        print(
+            f"{name:<8} {row[f'recall@{args.k}']:>7} {row['mrr']:>7} {row[f'ndcg@{args.k}']:>7} "
+            f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['throughput_qps']:>8}"
+        )
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'embedding_model': config.EMBEDDING_MODEL,
+            'chunks': vs.count(),
+            'results': rows
+        }, indent=2))
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
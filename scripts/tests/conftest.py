@@ -1,4 +1,5 @@
 """Pytest configuration and fixtures."""
+import hashlib
 import pytest
 import sys
 from pathlib import Path
@@ -6,6 +7,31 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+class HashModel:
+    """Bag-of-words hashing stand-in for SentenceTransformer."""
+
+    def get_sentence_embedding_dimension(self):
+        return 64
+
+    def encode(self, texts, **kwargs):
+        import numpy as np
+
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+@pytest.fixture
+def hash_embeddings(monkeypatch):
+    """Make VectorStore embed with HashModel instead of loading a real model."""
+    from src.rag import vector_store as vector_store_module
+    from src.rag.embeddings import EmbeddingService
+
+    service = EmbeddingService(model=HashModel(), model_name="hash", max_wait_ms=1)
+    monkeypatch.setattr(vector_store_module, "get_embedding_service", lambda: service)
+    return service
+
 @pytest.fixture
 def sample_algebra_problem():
     """Sample algebra problem for testing."""
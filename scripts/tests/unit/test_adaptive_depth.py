@@ -0,0 +1,34 @@
+"""Unit tests for adaptive retrieval depth."""
+from src.rag.adaptive_depth import choose_depth
+
+# RRF scores: one chunk ranked first by both retrievers, then dense-only hits
+DECISIVE = [0.0164, 0.0113, 0.0111, 0.0109, 0.0108, 0.0106]
+FLAT = [0.0164, 0.0160, 0.0157, 0.0155, 0.0150, 0.0148]
+
+
+class TestChooseDepth:
+    """Test score-floor and elbow cut-offs."""
+
+    def test_flat_scores_keep_max_k(self):
+        """Without a drop or weak dense scores every result is kept."""
+        assert choose_depth(FLAT, [0.8] * 6, min_k=3, max_k=6) == 6
+
+    def test_elbow_cut_at_min_k(self):
+        """A large early drop cuts the depth, but never below min_k."""
+        assert choose_depth(DECISIVE, [0.9] + [0.6] * 5, min_k=3, max_k=6) == 3
+        assert choose_depth(DECISIVE, [0.9] + [0.6] * 5, min_k=1, max_k=6) == 1
+
+    def test_elbow_below_min_gap_ignored(self):
+        """Drops smaller than min_gap of the top score do not cut."""
+        assert choose_depth(DECISIVE, [0.8] * 6, min_k=3, max_k=6, min_gap=0.5) == 6
+
+    def test_score_floor(self):
+        """Results from the first dense score under min_score are cut; sparse-only hits are kept."""
+        dense = [0.8, 0.7, None, 0.6, 0.2, 0.7]
+        assert choose_depth(FLAT, dense, min_k=2, max_k=6, min_score=0.3) == 4
+        assert choose_depth(FLAT, [0.1] * 6, min_k=2, max_k=6, min_score=0.3) == 2
+
+    def test_few_results(self):
+        """Depth never exceeds the results retrieved."""
+        assert choose_depth(FLAT[:2], [0.8, 0.8], min_k=3, max_k=6) == 2
+        assert choose_depth([], [], min_k=3, max_k=6) == 0
@@ -0,0 +1,193 @@
+"""Unit tests for vector store backends."""
+import numpy as np
+import pytest
+
+from src.rag.backends.base import matches_where
+
+
+def unit_vectors(n, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestMatchesWhere:
+    """Test Chroma-style metadata filters."""
+
+    def test_equality_and_operators(self):
+        """Shorthand equality and comparison operators."""
+        metadata = {"type": "formula", "topic": "algebra", "level": 2}
+
+        assert matches_where(metadata, {"type": "formula"})
+        assert matches_where(metadata, {"level": {"$gte": 2}, "topic": {"$in": ["algebra", "calculus"]}})
+        assert not matches_where(metadata, {"type": {"$ne": "formula"}})
+
+    def test_logical_operators(self):
+        """$and / $or combine clauses."""
+        metadata = {"type": "formula", "topic": "algebra"}
+
+        assert matches_where(metadata, {"$or": [{"type": "example"}, {"topic": "algebra"}]})
+        assert not matches_where(metadata, {"$and": [{"type": "formula"}, {"topic": "calculus"}]})
+
+
+@pytest.mark.parametrize("index_type", ["Flat", "IVFFlat", "HNSW"])
+class TestFaissBackend:
+    """Test the FAISS backend for every index type."""
+
+    def make(self, tmp_path, index_type):
+        faiss_backend = pytest.importorskip("src.rag.backends.faiss_backend")
+        return faiss_backend.FaissBackend(tmp_path / "faiss", "test", index_type=index_type, nlist=4, nprobe=4)
+
+    def populate(self, backend, n=50):
+        vectors = unit_vectors(n)
+        ids = [f"doc{i}" for i in range(n)]
+        metadatas = [{"type": "formula" if i % 2 else "example"} for i in range(n)]
+        backend.add(ids, vectors, [f"text {i}" for i in range(n)], metadatas)
+        return vectors
+
+    def test_nearest_neighbour(self, tmp_path, index_type):
+        """A stored vector is its own nearest neighbour with distance ~0."""
+        backend = self.make(tmp_path, index_type)
+        vectors = self.populate(backend)
+
+        results = backend.query(vectors[7], top_k=3)
+
+        assert results[0]["id"] == "doc7"
+        assert results[0]["text"] == "text 7"
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-5)
+
+    def test_filtered_query(self, tmp_path, index_type):
+        """Filtered results all satisfy the metadata filter."""
+        backend = self.make(tmp_path, index_type)
+        vectors = self.populate(backend)
+
+        results = backend.query(vectors[8], top_k=5, where={"type": "formula"})
+
+        assert len(results) == 5
+        assert all(r["metadata"]["type"] == "formula" for r in results)
+
+    def test_upsert_and_delete(self, tmp_path, index_type):
+        """Upserted records replace old ones; deleted records disappear."""
+        backend = self.make(tmp_path, index_type)
+        vectors = self.populate(backend)
+
+        backend.upsert(["doc3"], vectors[10:11], ["moved"], [{"type": "formula"}])
+        backend.delete(["doc10"])
+
+        assert backend.count() == 49
+        assert backend.query(vectors[10], top_k=1)[0]["text"] == "moved"
+        assert "doc10" not in backend.ids()
+
+    def test_upsert_duplicate_ids_rolls_back(self, tmp_path, index_type):
+        """A batch repeating an ID is rejected without deleting the records it named."""
+        backend = self.make(tmp_path, index_type)
+        vectors = self.populate(backend)
+
+        with pytest.raises(ValueError):
+            backend.upsert(["doc3", "doc3"], vectors[10:12], ["a", "b"], [{}, {}])
+        backend.delete(["doc0"])
+
+        assert backend.count() == 49
+        assert backend.query(vectors[3], top_k=1)[0]["text"] == "text 3"
+
+    def test_persistence(self, tmp_path, index_type):
+        """A persisted store reopens with the same contents."""
+        backend = self.make(tmp_path, index_type)
+        vectors = self.populate(backend)
+        backend.persist()
+
+        reopened = self.make(tmp_path, index_type)
+
+        assert reopened.count() == 50
+        assert reopened.query(vectors[20], top_k=1)[0]["id"] == "doc20"
+
+    def test_query_batch(self, tmp_path, index_type):
+        """Batched queries return one result list per query."""
+        backend = self.make(tmp_path, index_type)
+        vectors = self.populate(backend)
+
+        queries = vectors[[1, 2, 3]]
+        results = backend.query_batch(queries, top_k=2, where={"type": "formula"})
+
+        assert len(results) == 3
+        for query, hits in zip(queries, results):
+            assert [h["id"] for h in hits] == [h["id"] for h in backend.query(query, top_k=2, where={"type": "formula"})]
+
+    def test_vectors(self, tmp_path, index_type):
+        """Stored embeddings come back in the requested order; unknown IDs give None."""
+        backend = self.make(tmp_path, index_type)
+        vectors = self.populate(backend)
+
+        assert backend.vectors(["doc4", "doc1"]) == pytest.approx(vectors[[4, 1]], abs=1e-6)
+        assert backend.vectors(["doc4", "missing"]) is None
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+class TestQuantizedBackend:
+    """Test the quantized backend for both code types."""
+
+    def make(self, tmp_path, mode):
+        from src.rag.backends.quantized_backend import QuantizedBackend
+        return QuantizedBackend(tmp_path / "quantized", "test", mode=mode, rescore_factor=10)
+
+    def populate(self, backend, n=200, dim=64):
+        vectors = unit_vectors(n, dim)
+        ids = [f"doc{i}" for i in range(n)]
+        metadatas = [{"type": "formula" if i % 2 else "example"} for i in range(n)]
+        backend.add(ids, vectors, [f"text {i}" for i in range(n)], metadatas)
+        return vectors
+
+    def test_recall_against_float_search(self, tmp_path, mode):
+        """Rescored results match exact float32 search on near-duplicate queries."""
+        backend = self.make(tmp_path, mode)
+        vectors = self.populate(backend)
+        queries = vectors[:20] + 0.05 * unit_vectors(20, 64, seed=1)
+
+        exact = np.argsort(-(vectors @ (queries / np.linalg.norm(queries, axis=1, keepdims=True)).T), axis=0)[:5]
+        results = backend.query_batch(queries, top_k=5)
+
+        hits = sum(len({r["id"] for r in res} & {f"doc{i}" for i in exact[:, qi]}) for qi, res in enumerate(results))
+        assert hits / exact.size >= 0.9
+        assert results[0][0]["id"] == "doc0"
+        assert results[0][0]["distance"] == pytest.approx(1 - float(vectors[0] @ queries[0] / np.linalg.norm(queries[0])), abs=1e-5)
+
+    def test_memory_reduction(self, tmp_path, mode):
+        """Codes take 4x (int8 + scale) or 32x (binary) less memory than float32."""
+        backend = self.make(tmp_path, mode)
+        vectors = self.populate(backend)
+
+        ratio = vectors.nbytes / backend.memory_bytes()
+        assert ratio == pytest.approx(64 * 4 / 68 if mode == "int8" else 32)
+
+    def test_filter_delete_and_upsert(self, tmp_path, mode):
+        """Filters apply; deletes move the last row; upserts replace records."""
+        backend = self.make(tmp_path, mode)
+        vectors = self.populate(backend, n=50)
+
+        backend.delete(["doc3"])
+        backend.upsert(["doc5"], vectors[3:4], ["moved"], [{"type": "example"}])
+
+        assert backend.count() == 49
+        assert backend.query(vectors[49], top_k=1)[0]["id"] == "doc49"
+        assert backend.query(vectors[3], top_k=1)[0]["text"] == "moved"
+        assert all(r["metadata"]["type"] == "formula" for r in backend.query(vectors[8], top_k=5, where={"type": "formula"}))
+
+    def test_persistence(self, tmp_path, mode):
+        """Reopening loads saved codes, or re-quantizes when they are stale."""
+        backend = self.make(tmp_path, mode)
+        vectors = self.populate(backend, n=50)
+        backend.persist()
+        backend.add(["late"], vectors[7:8] * -1, ["late"], [{}])
+
+        reopened = self.make(tmp_path, mode)
+
+        assert reopened.count() == 51
+        assert reopened.query(vectors[20], top_k=1)[0]["id"] == "doc20"
+        assert reopened.query(-vectors[7], top_k=1)[0]["id"] == "late"
+
+    def test_vectors(self, tmp_path, mode):
+        """Float32 embeddings come back in the requested order; unknown IDs give None."""
+        backend = self.make(tmp_path, mode)
+        vectors = self.populate(backend, n=20)
+
+        assert backend.vectors(["doc4", "doc1"]) == pytest.approx(vectors[[4, 1]], abs=1e-6)
+        assert backend.vectors(["doc4", "missing"]) is None
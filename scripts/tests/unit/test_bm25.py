@@ -0,0 +1,157 @@
+"""Unit tests for the BM25 retriever."""
+import pytest
+
+from src.rag.bm25_retriever import BM25Retriever
+
+
+def make_docs(texts):
+    return [{"id": f"d{i}", "text": t, "metadata": {}} for i, t in enumerate(texts)]
+
+
+CORPUS = [
+    "Chain rule for derivative of composite functions",
+    "Quadratic formula roots of quadratic equation",
+    "Integration by parts for products of functions",
+    "Derivative of x squared is 2x by the power rule",
+]
+
+
+def scores_by_id(retriever, query):
+    return {doc["id"]: score for doc, score in retriever.search(query, top_k=10)}
+
+
+class TestBM25Search:
+    """Test BM25 ranking."""
+
+    def test_keyword_match_ranks_first(self):
+        """Document sharing the query terms ranks first."""
+        retriever = BM25Retriever(make_docs(CORPUS))
+
+        results = retriever.search("quadratic equation", top_k=2)
+
+        assert results[0][0]["id"] == "d1"
+
+    def test_only_matching_documents_returned(self):
+        """Documents without any query term are not scored."""
+        retriever = BM25Retriever(make_docs(CORPUS))
+
+        results = retriever.search("integration", top_k=4)
+
+        assert [doc["id"] for doc, _ in results] == ["d2"]
+
+
+class TestBM25Incremental:
+    """Incremental updates must match a fresh build."""
+
+    def test_add_matches_rebuild(self):
+        """Adding documents gives the same scores as building from scratch."""
+        incremental = BM25Retriever(make_docs(CORPUS[:2]))
+        incremental.add(make_docs(CORPUS)[2:])
+
+        fresh = BM25Retriever(make_docs(CORPUS))
+
+        for query in ["derivative", "functions rule", "quadratic"]:
+            expected = scores_by_id(fresh, query)
+            actual = scores_by_id(incremental, query)
+            assert actual.keys() == expected.keys()
+            for doc_id, score in expected.items():
+                assert actual[doc_id] == pytest.approx(score)
+
+    def test_update_replaces_document(self):
+        """Updating a document re-indexes its text."""
+        retriever = BM25Retriever(make_docs(CORPUS))
+
+        retriever.update([{"id": "d1", "text": "Binomial theorem expansion", "metadata": {}}])
+
+        assert retriever.search("quadratic", top_k=5) == []
+        assert retriever.search("binomial", top_k=1)[0][0]["id"] == "d1"
+        assert retriever.num_docs == len(CORPUS)
+
+    def test_delete_updates_statistics(self):
+        """Deleting restores the statistics of the smaller corpus."""
+        retriever = BM25Retriever(make_docs(CORPUS))
+        retriever.delete(["d0", "d3"])
+
+        fresh = BM25Retriever([make_docs(CORPUS)[1], make_docs(CORPUS)[2]])
+
+        assert retriever.num_docs == 2
+        assert retriever.avgdl == pytest.approx(fresh.avgdl)
+        assert scores_by_id(retriever, "functions") == pytest.approx(scores_by_id(fresh, "functions"))
+
+    def test_persistence_roundtrip(self, tmp_path):
+        """Saved index loads with identical scores and fingerprint."""
+        retriever = BM25Retriever(make_docs(CORPUS))
+        retriever.save(tmp_path / "bm25", "fp-1")
+
+        loaded = BM25Retriever.load(tmp_path / "bm25")
+
+        assert BM25Retriever.read_fingerprint(tmp_path / "bm25") == "fp-1"
+        assert scores_by_id(loaded, "derivative rule") == pytest.approx(scores_by_id(retriever, "derivative rule"))
+
+
+class TestBM25Segments:
+    """CSR segment, delta segment and compaction."""
+
+    def test_compaction_matches_rebuild(self):
+        """Scores are unchanged after the delta segment is folded into CSR."""
+        texts = [f"{CORPUS[i % len(CORPUS)]} extra{i}" for i in range(200)]
+        incremental = BM25Retriever(make_docs(texts[:10]))
+        incremental.add(make_docs(texts)[10:])
+        incremental.delete([f"d{i}" for i in range(0, 200, 3)])
+        incremental.compact()
+
+        fresh = BM25Retriever([d for i, d in enumerate(make_docs(texts)) if i % 3])
+
+        assert incremental.num_docs == fresh.num_docs
+        assert scores_by_id(incremental, "derivative extra5") == pytest.approx(scores_by_id(fresh, "derivative extra5"))
+
+    def test_save_leaves_live_index_untouched(self, tmp_path):
+        """save writes a compacted copy; the index being searched keeps its segments."""
+        retriever = BM25Retriever(make_docs(CORPUS))
+        retriever.add([{"id": "d9", "text": "Binomial theorem expansion", "metadata": {}}])
+        retriever.delete(["d1"])
+        indptr, docs = retriever._indptr, retriever._docs
+        before = scores_by_id(retriever, "binomial derivative")
+
+        retriever.save(tmp_path / "bm25", "fp-1")
+        loaded = BM25Retriever.load(tmp_path / "bm25")
+
+        assert retriever._indptr is indptr and retriever._docs is docs
+        assert retriever._delta
+        assert scores_by_id(retriever, "binomial derivative") == before
+        assert scores_by_id(loaded, "binomial derivative") == pytest.approx(before)
+        assert loaded.num_docs == retriever.num_docs == len(CORPUS)
+
+    def test_add_after_load(self, tmp_path):
+        """A memory-mapped index accepts new documents."""
+        BM25Retriever(make_docs(CORPUS)).save(tmp_path / "bm25", "fp-1")
+        loaded = BM25Retriever.load(tmp_path / "bm25")
+
+        loaded.add([{"id": "d9", "text": "Binomial theorem expansion", "metadata": {}}])
+        loaded.delete(["d1"])
+
+        assert loaded.search("binomial", top_k=1)[0][0]["id"] == "d9"
+        assert loaded.search("quadratic", top_k=1) == []
+
+    def test_parameters_affect_scores(self):
+        """k1 and b are honoured."""
+        default = scores_by_id(BM25Retriever(make_docs(CORPUS)), "derivative")
+        tuned = scores_by_id(BM25Retriever(make_docs(CORPUS), k1=0.5, b=0.0), "derivative")
+
+        assert default["d0"] != pytest.approx(tuned["d0"])
+
+
+class TestBM25Batch:
+    """Batched multi-query search."""
+
+    def test_batch_matches_single_queries(self):
+        """Each batched result equals the single-query result."""
+        retriever = BM25Retriever(make_docs(CORPUS))
+        queries = ["derivative rule", "quadratic equation", "no match here", "functions"]
+
+        batched = retriever.search_batch(queries, top_k=3)
+
+        for query, results in zip(queries, batched):
+            expected = retriever.search(query, top_k=3)
+            assert [doc["id"] for doc, _ in results] == [doc["id"] for doc, _ in expected]
+            assert [score for _, score in results] == pytest.approx([score for _, score in expected])
@@ -0,0 +1,121 @@
+"""Unit tests for retrieval caches."""
+import numpy as np
+
+from src.rag.cache import LRUCache, SemanticQueryCache, TTLCache, normalize_query
+
+
+class TestLRUCache:
+    """Test bounded LRU cache."""
+
+    def test_hit_and_miss_counters(self):
+        """Lookups update hit/miss counters."""
+        cache = LRUCache(maxsize=2)
+
+        assert cache.get("a") is None
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_evicts_least_recently_used(self):
+        """Oldest untouched entry is evicted first."""
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.stats()["evictions"] == 1
+
+    def test_zero_size_disables(self):
+        """maxsize=0 never stores anything."""
+        cache = LRUCache(maxsize=0)
+        cache.put("a", 1)
+
+        assert len(cache) == 0
+
+    def test_normalize_query(self):
+        """Whitespace differences map to the same key."""
+        assert normalize_query("  Solve  x² = 4\n") == normalize_query("Solve x² = 4")
+
+
+class TestTTLCache:
+    """Test expiring LRU cache."""
+
+    def test_entries_expire(self):
+        """Entries are served until their TTL passes, then counted as expired misses."""
+        now = [0.0]
+        cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.put("a", 1)
+
+        now[0] = 9.9
+        assert cache.get("a") == 1
+        now[0] = 10.0
+        assert cache.get("a") is None
+
+        stats = cache.stats()
+        assert stats["expirations"] == 1
+        assert stats["misses"] == 1
+        assert len(cache) == 0
+
+    def test_size_eviction(self):
+        """Size bound still evicts the least recently used entry."""
+        cache = TTLCache(maxsize=1, ttl=0)
+        cache.put("a", 1)
+        cache.put("b", 2)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert cache.stats()["evictions"] == 1
+
+
+class TestSemanticQueryCache:
+    """Test embedding-keyed result cache."""
+
+    def test_near_duplicate_reuse(self):
+        """A query within the threshold reuses the closest entry; a distant one misses."""
+        cache = SemanticQueryCache(maxsize=4, threshold=0.95)
+        cache.put(np.array([1.0, 0.0, 0.0]), "params", "derivative results")
+        cache.put(np.array([0.0, 1.0, 0.0]), "params", "integral results")
+
+        assert cache.get(np.array([0.99, 0.05, 0.0]), "params") == "derivative results"
+        assert cache.get(np.array([0.99, 0.05, 0.0]), "other params") is None
+        assert cache.get(np.array([0.7, 0.7, 0.0]), "params") is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+    def test_eviction_and_audit(self):
+        """Full caches evict the least recently used entry; audits count false reuses."""
+        cache = SemanticQueryCache(maxsize=2, threshold=0.95, audit_every=1)
+        for vector in np.eye(3):
+            cache.put(vector, "params", vector.tolist())
+
+        assert cache.get(np.eye(3)[0], "params") is None
+        assert cache.get(np.eye(3)[2], "params") is not None
+        assert cache.should_audit()
+        assert cache.audit(["a", "b"], ["b", "c"])
+        assert not cache.audit(["a", "b"], ["b", "a"])
+
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["false_reuse_rate"] == 0.5
+
+    def test_audited_hit_replaces_its_entry(self):
+        """Recomputed results are stored in the matched row, not added as a second entry."""
+        cache = SemanticQueryCache(maxsize=4, threshold=0.95)
+        cache.put(np.array([1.0, 0.0, 0.0]), "params", "stale results")
+
+        row, value = cache.lookup(np.array([0.99, 0.05, 0.0]), "params")
+        cache.put(np.array([0.99, 0.05, 0.0]), "params", "fresh results", row=row)
+
+        assert value == "stale results"
+        assert len(cache) == 1
+        assert cache.get(np.array([1.0, 0.0, 0.0]), "params") == "fresh results"
+        assert cache.lookup(np.array([0.0, 1.0, 0.0]), "params") == (None, None)
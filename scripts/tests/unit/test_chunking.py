@@ -0,0 +1,63 @@
+"""Unit tests for token-aware section splitting."""
+from src.rag.chunking import join_parts, split_text, split_units
+from src.utils.tokens import count_tokens
+
+
+SECTION = "\n".join(
+    ["Intro line for the method."]
+    + [f"**Step {i}:** apply rule number {i} to the expression and simplify the result carefully" for i in range(1, 7)]
+    + ["```", "x = 1", "y = 2", "z = 3", "```"]
+    + [f"**Step {i}:** check the answer against the constraint number {i}" for i in range(7, 10)]
+)
+
+
+class TestSplitUnits:
+    """Test atomic units."""
+
+    def test_blocks_and_headings_stay_whole(self):
+        """Code fences, display math and tables are one unit; headings join the next unit."""
+        text = "### Heading\nbody\n$$\na = b\n$$\n| a | b |\n|---|---|\n| 1 | 2 |\nend"
+
+        assert split_units(text) == ["### Heading\nbody", "$$\na = b\n$$", "| a | b |\n|---|---|\n| 1 | 2 |", "end"]
+
+
+class TestSplitText:
+    """Test chunking to a token budget."""
+
+    def test_fits_in_one_chunk(self):
+        """Short sections are returned unchanged."""
+        assert split_text("short body", 100, 10, header="Title\n") == [("Title\nshort body", 6)]
+
+    def test_chunks_within_budget(self):
+        """Every chunk repeats the header and stays within chunk_size."""
+        chunks = split_text(SECTION, 60, 0, header="Method: Test\n")
+
+        assert len(chunks) > 1
+        for text, _ in chunks:
+            assert text.startswith("Method: Test\n")
+            assert count_tokens(text) <= 60
+
+    def test_code_block_not_split(self):
+        """A fenced block is never cut across chunks."""
+        chunks = split_text(SECTION, 60, 10)
+
+        assert all(text.count("```") % 2 == 0 for text, _ in chunks)
+        assert any("x = 1\ny = 2\nz = 3" in text for text, _ in chunks)
+
+    def test_chunks_end_at_section_labels(self):
+        """Chunks after the first start at a step label, not mid-step."""
+        chunks = split_text(SECTION, 60, 0)
+
+        assert all(text.startswith(("**Step", "```")) for text, _ in chunks[1:])
+
+    def test_overlap_and_join(self):
+        """Chunks repeat trailing lines of the previous one; joining the parts drops the repeats."""
+        header = "Method: Test\n"
+        chunks = split_text(SECTION, 60, 30, header=header)
+        parts = [
+            {"text": text, "metadata": {"part": i, "body_start": start}}
+            for i, (text, start) in enumerate(chunks)
+        ]
+
+        assert any(start > len(header) for _, start in chunks[1:])
+        assert join_parts(list(reversed(parts))) == header + SECTION
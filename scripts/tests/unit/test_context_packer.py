@@ -0,0 +1,107 @@
+"""Unit tests for token-budgeted context packing."""
+from src.rag.context_packer import ContextPacker, format_doc
+from src.utils.tokens import count_tokens, estimate_tokens, truncate_to_tokens
+
+
+def chunk(doc_id, text, score, doc_type="formula"):
+    return {'id': doc_id, 'text': text, 'metadata': {'type': doc_type}, 'hybrid_score': score}
+
+
+EXAMPLE = """## Example 3: Chain Rule
+
+**Problem:** Differentiate y = sin(x^2).
+
+**Key Concepts:**
+- Chain rule for composite functions
+- Derivative of sine
+
+**Step 1:** Identify the inner function u = x^2 and outer function sin(u).
+
+**Step 2:** Integration by parts is not needed here, we only differentiate the composition carefully.
+
+**Step 3:** Apply the chain rule: dy/dx = cos(x^2) * 2x.
+
+**Final Answer:** dy/dx = 2x cos(x^2)"""
+
+
+class TestTokens:
+    """Test token counting and truncation."""
+
+    def test_estimate_tokens(self):
+        """Words cost a token per four letters, digits per three, symbols one each."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("derivative") == 3
+        assert estimate_tokens("x^2 + 12345") == 6
+
+    def test_truncate_keeps_whole_lines(self):
+        """Truncation keeps a prefix of whole lines within the budget."""
+        text = "\n".join(f"line number {i}" for i in range(20))
+        truncated = truncate_to_tokens(text, 20)
+
+        assert count_tokens(truncated) <= 20
+        assert text.startswith(truncated)
+        assert truncated.endswith(tuple("0123456789"))
+        assert truncate_to_tokens(text, 1000) == text
+        assert truncate_to_tokens(text, 0) == ""
+
+
+class TestContextPacker:
+    """Test deduplication, example trimming and knapsack selection."""
+
+    def test_knapsack_respects_budget(self):
+        """Packed knowledge stays within its budget and prefers the most relevant chunks."""
+        docs = [chunk(f"d{i}", f"formula {i} " + "term " * 40, 1.0 - i * 0.1) for i in range(8)]
+        packer = ContextPacker(budgets={'knowledge': 120})
+
+        packed = packer.pack("problem", docs)
+
+        assert count_tokens(packed['context']) <= 120
+        assert [doc['id'] for doc in packed['docs']] == ["d0", "d1"]
+        assert packed['report']['tokens_saved'] > 0
+        assert packed['report']['chunks_after'] == 2
+
+    def test_overlapping_chunks_dropped(self):
+        """A chunk contained in a better-scored one is dropped; shared lines are removed."""
+        docs = [
+            chunk("a", "Power rule: d/dx x^n = n x^(n-1)\nValid for real n", 0.9),
+            chunk("b", "Power rule: d/dx x^n = n x^(n-1)", 0.8),
+            chunk("c", "Valid for real n\nQuotient rule: (u/v)' = (u'v - uv')/v^2", 0.7),
+        ]
+        packed = ContextPacker(budgets={'knowledge': 1000}).pack("problem", docs)
+
+        assert [doc['id'] for doc in packed['docs']] == ["a", "c"]
+        assert packed['docs'][1]['text'] == "Quotient rule: (u/v)' = (u'v - uv')/v^2"
+
+    def test_shared_structure_kept(self):
+        """Fences, rules and section labels repeated across chunks are not deduplicated."""
+        docs = [
+            chunk("a", "**Detailed Solution:**\n```\nx = 1\n```\n---", 0.9, "example_solution"),
+            chunk("b", "**Detailed Solution:**\n```\ny = 2\n```\n---", 0.8, "example_solution"),
+        ]
+        packed = ContextPacker(budgets={'knowledge': 1000}).pack("problem", docs)
+
+        assert [doc['text'] for doc in packed['docs']] == [doc['text'] for doc in docs]
+
+    def test_example_trimmed_to_essentials(self):
+        """Long examples keep their problem, final answer and the steps closest to the problem."""
+        packer = ContextPacker(budgets={'knowledge': 1000}, example_max_tokens=count_tokens(EXAMPLE) - 10)
+
+        packed = packer.pack("chain rule derivative of sin(x^2)", [chunk("e", EXAMPLE, 1.0, "example_solution")])
+        text = packed['docs'][0]['text']
+
+        assert "**Problem:**" in text and "**Final Answer:**" in text
+        assert "Apply the chain rule" in text
+        assert "Integration by parts" not in text
+
+    def test_other_sources_truncated(self):
+        """Memory, web and tool context are cut to their budgets."""
+        memory = "\n".join(f"Similar problem {i}: solve x + {i} = 0" for i in range(50))
+        packed = ContextPacker(budgets={'memory': 30, 'web': 0}).pack("problem", [], memory=memory, web="web text")
+
+        assert count_tokens(packed['memory']) <= 30
+        assert packed['web'] == ""
+        assert packed['report']['by_source']['memory']['before'] == count_tokens(memory)
+
+    def test_format_doc(self):
+        """Prompt lines carry the chunk type and score."""
+        assert format_doc(chunk("a", "text", 0.5)) == "[formula] text (score: 0.500)"
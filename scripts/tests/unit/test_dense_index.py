@@ -0,0 +1,78 @@
+"""Unit tests for the exact in-memory dense index."""
+import numpy as np
+import pytest
+
+from src.rag.dense_index import ExactDenseIndex
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def build(n=100, metric="cosine"):
+    vectors = random_vectors(n)
+    index = ExactDenseIndex(metric=metric)
+    index.add(
+        [f"doc{i}" for i in range(n)],
+        vectors,
+        [f"text {i}" for i in range(n)],
+        [{"type": "formula" if i % 2 else "example"} for i in range(n)]
+    )
+    return index, vectors
+
+
+class TestExactDenseIndex:
+    """Test exact k-NN search."""
+
+    def test_matches_brute_force(self):
+        """Top k equals a full sort of cosine similarities."""
+        index, vectors = build()
+        query = random_vectors(1, seed=1)[0]
+
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+
+        results = index.query(query, top_k=5)
+
+        assert [r["id"] for r in results] == [f"doc{i}" for i in expected]
+        assert results[0]["distance"] <= results[-1]["distance"]
+
+    def test_filter(self):
+        """Filtered search only returns matching records."""
+        index, vectors = build()
+
+        results = index.query(vectors[3], top_k=10, where={"type": "formula"})
+
+        assert results[0]["id"] == "doc3"
+        assert len(results) == 10
+        assert all(r["metadata"]["type"] == "formula" for r in results)
+
+    def test_delete_and_upsert(self):
+        """Deleted rows disappear; upserts replace in place."""
+        index, vectors = build(10)
+
+        index.delete(["doc0", "doc5"])
+        index.add(["doc9"], vectors[0:1], ["replaced"], [{"type": "example"}])
+
+        assert len(index) == 8
+        assert index.query(vectors[0], top_k=1)[0]["text"] == "replaced"
+        assert all(r["id"] not in ("doc0", "doc5") for r in index.query(vectors[5], top_k=8))
+
+    def test_euclidean(self):
+        """Euclidean distance is squared L2."""
+        index, vectors = build(20, metric="euclidean")
+
+        result = index.query(vectors[4] + 0.5, top_k=1)[0]
+
+        assert result["id"] == "doc4"
+        assert result["distance"] == pytest.approx(0.25 * vectors.shape[1], rel=1e-4)
+
+    def test_batch_matches_single_queries(self):
+        """query_batch returns the same results as one query at a time."""
+        index, _ = build()
+        queries = random_vectors(5, seed=2)
+
+        batched = index.query_batch(queries, top_k=4, where={"type": "example"})
+
+        for query, results in zip(queries, batched):
+            assert [r["id"] for r in results] == [r["id"] for r in index.query(query, top_k=4, where={"type": "example"})]
@@ -0,0 +1,37 @@
+"""Unit tests for MMR diversification."""
+import numpy as np
+
+from src.rag.diversity import mmr_select, type_group
+
+
+def unit(*rows):
+    vectors = np.array(rows, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestMMRSelect:
+    """Test greedy MMR selection."""
+
+    def test_skips_near_duplicates(self):
+        """A near-copy of the top result loses to a less relevant but different one."""
+        vectors = unit([1, 0], [1, 0.01], [0, 1])
+        relevance = np.array([1.0, 0.95, 0.6])
+
+        assert mmr_select(relevance, vectors, 2, lambda_mult=0.5) == [0, 2]
+        assert mmr_select(relevance, vectors, 2, lambda_mult=1.0) == [0, 1]
+
+    def test_quotas_are_met(self):
+        """Once the slots left only cover the unmet quotas, only those groups are eligible."""
+        vectors = unit([1, 0], [1, 0.1], [1, 0.2], [0, 1])
+        relevance = np.array([1.0, 0.9, 0.8, 0.0])
+        groups = ["formula", "formula", "formula", "example"]
+
+        picks = mmr_select(relevance, vectors, 2, lambda_mult=1.0, groups=groups, quotas={"example": 1, "template": 1})
+
+        assert picks == [0, 3]
+
+    def test_type_group(self):
+        """Chunk types map to quota groups."""
+        assert [type_group(t) for t in ["formula", "template_method", "example_solution", None]] == [
+            "formula", "template", "example", "other"
+        ]
@@ -0,0 +1,83 @@
+"""Unit tests for the persistent embedding cache."""
+import numpy as np
+
+from src.rag.embedding_cache import PersistentEmbeddingCache
+
+
+def fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 0.5] for t in texts], dtype=np.float32)
+    return encode
+
+
+class TestPersistentEmbeddingCache:
+    """Test content-addressed embedding cache."""
+
+    def test_encodes_only_misses(self, tmp_path):
+        """Second run over the same texts is served from cache."""
+        calls = []
+        cache = PersistentEmbeddingCache(str(tmp_path), "test/model")
+
+        first = cache.get_or_encode(["a", "bb"], fake_encode(calls))
+        second = cache.get_or_encode(["bb", "a", "ccc"], fake_encode(calls))
+
+        assert calls == [["a", "bb"], ["ccc"]]
+        assert np.allclose(first[0], second[1])
+        assert second.shape == (3, 2)
+
+    def test_persists_across_instances(self, tmp_path):
+        """Flushed entries are visible to a new cache instance."""
+        calls = []
+        cache = PersistentEmbeddingCache(str(tmp_path), "test/model")
+        cache.get_or_encode(["formula text"], fake_encode(calls))
+        cache.flush()
+
+        reloaded = PersistentEmbeddingCache(str(tmp_path), "test/model")
+        embeddings = reloaded.get_or_encode(["formula text"], fake_encode(calls))
+
+        assert len(calls) == 1
+        assert embeddings[0][0] == len("formula text")
+        assert reloaded.stats()["hits"] == 1
+
+    def test_models_do_not_mix(self, tmp_path):
+        """Entries are scoped to the model id."""
+        calls = []
+        PersistentEmbeddingCache(str(tmp_path), "model-a").get_or_encode(["x"], fake_encode(calls))
+
+        other = PersistentEmbeddingCache(str(tmp_path), "model-b")
+        _, missing = other.get_many(["x"])
+
+        assert missing == [0]
+
+    def test_prune_drops_stale_entries_and_shards(self, tmp_path):
+        """Entries of texts no longer ingested are dropped; shards nothing references are deleted."""
+        calls = []
+        cache = PersistentEmbeddingCache(str(tmp_path), "test/model")
+        cache.get_or_encode(["old"], fake_encode(calls))
+        cache.get_or_encode(["kept"], fake_encode(calls))
+
+        cache.prune(["kept"])
+
+        reloaded = PersistentEmbeddingCache(str(tmp_path), "test/model")
+        _, missing = reloaded.get_many(["old", "kept"])
+        assert missing == [0]
+        assert len(list(cache.path.glob("shard_*.npy"))) == 1
+
+    def test_compaction_keeps_live_rows(self, tmp_path, monkeypatch):
+        """Many small shards are rewritten into one without losing or changing entries."""
+        monkeypatch.setattr(PersistentEmbeddingCache, "MAX_SHARDS", 3)
+        calls = []
+        cache = PersistentEmbeddingCache(str(tmp_path), "test/model")
+        texts = [f"text {i}" for i in range(6)]
+        for text in texts:
+            cache.get_or_encode([text], fake_encode(calls))
+
+        before = cache.get_or_encode(texts, fake_encode(calls))
+        cache.prune(texts)
+
+        reloaded = PersistentEmbeddingCache(str(tmp_path), "test/model")
+        assert len(list(cache.path.glob("shard_*.npy"))) == 1
+        assert reloaded.num_shards == 1
+        assert np.array_equal(reloaded.get_or_encode(texts, fake_encode(calls)), before)
+        assert len(calls) == 6
@@ -0,0 +1,132 @@
+"""Unit tests for the shared embedding service."""
+import threading
+
+import numpy as np
+import pytest
+
+from src.rag.embeddings import EmbeddingService, load_sentence_transformer
+from src.utils.config import config
+
+
+class FakeModel:
+    """Deterministic stand-in for SentenceTransformer."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(len(texts))
+        return np.array([[len(t), 1.0, 0.0, 0.0] for t in texts], dtype=np.float32)
+
+
+class TestEmbeddingService:
+    """Test micro-batched encoding."""
+
+    def test_single_text_returns_vector(self):
+        """A single string returns a 1-D vector."""
+        service = EmbeddingService(model=FakeModel(), batch_size=8, max_wait_ms=1)
+
+        vector = service.encode("abc")
+
+        assert vector.shape == (4,)
+        assert vector[0] == 3
+
+    def test_bulk_encode_bypasses_queue(self):
+        """Lists at or above batch size are encoded directly."""
+        model = FakeModel()
+        service = EmbeddingService(model=model, batch_size=2, max_wait_ms=1)
+
+        embeddings = service.encode(["a", "bb", "ccc"])
+
+        assert embeddings.shape == (3, 4)
+        assert model.calls == [3]
+
+    def test_concurrent_requests_are_batched(self):
+        """Concurrent single-text calls share forward passes."""
+        model = FakeModel()
+        service = EmbeddingService(model=model, batch_size=64, max_wait_ms=50)
+
+        results = {}
+        barrier = threading.Barrier(16)
+
+        def worker(i):
+            barrier.wait()
+            results[i] = service.encode("x" * (i + 1))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Every caller gets its own embedding back
+        assert all(results[i][0] == i + 1 for i in range(16))
+        # ...but the model ran fewer times than there were requests
+        assert len(model.calls) < 16
+        assert sum(model.calls) == 16
+
+    def test_empty_input(self):
+        """Empty list returns an empty matrix."""
+        service = EmbeddingService(model=FakeModel(), batch_size=8, max_wait_ms=1)
+
+        assert service.encode([]).shape == (0, 4)
+
+    def test_output_options_rejected(self):
+        """Per-call output options are refused instead of being silently ignored."""
+        service = EmbeddingService(model=FakeModel(), max_wait_ms=1)
+
+        with pytest.raises(TypeError):
+            service.encode("abc", normalize_embeddings=False)
+
+
+class TestEmbeddingBackends:
+    """Test backend selection and ONNX parity with PyTorch."""
+
+    TEXTS = [
+        "Find the derivative of x^2 sin(x).",
+        "Quadratic formula: x = (-b ± sqrt(b^2 - 4ac)) / 2a",
+        "P(A|B) = P(B|A) P(A) / P(B)",
+        "Evaluate the integral of e^x cos(x) dx by parts.",
+    ]
+
+    def test_cache_key_separates_backends(self):
+        """ONNX/int8 embeddings are cached apart from PyTorch ones."""
+        torch_service = EmbeddingService(model=FakeModel(), model_name="m")
+        int8_service = EmbeddingService(model=FakeModel(), model_name="m", backend="onnx-int8")
+
+        assert torch_service.cache_key == "m"
+        assert int8_service.cache_key == "m@onnx-int8"
+
+    def test_cache_key_separates_normalization(self):
+        """Unnormalized embeddings are cached apart from normalized ones."""
+        normalized = EmbeddingService(model=FakeModel(), model_name="m", normalize=True)
+        raw = EmbeddingService(model=FakeModel(), model_name="m", normalize=False, backend="onnx")
+
+        assert normalized.cache_key == "m"
+        assert raw.cache_key == "m@onnx+raw"
+
+    def test_unknown_backend_rejected(self):
+        """An unsupported backend name raises ValueError."""
+        with pytest.raises(ValueError):
+            load_sentence_transformer("m", "tensorrt")
+
+    def test_onnx_parity(self, tmp_path, monkeypatch):
+        """ONNX and int8 ONNX embeddings agree with PyTorch (cosine)."""
+        pytest.importorskip("optimum.onnxruntime")
+        monkeypatch.setattr(config, "EMBEDDING_ONNX_PATH", str(tmp_path))
+
+        def encode(model):
+            return np.asarray(model.encode(self.TEXTS, normalize_embeddings=True), dtype=np.float32)
+
+        try:
+            reference = encode(load_sentence_transformer(config.EMBEDDING_MODEL, "torch")[0])
+        except OSError as e:
+            pytest.skip(f"Embedding model unavailable: {e}")
+
+        for backend, threshold in (("onnx", 0.999), ("onnx-int8", 0.97)):
+            model, loaded = load_sentence_transformer(config.EMBEDDING_MODEL, backend)
+            assert loaded == backend
+            assert np.einsum('ij,ij->i', encode(model), reference).min() >= threshold
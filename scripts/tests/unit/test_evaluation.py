@@ -0,0 +1,47 @@
+"""Unit tests for retrieval evaluation metrics."""
+from pathlib import Path
+
+import pytest
+
+from src.rag.evaluation import build_query_set, latency_summary, ndcg_at_k, recall_at_k, reciprocal_rank
+
+
+KB_PATH = Path(__file__).resolve().parents[3] / "knowledge_base"
+
+
+class TestMetrics:
+    """Test ranking metrics against hand-computed values."""
+
+    def test_ranking_metrics(self):
+        """Recall, MRR and nDCG of a ranking with relevant chunks at ranks 2 and 3."""
+        ranked = ["a", "b", "c", "d"]
+        relevant = {"b", "c", "z"}
+
+        assert recall_at_k(ranked, relevant, 2) == 0.5
+        assert recall_at_k(ranked, relevant, 4) == pytest.approx(2 / 3)
+        assert reciprocal_rank(ranked, relevant) == 0.5
+        assert reciprocal_rank(["a"], relevant) == 0.0
+        assert ndcg_at_k(["b", "c", "z"], relevant, 3) == pytest.approx(1.0)
+        assert 0 < ndcg_at_k(ranked, relevant, 3) < 1
+
+    def test_latency_summary(self):
+        """Percentiles and throughput from per-query latencies."""
+        summary = latency_summary([10.0] * 99 + [110.0])
+
+        assert summary["p50_ms"] == 10.0
+        assert summary["p99_ms"] > 10.0
+        assert summary["throughput_qps"] == pytest.approx(1000 * 100 / 1100, abs=0.1)
+
+
+class TestQuerySet:
+    """Test labelled queries built from the bundled knowledge base."""
+
+    def test_examples_become_labelled_queries(self):
+        """Every query is an example problem labelled with its topic's formulas/templates."""
+        queries = build_query_set(KB_PATH)
+
+        assert queries
+        for labelled in queries:
+            assert labelled["query"]
+            assert labelled["relevant"]
+            assert all(not doc_id.startswith("example_") for doc_id in labelled["relevant"])
@@ -0,0 +1,85 @@
+"""Unit tests for rank fusion strategies."""
+import pytest
+
+from src.rag.fusion import Hit, fuse
+
+
+def dense_hits(*pairs):
+    return [Hit(doc_id, doc_id, {}, dense_score=score, dense_rank=rank)
+            for rank, (doc_id, score) in enumerate(pairs, 1)]
+
+
+def sparse_hits(*pairs):
+    return [Hit(doc_id, doc_id, {}, sparse_score=score, sparse_rank=rank)
+            for rank, (doc_id, score) in enumerate(pairs, 1)]
+
+
+class TestRRF:
+    """Test weighted reciprocal rank fusion."""
+
+    def test_scores_by_rank(self):
+        """Score is the weighted sum of 1 / (k + rank)."""
+        hits = fuse(dense_hits(("a", 0.9), ("b", 0.8)), sparse_hits(("b", 7.0)), top_k=2,
+                    strategy="rrf", dense_weight=0.7, sparse_weight=0.3, rrf_k=60)
+
+        scores = {hit.id: hit.score for hit in hits}
+        assert scores["b"] == pytest.approx(0.7 / 62 + 0.3 / 61)
+        assert scores["a"] == pytest.approx(0.7 / 61)
+
+    def test_merges_by_id(self):
+        """A chunk returned by both retrievers appears once with both scores."""
+        hits = fuse(dense_hits(("a", 0.9)), sparse_hits(("a", 5.0)), top_k=5, strategy="rrf")
+
+        assert len(hits) == 1
+        assert (hits[0].dense_score, hits[0].sparse_score) == (0.9, 5.0)
+
+    def test_top_k(self):
+        """Only top_k hits are returned."""
+        hits = fuse(dense_hits(("a", 0.9), ("b", 0.8), ("c", 0.7)), [], top_k=2, strategy="rrf")
+
+        assert [hit.id for hit in hits] == ["a", "b"]
+
+
+class TestScoreFusion:
+    """Test CombSUM / CombMNZ."""
+
+    def test_combsum_normalizes_scores(self):
+        """Each list is min-max normalized before weighting."""
+        hits = fuse(dense_hits(("a", 0.9), ("b", 0.5)), sparse_hits(("b", 12.0), ("c", 2.0)), top_k=3,
+                    strategy="combsum", dense_weight=0.5, sparse_weight=0.5)
+
+        scores = {hit.id: hit.score for hit in hits}
+        assert scores == pytest.approx({"a": 0.5, "b": 0.5, "c": 0.0})
+
+    def test_combmnz_rewards_agreement(self):
+        """Chunks found by both retrievers are multiplied by two."""
+        hits = fuse(dense_hits(("a", 0.9), ("b", 0.5)), sparse_hits(("b", 12.0), ("c", 2.0)), top_k=3,
+                    strategy="combmnz", dense_weight=0.5, sparse_weight=0.5)
+
+        assert hits[0].id == "b"
+        assert hits[0].score == pytest.approx(1.0)
+
+
+class TestBypass:
+    """Test single-retriever strategies."""
+
+    def test_dense_only(self):
+        """Dense strategy keeps the dense ranking and scores."""
+        hits = fuse(dense_hits(("a", 0.9), ("b", 0.8)), [], top_k=2, strategy="dense")
+
+        assert [(hit.id, hit.score) for hit in hits] == [("a", 0.9), ("b", 0.8)]
+
+    def test_unknown_strategy(self):
+        """Unknown strategy names are rejected."""
+        with pytest.raises(ValueError):
+            fuse([], [], top_k=1, strategy="borda")
+
+    def test_to_dict(self):
+        """Hits convert to the hybrid_search result shape."""
+        hit = fuse([], sparse_hits(("a", 3.0)), top_k=1, strategy="sparse")[0]
+
+        assert hit.to_dict() == {
+            "id": "a", "text": "a", "metadata": {},
+            "hybrid_score": 3.0, "dense_score": 0.0, "sparse_score": 3.0,
+            "dense_rank": 0, "sparse_rank": 1
+        }
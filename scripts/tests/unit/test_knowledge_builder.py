@@ -0,0 +1,247 @@
+"""Unit tests for knowledge base chunking and ingestion bookkeeping."""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.rag import knowledge_builder as knowledge_builder_module
+from src.rag.chunking import join_parts
+from src.rag.knowledge_builder import (
+    MANIFEST_NAME,
+    IngestionStats,
+    _parse_files,
+    build_knowledge_base,
+    chunk_id,
+    load_formula_chunks,
+    load_template_chunks,
+    load_manifest,
+    save_manifest,
+)
+from src.rag.vector_store import VectorStore
+from src.utils.config import config
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch, hash_embeddings):
+    """A small knowledge base and an empty vector store path, embedded with HashModel."""
+    kb_path = tmp_path / "kb"
+    (kb_path / "formulas").mkdir(parents=True)
+    (kb_path / "templates").mkdir()
+    (kb_path / "examples").mkdir()
+    for topic in ("algebra", "probability"):
+        formulas = [{"id": f"{topic}{i}", "name": f"{topic} rule {i}", "formula": f"x{i} = y{i}"} for i in range(3)]
+        (kb_path / "formulas" / f"{topic}.json").write_text(json.dumps({"formulas": formulas}))
+        (kb_path / "templates" / f"{topic}_template.md").write_text(f"# {topic}\nIntro\n## Method\nSolve {topic} problems.")
+        (kb_path / "examples" / f"{topic}_examples.md").write_text(
+            f"# Examples\n## Example 1: First\n**Problem:** {topic} one\n## Example 2: Second\n**Problem:** {topic} two"
+        )
+
+    monkeypatch.setattr(config, "KNOWLEDGE_BASE_PATH", str(kb_path))
+    monkeypatch.setattr(config, "VECTOR_STORE_PATH", str(tmp_path / "store"))
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_ENABLED", False)
+    return kb_path
+
+
+class TestChunkIds:
+    """Test content-addressed chunk IDs."""
+
+    def test_ids_are_stable(self):
+        """Same source and text always give the same ID."""
+        assert chunk_id("formula", "a.json", "x") == chunk_id("formula", "a.json", "x")
+        assert chunk_id("formula", "a.json", "x") != chunk_id("formula", "b.json", "x")
+
+    def test_adding_formula_keeps_other_ids(self, tmp_path):
+        """Inserting a formula does not shift IDs of the others."""
+        path = tmp_path / "algebra.json"
+        first = {"id": "f1", "name": "A", "formula": "a=b"}
+        second = {"id": "f2", "name": "B", "formula": "c=d"}
+
+        path.write_text(json.dumps({"formulas": [second]}))
+        before = {c["metadata"]["id"]: c["id"] for c in load_formula_chunks(path)}
+
+        path.write_text(json.dumps({"formulas": [first, second]}))
+        after = {c["metadata"]["id"]: c["id"] for c in load_formula_chunks(path)}
+
+        assert before["f2"] == after["f2"]
+
+    def test_template_sections(self, tmp_path):
+        """Templates split into overview + one chunk per H2 section."""
+        path = tmp_path / "probability_template.md"
+        path.write_text("# Title\nIntro\n## Bayes\nUse Bayes.\n## Counting\nCount.")
+
+        chunks = load_template_chunks(path)
+
+        assert [c["metadata"]["type"] for c in chunks] == [
+            "template_overview", "template_method", "template_method"
+        ]
+        assert chunks[1]["metadata"]["section"] == "Bayes"
+
+    def test_long_section_split(self, tmp_path, monkeypatch):
+        """Sections over the chunk size are split into parts of one parent; short ones keep their ID."""
+        monkeypatch.setattr(config, "CHUNK_SIZE", 40)
+        monkeypatch.setattr(config, "CHUNK_OVERLAP", 0)
+        steps = "\n".join(f"**Step {i}:** expand the product and collect like terms" for i in range(8))
+        path = tmp_path / "algebra_template.md"
+        path.write_text(f"# Title\nIntro\n## Short\nOne line.\n## Long\n{steps}")
+
+        chunks = load_template_chunks(path)
+        parts = [c for c in chunks if c["metadata"].get("section") == "Long"]
+
+        assert chunks[1]["id"] == chunk_id("template", path.name, "Method: Short\nTopic: algebra\n\nOne line.")
+        assert "parent_id" not in chunks[1]["metadata"]
+        assert len(parts) > 1
+        assert {p["metadata"]["parent_id"] for p in parts} == {parts[0]["metadata"]["parent_id"]}
+        assert [p["metadata"]["part"] for p in parts] == list(range(len(parts)))
+        assert join_parts(parts) == f"Method: Long\nTopic: algebra\n\n{steps}"
+
+
+class TestManifest:
+    """Test ingestion manifest persistence."""
+
+    def test_roundtrip(self, tmp_path):
+        """Saved manifest loads back unchanged."""
+        path = tmp_path / "kb_manifest.json"
+        manifest = {"files": {"formulas/a.json": {"mtime": 1.0, "sha256": "abc", "chunk_ids": ["formula_1"]}}}
+
+        save_manifest(manifest, path)
+
+        assert load_manifest(path) == manifest
+
+    def test_missing_manifest(self, tmp_path):
+        """A missing manifest means nothing was ingested yet."""
+        assert load_manifest(tmp_path / "none.json") == {"files": {}}
+
+
+class TestIncrementalIngestion:
+    """Test incremental ingestion against a persisted store."""
+
+    def test_no_bm25_rebuild_on_incremental_run(self, kb, monkeypatch):
+        """Changed chunks update the loaded BM25 index in place instead of rebuilding it."""
+        build_knowledge_base()
+
+        builds = []
+        build = VectorStore._build_bm25
+        monkeypatch.setattr(VectorStore, "_build_bm25", lambda self, *args: builds.append(1) or build(self, *args))
+        path = kb / "formulas" / "algebra.json"
+        formulas = json.loads(path.read_text())["formulas"] + [{"id": "new", "name": "Vieta", "formula": "zeta = 1"}]
+        path.write_text(json.dumps({"formulas": formulas}))
+
+        vs = build_knowledge_base(incremental=True)
+
+        assert builds == []
+        assert vs.bm25_in_sync()
+        assert vs.bm25_retriever.search("vieta zeta", top_k=1)[0][0]["metadata"]["id"] == "new"
+        assert VectorStore(background_bm25=False).bm25_in_sync()
+
+    def test_edited_split_section_matches_full_rebuild(self, kb, tmp_path, monkeypatch):
+        """Unchanged parts of an edited split section get the section's new parent_id and parts."""
+        monkeypatch.setattr(config, "CHUNK_SIZE", 40)
+        monkeypatch.setattr(config, "CHUNK_OVERLAP", 0)
+        steps = "\n".join(f"**Step {i}:** expand the product and collect like terms" for i in range(8))
+        path = kb / "templates" / "algebra_template.md"
+        path.write_text(f"# algebra\nIntro\n## Method\n{steps}")
+        build_knowledge_base()
+
+        path.write_text(f"# algebra\nIntro\n## Method\n{steps}\n**Step 8:** check the answer by substitution")
+        incremental = build_knowledge_base(incremental=True).backend.get()
+
+        monkeypatch.setattr(config, "VECTOR_STORE_PATH", str(tmp_path / "full"))
+        full = build_knowledge_base().backend.get()
+
+        def by_id(records):
+            return dict(zip(records["ids"], records["metadatas"]))
+
+        parts = [meta for meta in by_id(full).values() if "parent_id" in meta]
+        assert len({meta["parent_id"] for meta in parts}) == 1 and len(parts) > 1
+        assert by_id(incremental) == by_id(full)
+
+
+def slow_loader(path):
+    """Loader whose later files finish first (file i sleeps (5 - i) * 10 ms)."""
+    index = int(path.stem)
+    time.sleep((5 - index) * 0.01)
+    return [{"id": path.stem, "text": path.read_text(), "metadata": {}}]
+
+
+class CountingPool(ThreadPoolExecutor):
+    """In-process stand-in for ProcessPoolExecutor counting submitted tasks."""
+
+    submitted = 0
+
+    def submit(self, fn, *args, **kwargs):
+        type(self).submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+class BreakingPool(CountingPool):
+    """Pool whose worker processes die after two tasks."""
+
+    def submit(self, fn, *args, **kwargs):
+        if type(self).submitted >= 2:
+            raise BrokenProcessPool("worker died")
+        return super().submit(fn, *args, **kwargs)
+
+
+class TestParallelIngestion:
+    """Test parsing in a process pool."""
+
+    @pytest.fixture
+    def files(self, tmp_path):
+        paths = []
+        for i in range(6):
+            path = tmp_path / f"{i}.txt"
+            path.write_text(f"file {i}")
+            paths.append((path, slow_loader))
+        return paths
+
+    def test_workers_produce_identical_ingestion(self, kb, tmp_path, monkeypatch):
+        """Two workers store the same chunk IDs and manifest as one."""
+        results = {}
+        for workers in (1, 2):
+            store_path = tmp_path / f"store_{workers}"
+            monkeypatch.setattr(config, "VECTOR_STORE_PATH", str(store_path))
+            vs = build_knowledge_base(workers=workers)
+            results[workers] = (sorted(vs.backend.ids()), load_manifest(store_path / MANIFEST_NAME))
+
+        assert results[1][0]
+        assert results[2] == results[1]
+
+    def test_results_in_input_order(self, files, monkeypatch):
+        """Files finishing out of order are still yielded in input order."""
+        monkeypatch.setattr(knowledge_builder_module, "ProcessPoolExecutor", CountingPool)
+
+        parsed = [path for path, _ in _parse_files(files, 3, IngestionStats())]
+
+        assert parsed == [path for path, _ in files]
+
+    def test_in_flight_files_bounded(self, files, monkeypatch):
+        """At most 2 * workers files are submitted ahead of the consumer."""
+        CountingPool.submitted = 0
+        monkeypatch.setattr(knowledge_builder_module, "ProcessPoolExecutor", CountingPool)
+
+        for consumed, _ in enumerate(_parse_files(files, 2, IngestionStats())):
+            assert CountingPool.submitted - consumed <= 4
+
+        assert CountingPool.submitted == len(files)
+
+    def test_serial_fallback_when_pool_cannot_start(self, files, monkeypatch):
+        """Without a process pool, files are parsed in-process."""
+        def unavailable(max_workers):
+            raise OSError("no semaphores")
+        monkeypatch.setattr(knowledge_builder_module, "ProcessPoolExecutor", unavailable)
+
+        parsed = list(_parse_files(files, 2, IngestionStats()))
+
+        assert [path for path, _ in parsed] == [path for path, _ in files]
+        assert [chunks[0]["text"] for _, chunks in parsed] == [f"file {i}" for i in range(6)]
+
+    def test_serial_fallback_when_pool_breaks(self, files, monkeypatch):
+        """Files not yet yielded when the pool breaks are parsed serially, in order."""
+        BreakingPool.submitted = 0
+        monkeypatch.setattr(knowledge_builder_module, "ProcessPoolExecutor", BreakingPool)
+
+        parsed = [path for path, _ in _parse_files(files, 2, IngestionStats())]
+
+        assert parsed == [path for path, _ in files]
@@ -0,0 +1,70 @@
+"""Unit tests for topic-partitioned sub-indexes."""
+import numpy as np
+
+from src.rag.partitions import TopicPartitions, normalize_topic
+
+
+ALIASES = {"calculus": ["integral_calculus", "applications_of_derivatives"]}
+
+
+def fingerprint(doc_ids):
+    return ",".join(sorted(doc_ids))
+
+
+def build(dense=True):
+    partitions = TopicPartitions(ALIASES, dense=dense)
+    topics = ["integral_calculus", "applications_of_derivatives", "probability", None]
+    ids = [f"doc{i}" for i in range(8)]
+    metadatas = [{"type": "formula", "topic": topics[i % 4]} if topics[i % 4] else {"type": "formula"} for i in range(8)]
+    texts = [f"{(m.get('topic') or 'misc').replace('_', ' ')} chunk {i}" for i, m in enumerate(metadatas)]
+    vectors = np.random.default_rng(0).normal(size=(8, 8)).astype(np.float32)
+    partitions.add(ids, vectors, texts, metadatas)
+    return partitions, ids, texts, metadatas, vectors
+
+
+class TestTopicPartitions:
+    """Test partition membership, updates and BM25 persistence."""
+
+    def test_membership_and_aliases(self):
+        """Chunks join their own topic and every alias covering it; untopiced chunks join none."""
+        partitions, _, _, _, _ = build()
+
+        assert set(partitions.partitions) == {"calculus", "integral_calculus", "applications_of_derivatives", "probability"}
+        assert partitions.resolve("Calculus").ids == {"doc0", "doc1", "doc4", "doc5"}
+        assert partitions.resolve("probability").where == {"topic": {"$in": ["probability"]}}
+        assert partitions.resolve("geometry") is None
+        assert normalize_topic(" Linear Algebra ") == "linear_algebra"
+
+    def test_dense_search_stays_in_partition(self):
+        """Dense sub-index only returns the partition's chunks."""
+        partitions, _, _, _, vectors = build()
+
+        results = partitions.resolve("calculus").dense.query(vectors[2], top_k=10)
+
+        assert {r["id"] for r in results} == {"doc0", "doc1", "doc4", "doc5"}
+
+    def test_upsert_moves_between_partitions(self):
+        """Replacing a chunk with a new topic moves it; emptied partitions are dropped."""
+        partitions, _, _, _, vectors = build()
+        partitions.build_bm25([])
+
+        partitions.add(["doc2"], vectors[2:3], ["now calculus"], [{"topic": "integral_calculus"}])
+        partitions.delete(["doc6"])
+
+        assert "doc2" in partitions.resolve("calculus").ids
+        assert partitions.resolve("probability") is None
+        assert partitions.resolve("calculus").bm25.search("now calculus", top_k=1)[0][0]["id"] == "doc2"
+
+    def test_bm25_persistence(self, tmp_path):
+        """Saved BM25 sub-indexes load back; a changed partition forces a rebuild."""
+        partitions, ids, texts, metadatas, vectors = build(dense=False)
+        partitions.build_bm25([{"id": i, "text": t, "metadata": m} for i, t, m in zip(ids, texts, metadatas)])
+        partitions.save_bm25(tmp_path, fingerprint)
+
+        reopened, _, _, _, _ = build(dense=False)
+        assert reopened.load_bm25(tmp_path, fingerprint)
+        assert reopened.resolve("calculus").dense is None
+        assert reopened.resolve("probability").bm25.search("probability chunk", top_k=5)[0][0]["id"] in {"doc2", "doc6"}
+
+        reopened.delete(["doc2"])
+        assert not reopened.load_bm25(tmp_path, fingerprint)
@@ -0,0 +1,40 @@
+"""Unit tests for BM25 query expansion."""
+import networkx as nx
+
+from src.rag.bm25_retriever import BM25Retriever, tokenize
+from src.rag.query_expansion import QueryExpander
+
+
+class TestQueryExpander:
+    """Test precomputed synonym and concept expansions."""
+
+    def test_synonyms_are_weighted_and_capped(self):
+        """Synonyms get the synonym weight, at most max_synonyms per concept."""
+        expander = QueryExpander(synonyms=[["derivative", "differentiate", "d/dx", "slope"]], max_synonyms=2)
+
+        weights = expander.expand(tokenize("derivative of derivative"))
+
+        assert weights == {"derivative": 2, "of": 1, "differentiate": 0.5, "dx": 0.5}
+
+    def test_concept_graph_neighbours(self):
+        """Direct graph neighbours expand multi-word concepts at the concept weight."""
+        graph = nx.DiGraph([("algebra", "linear_algebra"), ("linear_algebra", "vectors"), ("vectors", "3d_geometry")])
+        expander = QueryExpander(synonyms=[], concept_graph=graph)
+
+        weights = expander.expand(tokenize("Linear algebra problem"))
+
+        assert weights["vectors"] == 0.25
+        assert "3d" not in weights
+        assert weights["algebra"] == 1
+
+    def test_bm25_matches_through_synonym(self):
+        """A query sharing no term with a chunk finds it through an expansion."""
+        retriever = BM25Retriever([
+            {"id": "a", "text": "differentiate both sides"},
+            {"id": "b", "text": "sum of the roots"},
+        ])
+        expander = QueryExpander(synonyms=[["derivative", "differentiate"]])
+
+        assert retriever.search("derivative", top_k=1) == []
+        assert retriever.search("derivative", top_k=1, expander=expander)[0][0]["id"] == "a"
+        assert retriever.search_batch(["derivative"], top_k=1, expander=expander)[0][0][0]["id"] == "a"
@@ -0,0 +1,63 @@
+"""Unit tests for the cross-encoder reranker."""
+import threading
+
+from src.rag.reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by word overlap; records every forward pass."""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+        self.release = threading.Event()
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(list(pairs))
+        if self.delay:
+            self.release.wait(self.delay)
+        return [len(set(q.lower().split()) & set(t.lower().split())) for q, t in pairs]
+
+
+DOCS = [
+    {"id": "a", "text": "Quadratic formula for roots", "metadata": {}},
+    {"id": "b", "text": "Chain rule for derivative of composite functions", "metadata": {}},
+    {"id": "c", "text": "Derivative power rule", "metadata": {}},
+]
+
+
+class TestReranker:
+    """Test reranking, caching and the latency budget."""
+
+    def test_orders_by_cross_encoder_score(self):
+        """Documents are reordered by score and cut to top_n."""
+        reranker = CrossEncoderReranker(model=FakeCrossEncoder(), top_n=2, budget_ms=0, cache_size=100)
+
+        results = reranker.rerank("chain rule derivative", DOCS)
+
+        assert [d["id"] for d in results] == ["b", "c"]
+        assert results[0]["rerank_score"] == 3
+
+    def test_single_batched_pass_and_cache(self):
+        """All pairs go through one forward pass; repeats are served from cache."""
+        model = FakeCrossEncoder()
+        reranker = CrossEncoderReranker(model=model, top_n=3, budget_ms=0, cache_size=100)
+
+        reranker.rerank("chain rule derivative", DOCS)
+        reranker.rerank("chain  rule derivative", DOCS)
+
+        assert len(model.calls) == 1
+        assert len(model.calls[0]) == 3
+        assert reranker.cache_stats()["hits"] == 3
+
+    def test_budget_falls_back_to_fused_order(self):
+        """A slow forward pass keeps the fused order."""
+        model = FakeCrossEncoder(delay=5.0)
+        reranker = CrossEncoderReranker(model=model, top_n=2, budget_ms=20, cache_size=100)
+
+        results = reranker.rerank("chain rule derivative", DOCS)
+        model.release.set()
+
+        assert [d["id"] for d in results] == ["a", "b"]
+        assert "rerank_score" not in results[0]
+        assert reranker.stats["fallbacks"] == 1
@@ -0,0 +1,261 @@
+"""Unit tests for VectorStore query paths."""
+import threading
+
+import numpy as np
+import pytest
+
+from src.rag import vector_store as vector_store_module
+from src.rag.bm25_retriever import BM25Retriever
+from src.rag.vector_store import VectorStore
+from src.utils.config import config
+
+
+TEXTS = [
+    "derivative of a product uses the product rule",
+    "integral of sin x is minus cos x",
+    "probability of independent events multiplies",
+    "quadratic formula solves ax^2 + bx + c = 0",
+]
+METADATAS = [
+    {"type": "formula", "topic": "calculus"},
+    {"type": "formula", "topic": "calculus"},
+    {"type": "formula", "topic": "probability"},
+    {"type": "template", "topic": "algebra"},
+]
+IDS = [f"doc{i}" for i in range(len(TEXTS))]
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch, hash_embeddings):
+    """A populated collection with no BM25 index on disk."""
+    monkeypatch.setattr(config, "VECTOR_STORE_PATH", str(tmp_path))
+
+    VectorStore(background_bm25=False).add_documents(TEXTS, METADATAS, IDS)
+    return tmp_path
+
+
+class CountingBM25(BM25Retriever):
+    """BM25Retriever that counts builds and can be held back."""
+
+    builds = 0
+    release = threading.Event()
+
+    def __init__(self, documents, *args, **kwargs):
+        type(self).builds += 1
+        type(self).release.wait(5)
+        super().__init__(documents, *args, **kwargs)
+
+
+@pytest.fixture
+def counting_bm25(monkeypatch):
+    CountingBM25.builds = 0
+    CountingBM25.release = threading.Event()
+    monkeypatch.setattr(vector_store_module, "BM25Retriever", CountingBM25)
+    return CountingBM25
+
+
+class TestBM25Build:
+    """Test lazy, single-flight BM25 construction."""
+
+    def test_dense_only_until_background_build_finishes(self, store_path, counting_bm25):
+        """Queries during the background build are dense-only and flagged; later ones are hybrid."""
+        store = VectorStore(background_bm25=True)
+
+        results = store.hybrid_search("product rule derivative", top_k=2)
+        assert results and all(doc["dense_only"] for doc in results)
+
+        counting_bm25.release.set()
+        assert store.wait_for_bm25(timeout=5)
+
+        results = store.hybrid_search("product rule derivative", top_k=2)
+        assert results[0]["id"] == "doc0"
+        assert "dense_only" not in results[0]
+        assert counting_bm25.builds == 1
+
+    def test_dense_only_scores_keep_fusion_scale(self, store_path, counting_bm25, monkeypatch):
+        """Dense-only results are fused like hybrid ones, so thresholds on hybrid_score still apply."""
+        monkeypatch.setattr(config, "FUSION_STRATEGY", "rrf")
+        store = VectorStore(background_bm25=True)
+
+        dense_only = store.hybrid_search("product rule derivative", top_k=3)
+        counting_bm25.release.set()
+        assert store.wait_for_bm25(timeout=5)
+        hybrid = store.hybrid_search("product rule derivative", top_k=3)
+
+        ceiling = 1.0 / (config.RRF_K + 1)
+        for results in (dense_only, hybrid):
+            assert results and all(0 < doc["hybrid_score"] <= ceiling for doc in results)
+        assert dense_only[0]["hybrid_score"] == pytest.approx(0.7 / (config.RRF_K + 1))
+
+    def test_concurrent_queries_share_one_build(self, store_path, counting_bm25):
+        """Without background builds, concurrent first queries wait for a single build."""
+        store = VectorStore(background_bm25=False)
+        threads = [
+            threading.Thread(target=store.hybrid_search, args=("integral of sin",))
+            for _ in range(8)
+        ]
+
+        for thread in threads:
+            thread.start()
+        counting_bm25.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert counting_bm25.builds == 1
+        assert store.hybrid_search("integral of sin", top_k=1)[0]["id"] == "doc1"
+
+    def test_write_during_build_triggers_rebuild(self, store_path, counting_bm25):
+        """Documents added while the index is being built are not lost."""
+        store = VectorStore(background_bm25=True)
+
+        store.add_documents(["binomial coefficient counts combinations"], [{"type": "formula"}], ["doc4"])
+        counting_bm25.release.set()
+        assert store.wait_for_bm25(timeout=5)
+
+        assert "doc4" in store.bm25_retriever.ids()
+
+    def test_stores_on_one_collection_share_one_build(self, store_path, counting_bm25, monkeypatch):
+        """A second store on the collection neither starts its own build nor misses the first one's."""
+        monkeypatch.setattr(config, "TOPIC_PARTITIONS_ENABLED", True)
+        first = VectorStore(background_bm25=True)
+        second = VectorStore(background_bm25=True)
+
+        assert not second.start_bm25_build()
+        counting_bm25.release.set()
+        assert second.wait_for_bm25(timeout=5)
+
+        results = second.hybrid_search("integral of sin", top_k=1, topic="calculus")
+        assert results[0]["id"] == "doc1"
+        assert "dense_only" not in results[0]
+        assert second.bm25_retriever is first.bm25_retriever
+        assert counting_bm25.builds == 1
+
+
+class TestResultCache:
+    """Test the hybrid result cache."""
+
+    def test_repeated_query_is_cached(self, store_path):
+        """Identical queries (up to whitespace) are served from the cache as copies."""
+        store = VectorStore(background_bm25=False)
+        hits = store.cache_stats()["results"]["hits"]
+
+        first = store.hybrid_search("product rule  derivative", top_k=2)
+        first[0]["rerank_score"] = 1.0
+        second = store.hybrid_search(" product rule derivative", top_k=2)
+
+        assert store.cache_stats()["results"]["hits"] == hits + 1
+        assert [doc["id"] for doc in second] == [doc["id"] for doc in first]
+        assert "rerank_score" not in second[0]
+
+    def test_write_invalidates(self, store_path):
+        """Adding documents bumps the version, so later queries see them."""
+        store = VectorStore(background_bm25=False)
+        query = "binomial coefficient combinations"
+        before = store.hybrid_search(query, top_k=1)
+        version = store.version
+
+        store.add_documents(["binomial coefficient counts combinations"], [{"type": "formula"}], ["doc4"])
+
+        assert store.version == version + 1
+        assert store.hybrid_search(query, top_k=1)[0]["id"] == "doc4" != before[0]["id"]
+
+    def test_near_duplicate_query_reuses_diverse_results(self, store_path):
+        """A rephrasing embedding within the threshold reuses search_diverse results."""
+        store = VectorStore(background_bm25=False)
+        hits = store.cache_stats()["semantic"]["hits"]
+
+        first = store.search_diverse("derivative using the product rule", top_k=2)
+        second = store.search_diverse("using the product rule derivative", top_k=2)
+
+        assert store.cache_stats()["semantic"]["hits"] == hits + 1
+        assert [doc["id"] for doc in second] == [doc["id"] for doc in first]
+
+    def test_audited_hit_refreshes_entry(self, store_path, monkeypatch):
+        """An audited hit is recomputed and stored over its entry, not next to it."""
+        store = VectorStore(background_bm25=False)
+        store.clear_caches()
+        monkeypatch.setattr(vector_store_module._semantic_cache, "audit_every", 1)
+
+        store.search_diverse("derivative using the product rule", top_k=2)
+        store.search_diverse("using the product rule derivative", top_k=2)
+
+        assert len(vector_store_module._semantic_cache) == 1
+
+
+class TestSearchDiverse:
+    """Test MMR diversification with type quotas."""
+
+    def test_missing_quota_type_is_filled(self, store_path, monkeypatch):
+        """A quota type absent from the fetched candidates is looked up directly."""
+        monkeypatch.setattr(config, "DIVERSITY_FETCH_FACTOR", 1)
+        monkeypatch.setattr(config, "DIVERSITY_QUOTAS", {"example": 1})
+        store = VectorStore(background_bm25=False)
+        store.add_documents(["worked example: roll two dice"], [{"type": "example_solution"}], ["doc4"])
+
+        results = store.search_diverse("derivative product rule", top_k=2)
+
+        assert [doc["id"] for doc in results] == ["doc0", "doc4"]
+        assert results[1]["sparse_score"] == 0.0
+        assert results[1]["hybrid_score"] <= results[0]["hybrid_score"]
+
+    def test_adaptive_depth_keeps_sparse_only_hits(self, store_path, monkeypatch):
+        """Hits found only by BM25 are not cut by the dense score floor."""
+        monkeypatch.setattr(config, "FUSION_STRATEGY", "sparse")
+        monkeypatch.setattr(config, "ADAPTIVE_DEPTH_MIN_K", 1)
+        monkeypatch.setattr(config, "ADAPTIVE_DEPTH_MIN_GAP", 1.0)
+        monkeypatch.setattr(config, "DIVERSITY_QUOTAS", {})
+        store = VectorStore(background_bm25=False)
+        query = "derivative of integral of probability of"
+
+        fused = store.hybrid_search(query, top_k=3)
+        results = store.search_diverse(query, top_k=3, adaptive=True)
+
+        assert len(fused) == 3 and all(doc["dense_rank"] == 0 for doc in fused)
+        assert {doc["id"] for doc in results} == {doc["id"] for doc in fused}
+
+    def test_candidates_not_reencoded_without_exact_index(self, store_path, monkeypatch):
+        """MMR uses the embeddings stored in the backend rather than encoding candidates again."""
+        monkeypatch.setattr(config, "EXACT_SEARCH_MAX_DOCS", 0)
+        store = VectorStore(background_bm25=False)
+        candidates = store.hybrid_search("integral of sin", top_k=3)
+        encoded = []
+        monkeypatch.setattr(store.embedder, "encode", lambda texts, **kwargs: encoded.append(texts))
+
+        vectors = store._candidate_vectors(candidates)
+
+        assert not encoded
+        assert vectors.shape == (len(candidates), 64)
+        assert np.linalg.norm(vectors, axis=1) == pytest.approx(1.0)
+
+
+class TestMergeNeighbours:
+    """Test joining retrieved parts of split sections."""
+
+    def test_parts_merged_with_gap_fetched(self, store_path):
+        """Parts 0 and 2 of a section become one result including the unretrieved part 1."""
+        store = VectorStore(background_bm25=False)
+        header = "Method: Chain Rule\n"
+        texts = [header + "step one", header + "step one\nstep two", header + "step two\nstep three"]
+        metadatas = [
+            {"type": "template_method", "parent_id": "p", "part": i, "parts": 3, "body_start": start}
+            for i, start in enumerate([len(header), len(header) + len("step one\n"), len(header) + len("step two\n")])
+        ]
+        store.add_documents(texts, metadatas, ["part0", "part1", "part2"])
+
+        docs = [
+            {"id": "part2", "text": texts[2], "metadata": metadatas[2], "hybrid_score": 0.9},
+            {"id": "doc0", "text": TEXTS[0], "metadata": METADATAS[0], "hybrid_score": 0.8},
+            {"id": "part0", "text": texts[0], "metadata": metadatas[0], "hybrid_score": 0.7},
+        ]
+        merged = store.merge_neighbours(docs)
+
+        assert [doc["id"] for doc in merged] == ["part2", "doc0"]
+        assert merged[0]["text"] == header + "step one\nstep two\nstep three"
+        assert merged[0]["metadata"]["merged_parts"] == 3
+        assert merged[0]["hybrid_score"] == 0.9
+
+    def test_single_parts_unchanged(self, store_path):
+        """Results without sibling parts are returned as they are."""
+        docs = [{"id": "doc0", "text": TEXTS[0], "metadata": {"parent_id": "p", "part": 1, "parts": 2}}]
+
+        assert VectorStore(background_bm25=False).merge_neighbours(docs) == docs
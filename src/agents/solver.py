@@ -1,6 +1,8 @@
 """Solver agent with RAG and tools."""
 from src.agents.base import BaseAgent
 from src.rag.vector_store import VectorStore
+from src.rag.reranker import get_reranker
+from src.rag.context_packer import ContextPacker, format_doc
 from src.tools.sympy_solver import SymPySolver
 from src.tools.web_search import WebSearchTool
 from src.memory.episodic import EpisodicMemory
@@ -71,6 +73,8 @@ class SolverAgent(BaseAgent):
         self.memory = EpisodicMemory()
         # Initialize web search
         self.web_search = WebSearchTool()
+        # Fits retrieved/memory/web/tool context into per-source token budgets
+        self.packer = ContextPacker() if config.CONTEXT_PACKING_ENABLED else None
     
     def solve(self, problem: str, topic: str) -> dict:
         """Solve problem using RAG and tools."""
@@ -89,13 +93,21 @@ class SolverAgent(BaseAgent):
                     memory_context += f"\n{i}. {sim['text']} (similarity: {similarity_score:.2f})\n"
         
         # Step 2: Retrieve relevant knowledge using DIVERSE HYBRID SEARCH
-        # Ensures a mix of formulas, templates, and examples
-        docs = self.vs.search_diverse(problem, top_k=6)
+        # Ensures a mix of formulas, templates, and examples; scoped to the topic's partition
+        docs = self.vs.search_diverse(problem, top_k=6, topic=topic)
         
         # Calculate max relevance score
         max_score = max([d.get('hybrid_score', 0) for d in docs]) if docs else 0.0
         logger.info(f"Retrieved {len(docs)} documents via hybrid search (max score: {max_score:.3f})")
         
+        # Optional cross-encoder rerank: only the best reranking.top_n go into the prompt
+        reranker = get_reranker()
+        if reranker is not None:
+            docs = reranker.rerank(problem, docs)
+        
+        # Neighbouring parts of a split section are read better as one
+        docs = self.vs.merge_neighbours(docs)
+        
         # Step 3: Web search fallback if KB confidence is low
         web_search_used = False
         web_context = ""
@@ -111,12 +123,6 @@ class SolverAgent(BaseAgent):
                 web_citations = self.web_search.extract_citations(search_result)
                 logger.info(f"Web search returned {len(search_result['results'])} results")
         
-        # Step 4: Format KB context
-        context = "\n\n".join([
-            f"[{d['metadata']['type']}] {d['text']} (score: {d.get('hybrid_score', 0):.3f})"
-            for d in docs
-        ])
-        
         # Try using SymPy for certain topics
         tool_result = None
         if topic == "algebra":
@@ -126,6 +132,19 @@ class SolverAgent(BaseAgent):
                 # Extract expression (simplified for demo)
                 tool_result = "Tool: Use differentiation rules from context"
         
+        # Step 4: Format KB context, packed into the token budgets
+        context = "\n\n".join(format_doc(d) for d in docs)
+        context_report = None
+        if self.packer is not None:
+            packed = self.packer.pack(problem, docs, memory=memory_context, web=web_context, tool=str(tool_result or ""))
+            docs, context, memory_context, web_context = packed['docs'], packed['context'], packed['memory'], packed['web']
+            tool_result = packed['tool'] if tool_result is not None else None
+            context_report = packed['report']
+            logger.info(
+                f"Context packing: {context_report['tokens_before']} -> {context_report['tokens_after']} prompt tokens "
+                f"({context_report['tokens_saved']} saved)"
+            )
+        
         # Construct prompt with all available context
         prompt = f"""Problem: {problem}
 {memory_context}
@@ -154,5 +173,6 @@ CRITICAL: If the problem asks for solutions in an interval (like [0, 2π]), you
             'similar_problems': similar_problems,
             'tool_used': tool_result is not None,
             'web_search_used': web_search_used,
-            'citations': all_citations
+            'citations': all_citations,
+            'context_report': context_report
         }
@@ -2,28 +2,51 @@
 from datetime import datetime
 from pathlib import Path
 import json
-from src.rag.vector_store import VectorStore
+from src.rag.vector_store import cached_query_embedding
+from src.rag.backends.chroma_backend import ChromaBackend
+from src.rag.backends.quantized_backend import QUANTIZATION_MODES, QuantizedBackend
+from src.rag.embeddings import get_embedding_service
 from src.utils.logger import get_logger
 from src.utils.config import config
 
 logger = get_logger()
 
+
+def _chroma_backend() -> ChromaBackend:
+    return ChromaBackend(config.VECTOR_STORE_PATH, config.MEMORY_COLLECTION, metric="cosine")
+
+
 class EpisodicMemory:
     def __init__(self):
-        self.vs = VectorStore()
         # Use separate collection for memory
-        from chromadb.config import Settings
-        import chromadb
+        self.backend = self._create_backend()
+    
+    @staticmethod
+    def _create_backend():
+        """Chroma collection, or a quantized store per memory.index."""
+        if config.MEMORY_INDEX not in QUANTIZATION_MODES:
+            return _chroma_backend()
         
-        client = chromadb.PersistentClient(
-            path=config.VECTOR_STORE_PATH,
-            settings=Settings(anonymized_telemetry=False)
+        backend = QuantizedBackend(
+            Path(config.VECTOR_STORE_PATH) / "quantized" / config.MEMORY_COLLECTION,
+            config.MEMORY_COLLECTION,
+            mode=config.MEMORY_INDEX,
+            rescore_factor=config.MEMORY_RESCORE_FACTOR
         )
         
-        self.collection = client.get_or_create_collection(
-            name=config.MEMORY_COLLECTION,
-            metadata={"hnsw:space": "cosine"}
-        )
+        # First switch to quantized storage: carry over memories stored in Chroma
+        if backend.count() == 0:
+            try:
+                records = _chroma_backend().get(include_embeddings=True)
+            except Exception as e:
+                logger.warning(f"Could not read Chroma memories to migrate: {e}")
+            else:
+                if records['ids']:
+                    backend.add(records['ids'], records['embeddings'], records['documents'], records['metadatas'])
+                    backend.persist()
+                    logger.info(f"Migrated {len(records['ids'])} memories to the {config.MEMORY_INDEX} store")
+        
+        return backend
     
     def store_solution(self, problem: str, solution: str, feedback: dict = None):
         """Store solved problem in memory."""
@@ -42,40 +65,22 @@ class EpisodicMemory:
             metadata['was_correct'] = feedback.get('correct', True)
         
         # Embed and store
-        from sentence_transformers import SentenceTransformer
-        embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        embedding = embedder.encode(memory_text).tolist()
+        embedding = get_embedding_service().encode(memory_text)
         
-        self.collection.add(
-            documents=[memory_text],
-            embeddings=[embedding],
-            metadatas=[metadata],
-            ids=[doc_id]
-        )
+        self.backend.add([doc_id], embedding[None, :], [memory_text], [metadata])
         
         logger.info(f"Stored solution in memory: {doc_id}")
     
     def retrieve_similar(self, problem: str, top_k: int = 3) -> list:
         """Retrieve similar past solutions."""
-        from sentence_transformers import SentenceTransformer
-        embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        query_embedding = embedder.encode(problem).tolist()
-        
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
-        )
-        
-        if not results['documents'] or not results['documents'][0]:
-            return []
-        
-        similar = []
-        for i in range(len(results['documents'][0])):
-            similar.append({
-                'text': results['documents'][0][i],
-                'metadata': results['metadatas'][0][i],
-                'similarity': 1 - results['distances'][0][i]
-            })
+        # Goes through the shared query cache; the solver embeds the same text again
+        results = self.backend.query(cached_query_embedding(get_embedding_service(), problem), top_k)
         
-        return similar
+        return [
+            {
+                'text': doc['text'],
+                'metadata': doc['metadata'],
+                'similarity': 1 - doc['distance']
+            }
+            for doc in results
+        ]
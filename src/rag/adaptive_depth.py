@@ -0,0 +1,53 @@
+"""Per-query retrieval depth from the score distribution of the fused results."""
+from typing import List, Optional
+
+
+def choose_depth(
+    scores: List[float],
+    dense_scores: List[Optional[float]],
+    min_k: int,
+    max_k: int,
+    min_score: float = 0.3,
+    min_gap: float = 0.25
+) -> int:
+    """
+    Number of results worth keeping, between min_k and max_k.
+
+    Results whose dense (cosine) score is below min_score are cut; sparse-only
+    hits (no dense score) are kept. The depth is then cut further at the
+    largest drop in fused score, when that drop is at least min_gap of the
+    top score: the results above it stand out from the rest (with RRF, they
+    are typically the hits both retrievers agree on).
+
+    Args:
+        scores: Fused scores, best first
+        dense_scores: Dense scores of the same results (None if sparse-only)
+        min_k: Fewest results to keep (fewer only if fewer were retrieved)
+        max_k: Most results to keep
+        min_score: Dense score floor
+        min_gap: Smallest drop, relative to the top score, treated as a cut-off
+
+    Returns:
+        Depth in [min(min_k, len(scores)), min(max_k, len(scores))]
+    """
+    max_k = min(max_k, len(scores))
+    min_k = min(min_k, max_k)
+    if max_k <= min_k:
+        return max_k
+
+    # Score floor: stop at the first result below it
+    depth = max_k
+    for i, dense_score in enumerate(dense_scores[:max_k]):
+        if dense_score is not None and dense_score < min_score:
+            depth = max(min_k, i)
+            break
+
+    # Elbow: the largest relative drop between kept positions (a drop above
+    # min_k still cuts there, e.g. one near-exact match followed by noise)
+    if scores[0] > 0 and depth > min_k:
+        drops = [(scores[i - 1] - scores[i]) / scores[0] for i in range(1, depth)]
+        best = max(range(len(drops)), key=drops.__getitem__)
+        if drops[best] >= min_gap:
+            depth = max(min_k, best + 1)
+
+    return depth
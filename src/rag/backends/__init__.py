@@ -0,0 +1,46 @@
+"""Vector store backends."""
+from pathlib import Path
+
+from src.rag.backends.base import VectorBackend, matches_where
+from src.utils.logger import get_logger
+from src.utils.config import config
+
+logger = get_logger()
+
+
+def create_backend(name: str) -> VectorBackend:
+    """
+    Create the backend selected by ``vector_store.type`` in rag_config.yaml.
+
+    Falls back to ChromaDB (with a warning) when FAISS is configured but
+    faiss-cpu is not installed.
+
+    Args:
+        name: Collection name
+    """
+    backend_type = config.VECTOR_STORE_TYPE.lower()
+
+    if backend_type == 'faiss':
+        try:
+            from src.rag.backends.faiss_backend import FaissBackend
+        except ImportError:
+            logger.warning("vector_store.type is 'faiss' but faiss is not installed; using ChromaDB")
+            backend_type = 'chromadb'
+        else:
+            return FaissBackend(
+                path=Path(config.VECTOR_STORE_PATH) / "faiss" / name,
+                name=name,
+                index_type=config.FAISS_INDEX_TYPE,
+                nlist=config.FAISS_NLIST,
+                nprobe=config.FAISS_NPROBE,
+                metric=config.VECTOR_STORE_METRIC
+            )
+
+    if backend_type in ('chromadb', 'chroma'):
+        from src.rag.backends.chroma_backend import ChromaBackend
+        return ChromaBackend(config.VECTOR_STORE_PATH, name, metric=config.VECTOR_STORE_METRIC)
+
+    raise ValueError(f"Unsupported vector_store.type '{config.VECTOR_STORE_TYPE}'. Options: faiss, chromadb")
+
+
+__all__ = ["VectorBackend", "matches_where", "create_backend"]
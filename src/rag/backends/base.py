@@ -0,0 +1,125 @@
+"""Vector store backend interface."""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class VectorBackend(ABC):
+    """
+    Storage and nearest-neighbour search for embedded chunks.
+
+    A backend stores (id, embedding, text, metadata) records and answers
+    k-NN queries. Distances follow Chroma's conventions (cosine distance
+    = 1 - cosine similarity), so callers can always use 1 - distance as a
+    similarity score.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    def add(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        """Add new records."""
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        """Add records, replacing any with the same IDs."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Delete records by ID (unknown IDs are ignored)."""
+
+    @abstractmethod
+    def query(self, embedding: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[Dict]:
+        """
+        Nearest neighbours of one query embedding.
+
+        Args:
+            embedding: Query embedding
+            top_k: Number of results
+            where: Chroma-style metadata filter
+
+        Returns:
+            List of {'id', 'text', 'metadata', 'distance'} dicts, nearest first
+        """
+
+    def query_batch(self, embeddings: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        """Nearest neighbours of several query embeddings (one result list per query)."""
+        return [self.query(embedding, top_k, where=where) for embedding in embeddings]
+
+    @abstractmethod
+    def get(self, include_embeddings: bool = False) -> Dict[str, Any]:
+        """All records as {'ids', 'documents', 'metadatas'} (plus an 'embeddings' matrix if requested)."""
+
+    def vectors(self, ids: List[str]) -> Optional[np.ndarray]:
+        """Stored embeddings of records by ID, in order (None if unavailable or an ID is unknown)."""
+        return None
+
+    @abstractmethod
+    def ids(self) -> List[str]:
+        """IDs of all records."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of records."""
+
+    @abstractmethod
+    def reset(self):
+        """Delete every record."""
+
+    def persist(self):
+        """Flush in-memory state to disk (no-op for backends that write through)."""
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict]) -> bool:
+    """
+    Evaluate a Chroma-style ``where`` filter against one metadata dict.
+
+    Supports equality shorthand ({'type': 'formula'}), the operators $eq,
+    $ne, $gt, $gte, $lt, $lte, $in and $nin, and $and / $or. Several keys
+    in one dict are combined with AND.
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if not _compare(op, value, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+
+    return True
+
+
+def _compare(op: str, value: Any, operand: Any) -> bool:
+    if op == '$eq':
+        return value == operand
+    if op == '$ne':
+        return value != operand
+    if op == '$in':
+        return value in operand
+    if op == '$nin':
+        return value not in operand
+
+    if value is None:
+        return False
+    if op == '$gt':
+        return value > operand
+    if op == '$gte':
+        return value >= operand
+    if op == '$lt':
+        return value < operand
+    if op == '$lte':
+        return value <= operand
+
+    raise ValueError(f"Unsupported filter operator '{op}'")
@@ -0,0 +1,114 @@
+"""ChromaDB vector store backend."""
+from typing import Dict, List, Optional
+
+import chromadb
+from chromadb.config import Settings
+import numpy as np
+
+from src.rag.backends.base import VectorBackend
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+# vector_store.distance_metric -> Chroma hnsw:space
+CHROMA_SPACES = {'cosine': 'cosine', 'euclidean': 'l2', 'dot_product': 'ip'}
+
+
+class ChromaBackend(VectorBackend):
+    """Persistent ChromaDB collection."""
+
+    def __init__(self, path: str, name: str, metric: str = "cosine"):
+        super().__init__(name)
+
+        logger.info("Initializing ChromaDB...")
+
+        self.client = chromadb.PersistentClient(
+            path=path,
+            settings=Settings(anonymized_telemetry=False)
+        )
+
+        self.metric = metric
+        self.collection = self.client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": CHROMA_SPACES.get(metric, 'cosine')}
+        )
+
+    def add(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        self.collection.add(
+            documents=texts,
+            embeddings=np.asarray(embeddings).tolist(),
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        self.collection.upsert(
+            documents=texts,
+            embeddings=np.asarray(embeddings).tolist(),
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def delete(self, ids: List[str]):
+        self.collection.delete(ids=ids)
+
+    def query(self, embedding: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[Dict]:
+        return self.query_batch(np.asarray(embedding)[None, :], top_k, where=where)[0]
+
+    def query_batch(self, embeddings: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        """All queries in a single collection.query call."""
+        results = self.collection.query(
+            query_embeddings=np.asarray(embeddings).tolist(),
+            n_results=top_k,
+            where=where or None
+        )
+
+        if not results['documents']:
+            return [[] for _ in range(len(embeddings))]
+
+        return [
+            [
+                {
+                    'id': doc_id,
+                    'text': text,
+                    'metadata': metadata,
+                    'distance': distance
+                }
+                for doc_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(
+                results['ids'], results['documents'],
+                results['metadatas'], results['distances']
+            )
+        ]
+
+    def get(self, include_embeddings: bool = False) -> Dict:
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        results = self.collection.get(include=include)
+
+        records = {'ids': results['ids'], 'documents': results['documents'], 'metadatas': results['metadatas']}
+        if include_embeddings:
+            records['embeddings'] = np.asarray(results['embeddings'], dtype=np.float32)
+        return records
+
+    def vectors(self, ids: List[str]) -> Optional[np.ndarray]:
+        if not ids:
+            return None
+        results = self.collection.get(ids=list(ids), include=["embeddings"])
+        rows = dict(zip(results['ids'], results['embeddings']))
+        if any(doc_id not in rows for doc_id in ids):
+            return None
+        return np.asarray([rows[doc_id] for doc_id in ids], dtype=np.float32)
+
+    def ids(self) -> List[str]:
+        return self.collection.get(include=[])['ids']
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def reset(self):
+        self.client.delete_collection(self.name)
+        self.collection = self.client.create_collection(
+            name=self.name,
+            metadata={"hnsw:space": CHROMA_SPACES.get(self.metric, 'cosine')}
+        )
@@ -0,0 +1,400 @@
+"""FAISS vector store backend with a SQLite metadata side table."""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from src.rag.backends.base import VectorBackend, matches_where
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+INDEX_TYPES = ("Flat", "IVFFlat", "HNSW")
+
+
+class FaissBackend(VectorBackend):
+    """
+    FAISS index plus a SQLite side table.
+
+    The side table (``metadata.sqlite``) is the source of truth: it maps the
+    int64 FAISS label of each record to its chunk ID, text, metadata and
+    embedding. The FAISS index (``index.faiss``) is derived from it and is
+    rebuilt from the table whenever it is missing or out of date, so a crash
+    between a table write and an index save loses nothing.
+
+    Index types:
+        Flat: exact search
+        IVFFlat: inverted lists; nlist is capped so each list has enough
+            training points, and the index is retrained as the corpus doubles
+        HNSW: graph search; FAISS cannot remove from HNSW, so deletions
+            mark the index for a rebuild before the next query
+    """
+
+    HNSW_M = 32
+    HNSW_EF_SEARCH = 64
+
+    # FAISS wants ~39 training points per inverted list
+    MIN_POINTS_PER_LIST = 39
+
+    def __init__(
+        self,
+        path: Path,
+        name: str,
+        index_type: str = "IVFFlat",
+        nlist: int = 100,
+        nprobe: int = 10,
+        metric: str = "cosine"
+    ):
+        """
+        Open (or create) a FAISS store.
+
+        Args:
+            path: Directory for the index and side table
+            name: Collection name
+            index_type: Flat, IVFFlat or HNSW
+            nlist: Maximum number of IVF lists
+            nprobe: IVF lists searched per query
+            metric: cosine, euclidean or dot_product
+        """
+        super().__init__(name)
+
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported FAISS index type '{index_type}'. Options: {', '.join(INDEX_TYPES)}")
+
+        logger.info(f"Initializing FAISS ({index_type}) store...")
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.path / "index.faiss"
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.metric = metric
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.path / "metadata.sqlite", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " label INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " id TEXT UNIQUE NOT NULL,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " embedding BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+        self._index = None
+        self._trained_on = 0   # Corpus size the IVF quantizer was trained on
+        self._dirty = False    # Index differs from the file on disk
+        self._stale = False    # Index must be rebuilt from the table
+
+        self._load_index()
+
+    # ------------------------------------------------------------------
+    # Index management
+    # ------------------------------------------------------------------
+
+    def _faiss_metric(self) -> int:
+        return faiss.METRIC_L2 if self.metric == 'euclidean' else faiss.METRIC_INNER_PRODUCT
+
+    def _prepare(self, embeddings) -> np.ndarray:
+        """Contiguous float32 matrix, L2-normalized for cosine."""
+        vectors = np.array(embeddings, dtype=np.float32, ndmin=2, copy=True)
+        if self.metric == 'cosine':
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _new_index(self, dimension: int, size: int):
+        metric = self._faiss_metric()
+
+        if self.index_type == 'Flat':
+            return faiss.IndexIDMap2(faiss.IndexFlat(dimension, metric))
+
+        if self.index_type == 'HNSW':
+            return faiss.IndexIDMap2(faiss.IndexHNSWFlat(dimension, self.HNSW_M, metric))
+
+        nlist = max(1, min(self.nlist, size // self.MIN_POINTS_PER_LIST))
+        quantizer = faiss.IndexFlat(dimension, metric)
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+
+    def _configure(self, index):
+        """Apply query-time parameters."""
+        if self.index_type == 'IVFFlat':
+            ivf = faiss.extract_index_ivf(index)
+            ivf.nprobe = min(self.nprobe, ivf.nlist)
+        elif self.index_type == 'HNSW':
+            faiss.downcast_index(index.index).hnsw.efSearch = self.HNSW_EF_SEARCH
+
+    def _rebuild(self):
+        """Rebuild the FAISS index from the side table."""
+        rows = self._db.execute("SELECT label, embedding FROM docs").fetchall()
+
+        self._stale = False
+        self._dirty = True
+
+        if not rows:
+            self._index = None
+            self._trained_on = 0
+            return
+
+        labels = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        vectors = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+
+        index = self._new_index(vectors.shape[1], len(rows))
+        if not index.is_trained:
+            index.train(vectors)
+        index.add_with_ids(vectors, labels)
+        self._configure(index)
+
+        self._index = index
+        self._trained_on = len(rows)
+
+        logger.info(f"Built FAISS {self.index_type} index with {len(rows)} vectors")
+
+    def _load_index(self):
+        """Load the saved index, rebuilding it if it does not match the table."""
+        count = self.count()
+
+        if self.index_path.exists():
+            try:
+                index = faiss.read_index(str(self.index_path))
+            except RuntimeError as e:
+                logger.warning(f"Could not read FAISS index, rebuilding: {e}")
+            else:
+                if index.ntotal == count:
+                    self._configure(index)
+                    self._index = index
+                    self._trained_on = count
+                    return
+                logger.info("FAISS index is out of date; rebuilding from the metadata table")
+
+        if count:
+            self._rebuild()
+            self.persist()
+
+    def _needs_retrain(self) -> bool:
+        # Retrain IVF centroids each time the corpus doubles
+        return self.index_type == 'IVFFlat' and self.count() > 2 * max(self._trained_on, self.MIN_POINTS_PER_LIST)
+
+    def _index_add(self, labels: List[int], vectors: np.ndarray):
+        if self._index is None or self._stale or self._needs_retrain():
+            self._rebuild()
+            return
+
+        self._index.add_with_ids(vectors, np.asarray(labels, dtype=np.int64))
+        self._dirty = True
+
+    def _index_remove(self, labels: List[int]):
+        if self._index is None or not labels:
+            return
+
+        if self.index_type == 'HNSW':
+            self._stale = True
+        else:
+            self._index.remove_ids(np.asarray(labels, dtype=np.int64))
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _labels(self, ids: List[str]) -> List[int]:
+        labels = []
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            labels.extend(row[0] for row in self._db.execute(
+                f"SELECT label FROM docs WHERE id IN ({placeholders})", batch
+            ))
+        return labels
+
+    def _insert(self, ids: List[str], vectors: np.ndarray, texts: List[str], metadatas: List[Dict]) -> List[int]:
+        labels = []
+        for doc_id, vector, text, metadata in zip(ids, vectors, texts, metadatas):
+            cursor = self._db.execute(
+                "INSERT INTO docs (id, text, metadata, embedding) VALUES (?, ?, ?, ?)",
+                (doc_id, text, json.dumps(metadata or {}), vector.tobytes())
+            )
+            labels.append(cursor.lastrowid)
+        return labels
+
+    def add(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        vectors = self._prepare(embeddings)
+
+        with self._lock:
+            try:
+                labels = self._insert(ids, vectors, texts, metadatas)
+            except sqlite3.IntegrityError as e:
+                self._db.rollback()
+                raise ValueError(f"Document IDs already exist: {e}") from e
+            self._db.commit()
+
+            self._index_add(labels, vectors)
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        vectors = self._prepare(embeddings)
+
+        with self._lock:
+            old_labels = self._labels(ids)
+            try:
+                self._db.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in ids])
+                labels = self._insert(ids, vectors, texts, metadatas)
+            except sqlite3.IntegrityError as e:
+                self._db.rollback()
+                raise ValueError(f"Duplicate document IDs in upsert: {e}") from e
+            self._db.commit()
+
+            self._index_remove(old_labels)
+            self._index_add(labels, vectors)
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            labels = self._labels(ids)
+            self._db.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self._db.commit()
+
+            self._index_remove(labels)
+
+    def reset(self):
+        with self._lock:
+            self._db.execute("DELETE FROM docs")
+            self._db.commit()
+
+            self._index = None
+            self._trained_on = 0
+            self._stale = False
+            self._dirty = False
+            self.index_path.unlink(missing_ok=True)
+
+    def persist(self):
+        """Write the FAISS index to disk if it changed."""
+        with self._lock:
+            if self._stale:
+                self._rebuild()
+
+            if not self._dirty:
+                return
+
+            if self._index is None:
+                self.index_path.unlink(missing_ok=True)
+            else:
+                tmp_path = self.index_path.with_suffix(".tmp")
+                faiss.write_index(self._index, str(tmp_path))
+                os.replace(tmp_path, self.index_path)
+
+            self._dirty = False
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _rows(self, labels: List[int]) -> Dict[int, tuple]:
+        rows = {}
+        for start in range(0, len(labels), 500):
+            batch = labels[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows.update((row[0], row) for row in self._db.execute(
+                f"SELECT label, id, text, metadata FROM docs WHERE label IN ({placeholders})", batch
+            ))
+        return rows
+
+    def _distance(self, value: float) -> float:
+        # Chroma conventions: l2 is squared L2, cosine/ip is 1 - similarity
+        return float(value) if self.metric == 'euclidean' else 1.0 - float(value)
+
+    def query(self, embedding: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[Dict]:
+        return self.query_batch(embedding, top_k, where=where)[0]
+
+    def query_batch(self, embeddings: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        """All queries in one FAISS search and one side-table lookup."""
+        queries = self._prepare(embeddings)
+        results: List[List[Dict]] = [[] for _ in range(len(queries))]
+
+        with self._lock:
+            if self._stale:
+                self._rebuild()
+
+            if self._index is None or self._index.ntotal == 0 or top_k <= 0:
+                return results
+
+            total = self._index.ntotal
+
+            # Post-filtering: widen the search until enough results pass the filter
+            k = min(top_k if not where else top_k * 4, total)
+            pending = np.arange(len(queries))
+
+            while len(pending):
+                distances, labels = self._index.search(queries[pending], k)
+                rows = self._rows(np.unique(labels[labels >= 0]).tolist())
+
+                retry = []
+                for qi, query_labels, query_distances in zip(pending, labels, distances):
+                    hits = []
+                    for label, dist in zip(query_labels, query_distances):
+                        row = rows.get(int(label))
+                        if row is None:
+                            continue
+                        metadata = json.loads(row[3])
+                        if not matches_where(metadata, where):
+                            continue
+                        hits.append({
+                            'id': row[1],
+                            'text': row[2],
+                            'metadata': metadata,
+                            'distance': self._distance(dist)
+                        })
+
+                    if len(hits) >= top_k or k >= total:
+                        results[qi] = hits[:top_k]
+                    else:
+                        retry.append(qi)
+
+                pending = np.array(retry, dtype=np.int64)
+                k = min(k * 4, total)
+
+        return results
+
+    def get(self, include_embeddings: bool = False) -> Dict:
+        columns = "id, text, metadata" + (", embedding" if include_embeddings else "")
+        with self._lock:
+            rows = self._db.execute(f"SELECT {columns} FROM docs ORDER BY label").fetchall()
+
+        records = {
+            'ids': [row[0] for row in rows],
+            'documents': [row[1] for row in rows],
+            'metadatas': [json.loads(row[2]) for row in rows]
+        }
+        if include_embeddings:
+            records['embeddings'] = (
+                np.vstack([np.frombuffer(row[3], dtype=np.float32) for row in rows])
+                if rows else np.zeros((0, 0), dtype=np.float32)
+            )
+        return records
+
+    def vectors(self, ids: List[str]) -> Optional[np.ndarray]:
+        """Embeddings from the side table (normalized for cosine, as indexed)."""
+        rows = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows.update(self._db.execute(
+                    f"SELECT id, embedding FROM docs WHERE id IN ({placeholders})", batch
+                ))
+
+        if not ids or any(doc_id not in rows for doc_id in ids):
+            return None
+        return np.vstack([np.frombuffer(rows[doc_id], dtype=np.float32) for doc_id in ids])
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT id FROM docs")]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
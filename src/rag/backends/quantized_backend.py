@@ -0,0 +1,474 @@
+"""Quantized vector store backend with full-precision rescoring."""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.rag.backends.base import VectorBackend, matches_where
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+QUANTIZATION_MODES = ("int8", "binary")
+
+
+class QuantizedBackend(VectorBackend):
+    """
+    Compact codes for candidate generation, float32 vectors for rescoring.
+
+    Each record lives in three places:
+        metadata.sqlite: chunk ID, row number, text and metadata
+        vectors.f32: row-major float32 matrix, memory-mapped (source of
+            truth for the vectors)
+        codes (in RAM, ``codes.npy`` on persist): int8 with a per-row
+            scale (4x smaller than float32) or sign bits packed eight per
+            byte (32x smaller)
+
+    A query scores every code (int8 dot product, or Hamming distance
+    between sign bits), keeps the best ``rescore_factor * top_k``
+    candidates and reranks only those against their float32 vectors, so
+    just a handful of float rows are read per query and the matrix can
+    stay on disk. Codes are re-derived from the float vectors whenever the
+    saved codes are missing or out of date.
+
+    Rows are kept dense: deleting a record moves the last row into its
+    slot. Only the cosine and dot_product metrics are supported.
+    """
+
+    FORMAT_VERSION = 1
+
+    # Rows converted to float32 at a time when scoring int8 codes (small enough to stay in cache)
+    BLOCK_ROWS = 1024
+
+    def __init__(
+        self,
+        path: Path,
+        name: str,
+        mode: str = "int8",
+        rescore_factor: int = 10,
+        metric: str = "cosine"
+    ):
+        """
+        Open (or create) a quantized store.
+
+        Args:
+            path: Directory for the vectors, codes and side table
+            name: Collection name
+            mode: int8 or binary
+            rescore_factor: Candidates rescored in float32 per requested result
+            metric: cosine or dot_product
+        """
+        super().__init__(name)
+
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported quantization mode '{mode}'. Options: {', '.join(QUANTIZATION_MODES)}")
+        if metric not in ('cosine', 'dot_product'):
+            raise ValueError(f"Quantized store supports cosine and dot_product, not '{metric}'")
+
+        logger.info(f"Initializing quantized ({mode}) store...")
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.path / "vectors.f32"
+        self.codes_path = self.path / "codes.npy"
+        self.scales_path = self.path / "scales.npy"
+        self.manifest_path = self.path / "manifest.json"
+        self.mode = mode
+        self.rescore_factor = max(1, rescore_factor)
+        self.metric = metric
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.path / "metadata.sqlite", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " id TEXT PRIMARY KEY,"
+            " row INTEGER UNIQUE NOT NULL,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+        self._dimension = None
+        self._vectors = None
+        self._codes = None
+        self._scales = None
+        self._dirty = False
+
+        # Row -> chunk ID and back
+        self._ids: List[str] = [row[0] for row in self._db.execute("SELECT id FROM docs ORDER BY row")]
+        self._row: Dict[str, int] = {doc_id: i for i, doc_id in enumerate(self._ids)}
+
+        # Filter masks are reused until the next write
+        self._masks: Dict[str, np.ndarray] = {}
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    @property
+    def _size(self) -> int:
+        return len(self._ids)
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self):
+        """Map the float vectors and load (or rebuild) the codes."""
+        manifest = self._read_manifest()
+        self._dimension = manifest.get('dimension')
+
+        if not self._size or not self._dimension:
+            return
+
+        capacity = self.vectors_path.stat().st_size // (4 * self._dimension)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self._dimension))
+        self._allocate_codes(capacity)
+
+        saved = (
+            manifest.get('format') == self.FORMAT_VERSION
+            and manifest.get('mode') == self.mode
+            and manifest.get('size') == self._size
+            and self.codes_path.exists()
+        )
+        if saved:
+            try:
+                self._codes[:self._size] = np.load(self.codes_path)
+                if self.mode == 'int8':
+                    self._scales[:self._size] = np.load(self.scales_path)
+                logger.info(f"Loaded {self._size} {self.mode} codes")
+                return
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read saved codes, re-quantizing: {e}")
+
+        for start in range(0, self._size, self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, self._size)
+            self._encode(np.asarray(self._vectors[start:end]), start)
+        self._dirty = True
+
+        logger.info(f"Quantized {self._size} vectors to {self.mode} codes")
+
+    def _code_width(self) -> int:
+        return self._dimension if self.mode == 'int8' else (self._dimension + 7) // 8
+
+    def _allocate_codes(self, capacity: int):
+        dtype = np.int8 if self.mode == 'int8' else np.uint8
+        codes = np.zeros((capacity, self._code_width()), dtype=dtype)
+        scales = np.ones(capacity, dtype=np.float32) if self.mode == 'int8' else None
+
+        if self._codes is not None:
+            codes[:self._size] = self._codes[:self._size]
+            if scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+
+        self._codes, self._scales = codes, scales
+
+    def _reserve(self, rows: int):
+        """Grow the vector file and code arrays (doubling) to hold ``rows`` rows."""
+        capacity = len(self._vectors) if self._vectors is not None else 0
+        if rows <= capacity:
+            return
+
+        capacity = max(rows, 2 * capacity, 1024)
+
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(capacity * 4 * self._dimension)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self._dimension))
+
+        self._allocate_codes(capacity)
+
+    def _encode(self, vectors: np.ndarray, start: int):
+        """Quantize vectors into rows ``start:start + len(vectors)``."""
+        end = start + len(vectors)
+
+        if self.mode == 'binary':
+            self._codes[start:end] = np.packbits(vectors > 0, axis=1)
+            return
+
+        # Symmetric per-row scale: the largest component maps to +-127
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self._codes[start:end] = np.rint(vectors / scales[:, None]).astype(np.int8)
+        self._scales[start:end] = scales
+
+    def _write_manifest(self):
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'format': self.FORMAT_VERSION,
+                'mode': self.mode,
+                'dimension': self._dimension,
+                'size': self._size
+            }, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _save_array(self, array: np.ndarray, path: Path):
+        tmp_path = path.with_name(path.stem + ".tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _prepare(self, embeddings) -> np.ndarray:
+        vectors = np.array(embeddings, dtype=np.float32, ndmin=2, copy=True)
+        if self.metric == 'cosine':
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def add(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        if not ids:
+            return
+
+        vectors = self._prepare(embeddings)
+
+        with self._lock:
+            if self._dimension is None:
+                self._dimension = vectors.shape[1]
+                self._write_manifest()
+            elif vectors.shape[1] != self._dimension:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self._dimension}")
+
+            start = self._size
+            try:
+                self._db.executemany(
+                    "INSERT INTO docs (id, row, text, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (doc_id, start + i, text, json.dumps(metadata or {}))
+                        for i, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas))
+                    ]
+                )
+            except sqlite3.IntegrityError as e:
+                self._db.rollback()
+                raise ValueError(f"Document IDs already exist: {e}") from e
+
+            # Vectors reach the file before the rows referencing them are committed
+            self._reserve(start + len(ids))
+            self._vectors[start:start + len(ids)] = vectors
+            self._vectors.flush()
+            self._encode(vectors, start)
+            self._db.commit()
+
+            for doc_id in ids:
+                self._row[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+
+            self._masks.clear()
+            self._dirty = True
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        with self._lock:
+            self.delete(ids)
+            self.add(ids, embeddings, texts, metadatas)
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            for doc_id in ids:
+                row = self._row.pop(doc_id, None)
+                if row is None:
+                    continue
+
+                self._db.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+                last = self._size - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._codes[row] = self._codes[last]
+                    if self._scales is not None:
+                        self._scales[row] = self._scales[last]
+                    self._db.execute("UPDATE docs SET row = ? WHERE id = ?", (row, moved))
+                    self._ids[row] = moved
+                    self._row[moved] = row
+
+                self._ids.pop()
+
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._db.commit()
+
+            self._masks.clear()
+            self._dirty = True
+
+    def reset(self):
+        with self._lock:
+            self._db.execute("DELETE FROM docs")
+            self._db.commit()
+
+            self._ids, self._row = [], {}
+            self._vectors = self._codes = self._scales = None
+            self._dimension = None
+            self._masks.clear()
+            self._dirty = False
+
+            for path in (self.vectors_path, self.codes_path, self.scales_path, self.manifest_path):
+                path.unlink(missing_ok=True)
+
+    def persist(self):
+        """Flush the vector file and save the codes if they changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._save_array(self._codes[:self._size], self.codes_path)
+                if self._scales is not None:
+                    self._save_array(self._scales[:self._size], self.scales_path)
+
+            # Manifest last: its size marks the codes as complete
+            self._write_manifest()
+            self._dirty = False
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _mask(self, where: Dict) -> np.ndarray:
+        key = json.dumps(where, sort_keys=True, default=str)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.zeros(self._size, dtype=bool)
+            for row, metadata in self._db.execute("SELECT row, metadata FROM docs"):
+                mask[row] = matches_where(json.loads(metadata), where)
+            self._masks[key] = mask
+        return mask
+
+    def _approximate_scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """(candidates, queries) scores from the codes; higher is better."""
+        codes = self._codes[:self._size] if rows is None else self._codes[rows]
+
+        if self.mode == 'binary':
+            packed = np.packbits(queries > 0, axis=1)
+            if packed.shape[1] % 8 == 0:
+                # Popcount 64 bits at a time
+                codes, packed = codes.view(np.uint64), packed.view(np.uint64)
+            hamming = np.empty((len(codes), len(queries)), dtype=np.int32)
+            for qi, query in enumerate(packed):
+                hamming[:, qi] = np.bitwise_count(codes ^ query).sum(axis=1, dtype=np.int32)
+            return -hamming
+
+        # Asymmetric: int8 codes against the float query
+        scales = self._scales[:self._size] if rows is None else self._scales[rows]
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), self.BLOCK_ROWS):
+            block = codes[start:start + self.BLOCK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ queries.T
+        scores *= scales[:, None]
+        return scores
+
+    def _records(self, rows: List[int]) -> Dict[int, tuple]:
+        records = {}
+        for start in range(0, len(rows), 500):
+            batch = rows[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            records.update((row[0], row) for row in self._db.execute(
+                f"SELECT row, id, text, metadata FROM docs WHERE row IN ({placeholders})", batch
+            ))
+        return records
+
+    def query(self, embedding: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[Dict]:
+        return self.query_batch(embedding, top_k, where=where)[0]
+
+    def query_batch(self, embeddings: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        """Candidates from the codes, then exact float32 rescoring of the candidates only."""
+        queries = self._prepare(embeddings)
+        results: List[List[Dict]] = [[] for _ in range(len(queries))]
+
+        with self._lock:
+            if self._size == 0 or top_k <= 0:
+                return results
+
+            rows = np.flatnonzero(self._mask(where)) if where else None
+            n = self._size if rows is None else len(rows)
+            if n == 0:
+                return results
+
+            # 1. Candidate generation over the codes
+            scores = self._approximate_scores(queries, rows)
+            n_candidates = min(n, top_k * self.rescore_factor)
+            if n_candidates < n:
+                candidates = np.argpartition(-scores, n_candidates - 1, axis=0)[:n_candidates]
+            else:
+                candidates = np.broadcast_to(np.arange(n)[:, None], scores.shape)
+            if rows is not None:
+                candidates = rows[candidates]
+
+            # 2. Exact rescoring: read each candidate's float32 row once
+            unique_rows, inverse = np.unique(candidates, return_inverse=True)
+            exact = np.asarray(self._vectors[unique_rows]) @ queries.T
+            exact = exact[inverse.reshape(candidates.shape), np.arange(len(queries))[None, :]]
+
+            k = min(top_k, n_candidates)
+            order = np.argsort(-exact, axis=0, kind='stable')[:k]
+            top_rows = np.take_along_axis(candidates, order, axis=0)
+            top_scores = np.take_along_axis(exact, order, axis=0)
+
+            records = self._records(np.unique(top_rows).tolist())
+
+        for qi in range(len(queries)):
+            for row, score in zip(top_rows[:, qi], top_scores[:, qi]):
+                record = records[int(row)]
+                results[qi].append({
+                    'id': record[1],
+                    'text': record[2],
+                    'metadata': json.loads(record[3]),
+                    'distance': 1.0 - float(score)
+                })
+
+        return results
+
+    def get(self, include_embeddings: bool = False) -> Dict:
+        with self._lock:
+            rows = self._db.execute("SELECT id, text, metadata FROM docs ORDER BY row").fetchall()
+
+            records = {
+                'ids': [row[0] for row in rows],
+                'documents': [row[1] for row in rows],
+                'metadatas': [json.loads(row[2]) for row in rows]
+            }
+            if include_embeddings:
+                records['embeddings'] = (
+                    np.array(self._vectors[:self._size])
+                    if self._size else np.zeros((0, self._dimension or 0), dtype=np.float32)
+                )
+        return records
+
+    def vectors(self, ids: List[str]) -> Optional[np.ndarray]:
+        """Float32 embeddings (not the codes) of records by ID."""
+        with self._lock:
+            rows = [self._row.get(doc_id) for doc_id in ids]
+            if not ids or any(row is None for row in rows):
+                return None
+            return np.array(self._vectors[rows])
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._ids)
+
+    def count(self) -> int:
+        return self._size
+
+    def memory_bytes(self) -> int:
+        """Bytes of the in-RAM codes (and int8 scales) for the stored rows."""
+        if self._codes is None:
+            return 0
+        size = self._codes[:self._size].nbytes
+        if self._scales is not None:
+            size += self._scales[:self._size].nbytes
+        return size
@@ -1,85 +1,589 @@
 """BM25 sparse retrieval for keyword-based matching."""
-from rank_bm25 import BM25Okapi
-from typing import List, Dict, Tuple
+from array import array
+from collections import Counter
+from typing import Iterable, List, Dict, Optional, Tuple
+from pathlib import Path
+import json
+import os
 import re
+import shutil
+import numpy as np
 from src.utils.logger import get_logger
+from src.utils.config import config
 
 logger = get_logger()
 
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize text with math notation awareness.
+
+    Args:
+        text: Input text
+
+    Returns:
+        List of tokens
+    """
+    # Preserve math notation as single tokens
+    # e.g., "x²", "∫", "∂", etc.
+
+    # Lowercase
+    text = text.lower()
+
+    # Split on whitespace and punctuation, but preserve math symbols
+    tokens = re.findall(r'[a-z0-9]+|[²³⁴⁵⁶⁷⁸⁹⁰]|[∫∂∇√±×÷≠≤≥∈∉⊂⊃∩∪]', text)
+
+    return tokens
+
+
 class BM25Retriever:
-    """Sparse retrieval using BM25 algorithm."""
-    
-    def __init__(self, documents: List[Dict[str, str]]):
+    """
+    Sparse retrieval using BM25 algorithm.
+
+    Postings live in a term-major CSR matrix (``indptr``/``indices``/``data``:
+    for term t, documents ``indices[indptr[t]:indptr[t+1]]`` with term
+    frequencies ``data[...]``). A query only touches the postings of its own
+    terms; contributions are accumulated with NumPy and the top k taken with
+    ``argpartition``.
+
+    Documents added after the CSR segment was built go to a small delta
+    segment (term -> {slot: tf}); deletions are tombstones in an ``alive``
+    mask. Document frequencies and the total length are kept exact, and the
+    delta/tombstones are folded back into the CSR segment by ``compact``.
+
+    IDF uses the non-negative form log(1 + (N - df + 0.5) / (df + 0.5)).
+    """
+
+    FORMAT_VERSION = 3
+
+    # Fold the delta segment into CSR once it holds this fraction of postings
+    COMPACT_RATIO = 0.25
+
+    def __init__(
+        self,
+        documents: List[Dict[str, str]],
+        tokenized_corpus: Optional[List[List[str]]] = None,
+        k1: Optional[float] = None,
+        b: Optional[float] = None
+    ):
         """
         Initialize BM25 retriever.
-        
+
         Args:
-            documents: List of dicts with 'text' and 'metadata' keys
+            documents: List of dicts with 'id', 'text' and 'metadata' keys
+            tokenized_corpus: Pre-tokenized documents (skips tokenization)
+            k1: Term frequency saturation (defaults to hybrid_retrieval.bm25.k1)
+            b: Length normalization (defaults to hybrid_retrieval.bm25.b)
         """
         logger.info(f"Initializing BM25 with {len(documents)} documents")
-        
-        self.documents = documents
-        
-        # Tokenize all documents
-        self.tokenized_corpus = [
-            self._tokenize(doc['text']) 
-            for doc in documents
-        ]
-        
-        # Create BM25 index
-        self.bm25 = BM25Okapi(self.tokenized_corpus)
-        
+
+        self.k1 = config.BM25_K1 if k1 is None else k1
+        self.b = config.BM25_B if b is None else b
+
+        if tokenized_corpus is None:
+            # Tokenize lazily so the whole tokenized corpus is never held in memory
+            tokenized_corpus = (self._tokenize(doc['text']) for doc in documents)
+
+        self._build(list(documents), tokenized_corpus)
+
         logger.info("BM25 index created")
-    
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _build(self, documents: List[Dict], tokenized_corpus: Iterable[List[str]]):
+        """Build the CSR segment from scratch."""
+        self.vocab: Dict[str, int] = {}
+
+        # Typed arrays: 8 bytes per posting instead of a Python int object
+        term_ids = array('q')
+        doc_len = np.zeros(len(documents), dtype=np.float32)
+
+        for slot, tokens in enumerate(tokenized_corpus):
+            term_ids.extend([self.vocab.setdefault(token, len(self.vocab)) for token in tokens])
+            doc_len[slot] = len(tokens)
+
+        self._docs: List[Optional[Dict]] = documents
+        self._slot: Dict[str, int] = {self._doc_key(doc): i for i, doc in enumerate(documents)}
+
+        term_ids = np.frombuffer(term_ids, dtype=np.int64) if term_ids else np.empty(0, dtype=np.int64)
+        doc_slots = np.repeat(np.arange(len(documents), dtype=np.int64), doc_len.astype(np.int64))
+
+        self._set_csr(term_ids, doc_slots, np.ones(len(term_ids), dtype=np.float32), doc_len)
+
+    def _set_csr(self, term_ids: np.ndarray, doc_slots: np.ndarray, tfs: np.ndarray, doc_len: np.ndarray):
+        """Install a CSR segment from (term, doc, tf) triples; duplicates are summed."""
+        n_docs = len(self._docs)
+        n_terms = len(self.vocab)
+
+        if len(term_ids):
+            # Sum duplicate (term, doc) pairs and sort term-major
+            keys = term_ids * max(n_docs, 1) + doc_slots
+            keys, inverse = np.unique(keys, return_inverse=True)
+            tfs = np.bincount(inverse, weights=tfs).astype(np.float32)
+            term_ids = keys // max(n_docs, 1)
+            doc_slots = keys % max(n_docs, 1)
+
+        self._indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=n_terms), out=self._indptr[1:])
+        self._indices = doc_slots.astype(np.int32)
+        self._data = tfs.astype(np.float32)
+
+        self._doc_len = doc_len.astype(np.float32)
+        self._alive = np.ones(n_docs, dtype=bool)
+        self._df = np.diff(self._indptr).astype(np.int64)
+        self._base_size = n_docs
+
+        self._delta: Dict[int, Dict[int, float]] = {}
+        self._delta_nnz = 0
+
+        self.total_len = float(self._doc_len.sum())
+
+    # ------------------------------------------------------------------
+    # Properties
+    # ------------------------------------------------------------------
+
+    @property
+    def num_docs(self) -> int:
+        return len(self._slot)
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_len / self.num_docs if self.num_docs else 0.0
+
+    @property
+    def documents(self) -> List[Dict]:
+        """Live documents."""
+        return [doc for doc in self._docs if doc is not None]
+
+    def ids(self) -> List[str]:
+        """IDs of live documents."""
+        return list(self._slot)
+
+    def _doc_key(self, doc: Dict) -> str:
+        # Documents without an ID (ad-hoc use) are keyed by their text
+        return doc.get('id') or doc['text']
+
     def _tokenize(self, text: str) -> List[str]:
+        """Tokenize text (see ``tokenize``)."""
+        return tokenize(text)
+
+    def _query_terms(self, query: str, expander=None) -> Dict[str, float]:
+        """Query term weights: token counts, plus expansion terms if an expander is given."""
+        tokens = self._tokenize(query)
+        return expander.expand(tokens) if expander is not None else dict(Counter(tokens))
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def _grow(self, array: np.ndarray, size: int, fill) -> np.ndarray:
+        """Return ``array`` with room for ``size`` entries (always a writable copy when grown)."""
+        if size <= len(array):
+            return array
+        grown = np.full(max(size, 2 * len(array), 16), fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _insert(self, doc: Dict, tokens: List[str]):
+        """Append a document to a new slot in the delta segment."""
+        slot = len(self._docs)
+        self._docs.append(doc)
+        self._slot[self._doc_key(doc)] = slot
+
+        self._doc_len = self._grow(self._doc_len, slot + 1, 0.0)
+        self._alive = self._grow(self._alive, slot + 1, False)
+        self._doc_len[slot] = len(tokens)
+        self._alive[slot] = True
+        self.total_len += len(tokens)
+
+        for term, tf in Counter(tokens).items():
+            term_id = self.vocab.setdefault(term, len(self.vocab))
+            self._df = self._grow(self._df, term_id + 1, 0)
+            self._df[term_id] += 1
+            self._delta.setdefault(term_id, {})[slot] = float(tf)
+            self._delta_nnz += 1
+
+    def _remove(self, key: str) -> bool:
+        """Unindex a document; its slot becomes a tombstone."""
+        slot = self._slot.pop(key, None)
+        if slot is None:
+            return False
+
+        # Re-tokenize instead of keeping a per-document term list in memory
+        for term in set(self._tokenize(self._docs[slot]['text'])):
+            term_id = self.vocab[term]
+            self._df[term_id] -= 1
+
+            postings = self._delta.get(term_id)
+            if postings is not None and postings.pop(slot, None) is not None:
+                self._delta_nnz -= 1
+                if not postings:
+                    del self._delta[term_id]
+
+        self._alive[slot] = False
+        self.total_len -= float(self._doc_len[slot])
+        self._docs[slot] = None
+        return True
+
+    def add(self, documents: List[Dict]):
+        """Add documents; documents whose ID already exists are replaced."""
+        for doc in documents:
+            self._remove(self._doc_key(doc))
+            self._insert(doc, self._tokenize(doc['text']))
+
+        self._maybe_compact()
+
+    def update(self, documents: List[Dict]):
+        """Replace existing documents (same as add: upsert semantics)."""
+        self.add(documents)
+
+    def delete(self, ids: List[str]) -> int:
+        """
+        Delete documents by ID.
+
+        Returns:
+            Number of documents removed
+        """
+        removed = sum(self._remove(doc_id) for doc_id in ids)
+        self._maybe_compact()
+        return removed
+
+    def _maybe_compact(self):
+        """Compact when the delta segment or tombstones grow too large."""
+        base_nnz = len(self._indices)
+        dead = len(self._docs) - self.num_docs
+
+        if self._delta_nnz > max(1024, self.COMPACT_RATIO * base_nnz) or dead > max(64, self.num_docs):
+            self.compact()
+
+    def compact(self):
+        """Fold the delta segment into CSR and drop tombstoned slots, in place."""
+        compacted = self.compacted()
+        if compacted is not self:
+            self.__dict__.update(compacted.__dict__)
+
+    def compacted(self) -> "BM25Retriever":
+        """
+        Compacted copy of the index (self if there is nothing to compact).
+
+        The retriever itself is left untouched, so searches running
+        meanwhile keep seeing a consistent index.
+        """
+        if not self._delta and len(self._docs) == self.num_docs:
+            return self
+
+        n_slots = len(self._docs)
+        alive = self._alive[:n_slots]
+        live_slots = np.flatnonzero(alive)
+
+        new_slot = np.full(n_slots, -1, dtype=np.int64)
+        new_slot[live_slots] = np.arange(len(live_slots))
+
+        # CSR entries of live documents
+        base_terms = np.repeat(np.arange(len(self._indptr) - 1), np.diff(self._indptr))
+        keep = alive[self._indices]
+        term_ids = [base_terms[keep]]
+        doc_slots = [new_slot[self._indices[keep]]]
+        tfs = [np.asarray(self._data)[keep]]
+
+        # Delta entries (only live documents remain in the delta)
+        for term_id, postings in list(self._delta.items()):
+            postings = dict(postings)
+            slots = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            term_ids.append(np.full(len(postings), term_id, dtype=np.int64))
+            doc_slots.append(new_slot[slots])
+            tfs.append(np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+
+        compacted = object.__new__(type(self))
+        compacted.k1, compacted.b = self.k1, self.b
+        compacted.vocab = dict(self.vocab)
+        compacted._docs = [self._docs[s] for s in live_slots]
+        compacted._slot = {compacted._doc_key(doc): i for i, doc in enumerate(compacted._docs)}
+        compacted._set_csr(np.concatenate(term_ids), np.concatenate(doc_slots), np.concatenate(tfs), self._doc_len[live_slots])
+
+        return compacted
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _term_postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc slots, term frequencies) for a term across both segments."""
+        if term_id < len(self._indptr) - 1:
+            lo, hi = self._indptr[term_id], self._indptr[term_id + 1]
+            docs, tfs = self._indices[lo:hi], self._data[lo:hi]
+        else:
+            docs, tfs = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        delta = self._delta.get(term_id)
+        if delta:
+            docs = np.concatenate([docs, np.fromiter(delta.keys(), dtype=np.int64, count=len(delta))])
+            tfs = np.concatenate([tfs, np.fromiter(delta.values(), dtype=np.float32, count=len(delta))])
+
+        return docs, tfs
+
+    def _term_scores(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc slots, BM25 contributions) of one term at query weight 1."""
+        n = self.num_docs
+        df = self._df[term_id]
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+
+        docs, tfs = self._term_postings(term_id)
+        norm = self.k1 * (1.0 - self.b + self.b * self._doc_len[docs] / (self.avgdl or 1.0))
+
+        return docs, idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+    def _term_id(self, term: str) -> Optional[int]:
+        """Vocabulary ID of a term present in at least one live document."""
+        term_id = self.vocab.get(term)
+        if term_id is None or self._df[term_id] <= 0:
+            return None
+        return term_id
+
+    def score_terms(self, term_weights: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Tokenize text with math notation awareness.
-        
+        Score documents for weighted query terms.
+
         Args:
-            text: Input text
-            
+            term_weights: term -> query weight
+
         Returns:
-            List of tokens
-        """
-        # Preserve math notation as single tokens
-        # e.g., "x²", "∫", "∂", etc.
-        
-        # Lowercase
-        text = text.lower()
-        
-        # Split on whitespace and punctuation, but preserve math symbols
-        tokens = re.findall(r'[a-z0-9]+|[²³⁴⁵⁶⁷⁸⁹⁰]|[∫∂∇√±×÷≠≤≥∈∉⊂⊃∩∪]', text)
-        
-        return tokens
-    
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
+            (slots, scores) for live documents containing at least one term
+        """
+        slot_parts, score_parts = [], []
+
+        for term, weight in term_weights.items():
+            term_id = self._term_id(term)
+            if term_id is None:
+                continue
+
+            docs, scores = self._term_scores(term_id)
+            slot_parts.append(docs)
+            score_parts.append(scores * weight)
+
+        if not slot_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        if len(slot_parts) == 1:
+            slots, scores = slot_parts[0], score_parts[0]
+        else:
+            slots, inverse = np.unique(np.concatenate(slot_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+        live = self._alive[slots]
+        return slots[live], scores[live]
+
+    def get_scores(self, query_tokens: List[str]) -> Dict[int, float]:
+        """BM25 scores for every document that contains at least one query term (slot -> score)."""
+        slots, scores = self.score_terms(dict(Counter(query_tokens)))
+        return dict(zip(slots.tolist(), scores.tolist()))
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the top_k scores, best first."""
+        if len(scores) > top_k:
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    def search(self, query: str, top_k: int = 5, expander=None) -> List[Tuple[Dict, float]]:
         """
         Search for relevant documents using BM25.
-        
+
+        Only documents sharing at least one term with the query are scored.
+
         Args:
             query: Search query
             top_k: Number of results to return
-            
+            expander: Optional QueryExpander adding weighted related terms
+
         Returns:
             List of (document, score) tuples
         """
         logger.info(f"BM25 search: '{query[:50]}...'")
-        
-        # Tokenize query
-        query_tokens = self._tokenize(query)
-        
-        # Get BM25 scores
-        scores = self.bm25.get_scores(query_tokens)
-        
-        # Get top-k indices
-        top_indices = scores.argsort()[-top_k:][::-1]
-        
-        # Return documents with scores
+
+        # Repeated query terms count repeatedly
+        slots, scores = self.score_terms(self._query_terms(query, expander))
+
         results = [
-            (self.documents[i], float(scores[i]))
-            for i in top_indices
-        ]
-        
+            (self._docs[slots[i]], float(scores[i]))
+            for i in self._top_k(scores, top_k)
+        ] if top_k > 0 else []
+
         logger.info(f"Found {len(results)} results")
-        
+
         return results
+
+    def search_batch(self, queries: List[str], top_k: int = 5, expander=None) -> List[List[Tuple[Dict, float]]]:
+        """
+        Search several queries in one vectorized pass.
+
+        Postings of a term shared by several queries are scored once; the
+        (query, document) contributions of all queries are accumulated with
+        a single bincount and ranked with one lexsort.
+
+        Args:
+            queries: Search queries
+            top_k: Number of results per query
+            expander: Optional QueryExpander adding weighted related terms
+
+        Returns:
+            One list of (document, score) tuples per query, as ``search``
+        """
+        logger.info(f"BM25 batch search: {len(queries)} queries")
+
+        term_scores: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        query_parts, slot_parts, score_parts = [], [], []
+
+        for qi, query in enumerate(queries):
+            for term, weight in self._query_terms(query, expander).items():
+                term_id = self._term_id(term)
+                if term_id is None:
+                    continue
+
+                if term_id not in term_scores:
+                    term_scores[term_id] = self._term_scores(term_id)
+                docs, scores = term_scores[term_id]
+
+                query_parts.append(np.full(len(docs), qi, dtype=np.int64))
+                slot_parts.append(docs)
+                score_parts.append(scores * weight)
+
+        results: List[List[Tuple[Dict, float]]] = [[] for _ in queries]
+        if not slot_parts or top_k <= 0:
+            return results
+
+        # One key per (query, document) pair
+        n_slots = len(self._docs)
+        keys = np.concatenate(query_parts) * n_slots + np.concatenate(slot_parts)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        query_ids, slots = keys // n_slots, keys % n_slots
+
+        live = self._alive[slots]
+        query_ids, slots, scores = query_ids[live], slots[live], scores[live]
+
+        # Group by query, best score first within each group
+        order = np.lexsort((-scores, query_ids))
+        query_ids, slots, scores = query_ids[order], slots[order], scores[order]
+        starts = np.searchsorted(query_ids, np.arange(len(queries) + 1))
+
+        for qi in range(len(queries)):
+            start, end = starts[qi], min(starts[qi + 1], starts[qi] + top_k)
+            results[qi] = [(self._docs[slot], float(score)) for slot, score in zip(slots[start:end], scores[start:end])]
+
+        return results
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: Path, fingerprint: str):
+        """
+        Persist the index to a directory.
+
+        A compacted copy is written (the live index is not modified, so
+        concurrent searches are unaffected); the CSR arrays are written as
+        .npy files so ``load`` can memory-map them. Files are written to a
+        temporary directory and swapped in, so a reader never sees a
+        half-written index.
+
+        Args:
+            path: Index directory
+            fingerprint: Fingerprint of the collection the index was built from
+        """
+        index = self.compacted()
+
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        np.save(tmp_path / "indptr.npy", index._indptr)
+        np.save(tmp_path / "indices.npy", index._indices)
+        np.save(tmp_path / "data.npy", index._data)
+        np.save(tmp_path / "doc_len.npy", index._doc_len[:len(index._docs)])
+
+        vocab = sorted(index.vocab, key=index.vocab.get)
+        with open(tmp_path / "vocab.json", 'w', encoding='utf-8') as f:
+            json.dump(vocab, f, ensure_ascii=False)
+
+        with open(tmp_path / "documents.json", 'w', encoding='utf-8') as f:
+            json.dump(index._docs, f, ensure_ascii=False)
+
+        # Manifest last: it marks the index as complete
+        with open(tmp_path / "manifest.json", 'w') as f:
+            json.dump({
+                'format': self.FORMAT_VERSION,
+                'fingerprint': fingerprint,
+                'num_docs': index.num_docs,
+                'k1': self.k1,
+                'b': self.b
+            }, f)
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Saved BM25 index ({self.num_docs} documents) to {path}")
+
+    @staticmethod
+    def read_fingerprint(path: Path) -> Optional[str]:
+        """Fingerprint of a saved index, or None if there is no usable index."""
+        manifest_path = Path(path) / "manifest.json"
+        if not manifest_path.exists():
+            return None
+
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get('format') != BM25Retriever.FORMAT_VERSION:
+            return None
+
+        # Index built with different BM25 parameters is stale too
+        if manifest.get('k1') != config.BM25_K1 or manifest.get('b') != config.BM25_B:
+            return None
+
+        return manifest.get('fingerprint')
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Retriever":
+        """
+        Load a saved index.
+
+        CSR arrays and document lengths are memory-mapped read-only; later
+        additions go to the in-memory delta segment.
+        """
+        path = Path(path)
+
+        with open(path / "manifest.json", 'r') as f:
+            manifest = json.load(f)
+
+        retriever = cls([], k1=manifest['k1'], b=manifest['b'])
+
+        with open(path / "vocab.json", 'r', encoding='utf-8') as f:
+            retriever.vocab = {term: i for i, term in enumerate(json.load(f))}
+
+        with open(path / "documents.json", 'r', encoding='utf-8') as f:
+            retriever._docs = json.load(f)
+        retriever._slot = {retriever._doc_key(doc): i for i, doc in enumerate(retriever._docs)}
+
+        retriever._indptr = np.load(path / "indptr.npy", mmap_mode='r')
+        retriever._indices = np.load(path / "indices.npy", mmap_mode='r')
+        retriever._data = np.load(path / "data.npy", mmap_mode='r')
+        retriever._doc_len = np.load(path / "doc_len.npy", mmap_mode='r')
+
+        n_docs = len(retriever._docs)
+        retriever._alive = np.ones(n_docs, dtype=bool)
+        retriever._df = np.diff(retriever._indptr).astype(np.int64)
+        retriever._base_size = n_docs
+        retriever.total_len = float(np.sum(retriever._doc_len, dtype=np.float64))
+
+        return retriever
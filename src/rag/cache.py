@@ -0,0 +1,306 @@
+"""In-memory caches for retrieval."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text for use in cache keys (collapse whitespace)."""
+    return " ".join(query.split())
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with hit/miss/eviction counters.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        Initialize cache.
+
+        Args:
+            maxsize: Maximum number of entries (0 disables caching)
+        """
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value (marking it recently used) or default."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        """Insert or refresh an entry, evicting the least recently used."""
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = value
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, float]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class TTLCache(LRUCache):
+    """
+    LRU cache whose entries also expire a fixed time after insertion.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize cache.
+
+        Args:
+            maxsize: Maximum number of entries (0 disables caching)
+            ttl: Seconds an entry stays valid (0 disables expiry)
+            clock: Time source (monotonic seconds)
+        """
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self._clock = clock
+
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live cached value (marking it recently used) or default."""
+        with self._lock:
+            if key in self._data:
+                expires, value = self._data[key]
+                if self.ttl <= 0 or self._clock() < expires:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        """Insert or refresh an entry, restarting its TTL."""
+        super().put(key, (self._clock() + self.ttl, value))
+
+    def stats(self) -> Dict[str, float]:
+        """Get cache statistics."""
+        stats = super().stats()
+        stats["ttl"] = self.ttl
+        stats["expirations"] = self.expirations
+        return stats
+
+
+class SemanticQueryCache:
+    """
+    Thread-safe bounded cache of results keyed by query embedding.
+
+    A lookup returns the entry whose embedding is most similar (cosine) to
+    the query, provided it was stored under the same parameters and the
+    similarity reaches the threshold; rephrasings that differ only in
+    whitespace, notation or variable names share one result. At this size
+    an exact scan over the stored embeddings is the nearest-neighbour index.
+
+    Every ``audit_every``-th hit is meant to be recomputed by the caller and
+    reported through ``audit`` to measure how often reuse was wrong.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        threshold: float = 0.97,
+        ttl: float = 600,
+        audit_every: int = 0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            maxsize: Maximum number of entries (0 disables caching)
+            threshold: Minimum cosine similarity for reuse
+            ttl: Seconds an entry stays valid (0 disables expiry)
+            audit_every: Audit one in this many hits (0 disables audits)
+            clock: Time source (monotonic seconds)
+        """
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self.audit_every = audit_every
+        self._clock = clock
+
+        self._vectors: Optional[np.ndarray] = None  # (maxsize, dim), allocated on first put
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # row -> (params, expires, value), LRU order
+        self._free: List[int] = list(range(maxsize - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.audits = 0
+        self.false_reuses = 0
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, embedding: np.ndarray, params: Hashable) -> Any:
+        """
+        Return the result of the most similar cached query, or None.
+
+        Args:
+            embedding: Query embedding
+            params: Everything else the result depends on (must match exactly)
+        """
+        return self.lookup(embedding, params)[1]
+
+    def lookup(self, embedding: np.ndarray, params: Hashable) -> Tuple[Optional[int], Any]:
+        """
+        Like ``get``, also returning the row of the entry (pass it to ``put`` to replace the entry).
+
+        Returns:
+            (row, value), (None, None) on a miss
+        """
+        query = self._normalize(embedding)
+
+        with self._lock:
+            rows = [row for row, entry in self._entries.items() if entry[0] == params]
+            if rows:
+                similarities = self._vectors[rows] @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    row = rows[best]
+                    _, expires, value = self._entries[row]
+                    if self.ttl <= 0 or self._clock() < expires:
+                        self._entries.move_to_end(row)
+                        self.hits += 1
+                        return row, value
+
+                    del self._entries[row]
+                    self._free.append(row)
+                    self.expirations += 1
+
+            self.misses += 1
+            return None, None
+
+    def put(self, embedding: np.ndarray, params: Hashable, value: Any, row: Optional[int] = None):
+        """
+        Insert an entry, evicting the least recently used when full.
+
+        Args:
+            embedding: Query embedding
+            params: Parameters the value was computed with
+            value: Result to cache
+            row: Row returned by ``lookup``; its entry gets the new value
+                instead of a second entry being added (if it still holds a
+                query this close under the same parameters)
+        """
+        if self.maxsize <= 0:
+            return
+
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            entry = self._entries.get(row) if row is not None else None
+            if entry is not None and entry[0] == params and self._vectors[row] @ vector >= self.threshold:
+                self._entries[row] = (params, self._clock() + self.ttl, value)
+                self._entries.move_to_end(row)
+                return
+
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, len(vector)), dtype=np.float32)
+
+            if self._free:
+                row = self._free.pop()
+            else:
+                row, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+
+            self._vectors[row] = vector
+            self._entries[row] = (params, self._clock() + self.ttl, value)
+
+    def should_audit(self) -> bool:
+        """Whether the hit just served is due for an audit."""
+        return self.audit_every > 0 and self.hits % self.audit_every == 0
+
+    def audit(self, reused_ids: list, fresh_ids: list) -> bool:
+        """
+        Record an audited hit.
+
+        Args:
+            reused_ids: Result IDs the cache returned
+            fresh_ids: Result IDs of the recomputed query
+
+        Returns:
+            True if the reuse was false (the results differ)
+        """
+        false_reuse = set(reused_ids) != set(fresh_ids)
+        with self._lock:
+            self.audits += 1
+            self.false_reuses += false_reuse
+        return false_reuse
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._free = list(range(self.maxsize - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "audits": self.audits,
+            "false_reuses": self.false_reuses,
+            "false_reuse_rate": self.false_reuses / self.audits if self.audits else 0.0
+        }
@@ -0,0 +1,189 @@
+"""Token-aware splitting of knowledge base sections into chunks."""
+import re
+from typing import Callable, Dict, List, Tuple
+
+from src.utils.tokens import count_tokens
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+# "**Problem:**", "**Step 2:**" ... start a section of a worked example or method
+# (MULTILINE so finditer finds every label in a text; match still anchors at the start)
+SECTION_LABEL_PATTERN = re.compile(r"^\*\*[^*\n]+:\*\*", re.MULTILINE)
+
+SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+# (opening, closing) markers of blocks that are never split: fenced code,
+# display math and LaTeX environments (markdown tables are handled separately)
+BLOCK_DELIMITERS = [("```", "```"), ("$$", "$$"), ("\\[", "\\]"), ("\\begin{", "\\end{")]
+
+# Split points (before a unit) from coarsest to finest: headings, section labels, paragraphs, lines
+LEVELS: List[Callable[[str], bool]] = [
+    lambda unit: bool(HEADING_PATTERN.match(unit)),
+    lambda unit: bool(SECTION_LABEL_PATTERN.match(unit)),
+    lambda unit: not unit.strip(),
+    lambda unit: True,
+]
+
+
+def split_units(text: str) -> List[str]:
+    """
+    Lines of text, with every block that must stay whole as one unit.
+
+    Fenced code, display math, LaTeX environments and markdown tables are
+    single units, and headings are joined to the unit that follows them.
+    """
+    lines = text.split("\n")
+    units = []
+    i = 0
+    while i < len(lines):
+        stripped = lines[i].strip()
+        end = i
+        for opening, closing in BLOCK_DELIMITERS:
+            if stripped.startswith(opening):
+                # Closed on the same line ("$$x$$") or on a later one
+                if closing not in stripped[len(opening):]:
+                    end = next((j for j in range(i + 1, len(lines)) if closing in lines[j]), len(lines) - 1)
+                break
+        if stripped.startswith("|"):
+            while end + 1 < len(lines) and lines[end + 1].strip().startswith("|"):
+                end += 1
+        units.append("\n".join(lines[i:end + 1]))
+        i = end + 1
+
+    glued, pending = [], []
+    for unit in units:
+        if HEADING_PATTERN.match(unit) or (pending and not unit.strip()):
+            pending.append(unit)
+            continue
+        glued.append("\n".join(pending + [unit]))
+        pending = []
+    if pending:
+        glued.append("\n".join(pending))
+
+    return glued
+
+
+def _is_block(unit: str) -> bool:
+    return "\n" in unit or unit.lstrip().startswith(tuple(opening for opening, _ in BLOCK_DELIMITERS))
+
+
+def _split_line(line: str, budget: int) -> List[str]:
+    """Split an over-long line at sentence ends, then at spaces."""
+    pieces = []
+    for sentence in SENTENCE_END.split(line):
+        words = sentence.split(" ") if count_tokens(sentence) > budget else [sentence]
+        for word in words:
+            if pieces and count_tokens(pieces[-1] + " " + word) <= budget:
+                pieces[-1] += " " + word
+            else:
+                pieces.append(word)
+    return pieces
+
+
+def _ranges(units: List[str], costs: List[int], budget: int, min_fill: float = 0.5) -> List[Tuple[int, int]]:
+    """
+    Unit ranges within budget, ending at the coarsest split point available.
+
+    Each range takes as many units as fit, then backs off to the coarsest
+    split point (per LEVELS) among those leaving it at least min_fill of
+    the budget; ties go to the latest.
+    """
+    # level[i]: coarsest level at which a range may end before unit i
+    level = [next(depth for depth, starts in enumerate(LEVELS) if starts(unit)) for unit in units]
+
+    ranges = []
+    start = 0
+    while start < len(units):
+        end, total = start + 1, costs[start]
+        while end < len(units) and total + costs[end] <= budget:
+            total += costs[end]
+            end += 1
+
+        if end < len(units):
+            filled, candidates = 0, []
+            for i in range(start + 1, end + 1):
+                filled += costs[i - 1]
+                if filled >= min_fill * budget:
+                    candidates.append(i)
+            if candidates:
+                end = min(candidates, key=lambda i: (level[i], -i))
+
+        ranges.append((start, end))
+        start = end
+
+    return ranges
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int = 0, header: str = "") -> List[Tuple[str, int]]:
+    """
+    Split header + text into chunks of at most chunk_size tokens.
+
+    Chunks end at the coarsest split point that keeps them at least half
+    full: before a heading, then a section label ("**Step 1:**"), then a
+    blank line, then any line; over-long lines are split at sentence ends
+    and then spaces. Code, math and table blocks are never
+    split (a block larger than chunk_size becomes its own chunk) and
+    headings stay with the text below them. Every chunk starts with header,
+    then up to chunk_overlap tokens of whole trailing units of the previous
+    chunk.
+
+    Args:
+        text: Section body
+        chunk_size: Token limit per chunk (header included)
+        chunk_overlap: Tokens repeated from the end of the previous chunk
+        header: Prefix of every chunk (e.g. the section title)
+
+    Returns:
+        (chunk text, offset of the text not repeated from the previous chunk) per chunk;
+        a single (header + text, len(header)) when everything fits
+    """
+    if count_tokens(header + text) <= chunk_size:
+        return [(header + text, len(header))]
+
+    budget = max(1, chunk_size - count_tokens(header))
+
+    units = []
+    for unit in split_units(text):
+        if count_tokens(unit) > budget and not _is_block(unit):
+            units.extend(_split_line(unit, budget))
+        else:
+            units.append(unit)
+    costs = [count_tokens(unit) + 1 for unit in units]  # Newline
+
+    chunks = []
+    previous = None
+    for a, b in _ranges(units, costs, budget):
+        own = units[a:b]
+        while own and not own[0].strip():
+            own.pop(0)
+        while own and not own[-1].strip():
+            own.pop()
+        if not own:
+            continue
+
+        overlap = []
+        if previous is not None and chunk_overlap > 0:
+            room = min(chunk_overlap, budget - sum(costs[a:b]))
+            i = previous[1] - 1
+            while i >= previous[0] and costs[i] <= room:
+                if units[i].strip():
+                    overlap.insert(0, units[i])
+                room -= costs[i]
+                i -= 1
+
+        prefix = header + ("\n".join(overlap) + "\n" if overlap else "")
+        chunks.append((prefix + "\n".join(own), len(prefix)))
+        previous = (a, b)
+
+    return chunks
+
+
+def join_parts(parts: List[Dict]) -> str:
+    """
+    Text of consecutive parts of one split section, without repeated headers and overlap.
+
+    Args:
+        parts: Chunks with 'part' and 'body_start' metadata
+    """
+    parts = sorted(parts, key=lambda doc: doc['metadata']['part'])
+    return "\n".join([parts[0]['text']] + [doc['text'][doc['metadata']['body_start']:] for doc in parts[1:]])
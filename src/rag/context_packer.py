@@ -0,0 +1,232 @@
+"""Token-budgeted packing of retrieved context into the solver prompt."""
+import re
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from src.rag.chunking import SECTION_LABEL_PATTERN, split_units
+from src.utils.config import config
+from src.utils.logger import get_logger
+from src.utils.tokens import count_tokens, truncate_to_tokens
+
+logger = get_logger()
+
+# Example sections kept whatever the budget
+ESSENTIAL_SECTIONS = ("**problem", "**final answer")
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Lines repeated throughout the knowledge base for structure, never deduplicated:
+# horizontal rules, bare fences, headings and bare section labels ("**Detailed Solution:**")
+STRUCTURAL_PATTERN = re.compile(r"^(?:-{3,}|\*{3,}|_{3,}|```\w*|#{1,6}\s.*|\*\*[^*\n]+:\*\*)$")
+
+
+def format_doc(doc: Dict) -> str:
+    """Prompt line for a knowledge base chunk."""
+    return f"[{doc['metadata'].get('type', 'unknown')}] {doc['text']} (score: {doc.get('hybrid_score', 0):.3f})"
+
+
+def _words(text: str) -> Set[str]:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def _normalize_line(line: str) -> str:
+    return " ".join(line.split()).lower()
+
+
+def _dedup_key(unit: str) -> Optional[str]:
+    """Key under which a unit counts as already seen, None for blank and structural units."""
+    if not unit.strip() or STRUCTURAL_PATTERN.match(unit.strip()):
+        return None
+    return _normalize_line(unit)
+
+
+class ContextPacker:
+    """
+    Fits solver context into per-source token budgets.
+
+    Knowledge base chunks are deduplicated (lines and code/table blocks
+    already present in a better-scored chunk are removed, structural lines
+    such as fences, rules and section labels excepted, and chunks mostly
+    contained in one are dropped), worked examples are trimmed to their most relevant sections,
+    and the remaining chunks are chosen by a 0/1 knapsack over
+    (relevance, tokens). Memory, web and tool context are truncated to
+    their budgets.
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, int]] = None,
+        overlap_threshold: float = None,
+        example_max_tokens: int = None
+    ):
+        """
+        Initialize packer.
+
+        Args:
+            budgets: Token budget per source (knowledge, memory, web, tool)
+            overlap_threshold: Drop a chunk when this fraction of its words appears in one packed chunk
+            example_max_tokens: Token cap for a single worked example
+        """
+        self.budgets = {**config.CONTEXT_BUDGETS, **(budgets or {})}
+        self.overlap_threshold = config.CONTEXT_OVERLAP_THRESHOLD if overlap_threshold is None else overlap_threshold
+        self.example_max_tokens = config.CONTEXT_EXAMPLE_MAX_TOKENS if example_max_tokens is None else example_max_tokens
+
+    def pack(
+        self,
+        problem: str,
+        docs: List[Dict],
+        memory: str = "",
+        web: str = "",
+        tool: str = ""
+    ) -> Dict:
+        """
+        Pack context for one prompt.
+
+        Args:
+            problem: The problem being solved (ranks example sections)
+            docs: Retrieved chunks, best first
+            memory: Similar-problem context
+            web: Web search context
+            tool: Tool output
+
+        Returns:
+            {'docs': packed chunks (texts trimmed, in retrieval order),
+             'context', 'memory', 'web', 'tool': packed strings,
+             'report': token counts before/after per source and tokens_saved}
+        """
+        packed_docs = self._pack_docs(problem, docs)
+        context = "\n\n".join(format_doc(doc) for doc in packed_docs)
+
+        packed = {
+            'docs': packed_docs,
+            'context': context,
+            'memory': truncate_to_tokens(memory, self.budgets.get('memory', 0)),
+            'web': truncate_to_tokens(web, self.budgets.get('web', 0)),
+            'tool': truncate_to_tokens(tool, self.budgets.get('tool', 0)),
+        }
+
+        before = {
+            'knowledge': count_tokens("\n\n".join(format_doc(doc) for doc in docs)),
+            'memory': count_tokens(memory),
+            'web': count_tokens(web),
+            'tool': count_tokens(tool),
+        }
+        after = {
+            'knowledge': count_tokens(context),
+            'memory': count_tokens(packed['memory']),
+            'web': count_tokens(packed['web']),
+            'tool': count_tokens(packed['tool']),
+        }
+        packed['report'] = {
+            'tokens_before': sum(before.values()),
+            'tokens_after': sum(after.values()),
+            'tokens_saved': sum(before.values()) - sum(after.values()),
+            'chunks_before': len(docs),
+            'chunks_after': len(packed_docs),
+            'by_source': {source: {'before': before[source], 'after': after[source]} for source in before},
+        }
+
+        return packed
+
+    def _pack_docs(self, problem: str, docs: List[Dict]) -> List[Dict]:
+        """Deduplicate, trim and knapsack-select chunks within the knowledge budget."""
+        if not docs:
+            return []
+
+        # Relevance: rerank score if present, else fused score, scaled to (0, 1]
+        scores = np.array([doc.get('rerank_score', doc.get('hybrid_score')) or 0.0 for doc in docs], dtype=np.float64)
+        span = scores.max() - scores.min()
+        values = 0.1 + 0.9 * (scores - scores.min()) / span if span > 0 else np.ones(len(docs))
+
+        problem_words = _words(problem)
+        seen_units: Set[str] = set()
+        kept_words: List[Set[str]] = []
+        items = []
+
+        # Best-scored chunks claim shared text first
+        for i in np.argsort(-values, kind='stable'):
+            doc = docs[i]
+            text = doc['text']
+            if 'example' in doc['metadata'].get('type', ''):
+                text = self._trim_example(text, problem_words)
+
+            # Whole units (code and table blocks stay intact), so fences and structure survive
+            units = [unit for unit in split_units(text) if _dedup_key(unit) not in seen_units]
+            text = "\n".join(units).strip()
+
+            words = _words(text)
+            if not text or (words and any(len(words & other) >= self.overlap_threshold * len(words) for other in kept_words)):
+                continue
+
+            seen_units.update(key for key in map(_dedup_key, units) if key is not None)
+            kept_words.append(words)
+            trimmed = {**doc, 'text': text}
+            items.append((int(i), values[i], count_tokens(format_doc(trimmed)) + 1, trimmed))
+
+        chosen = self._knapsack(items, self.budgets.get('knowledge', 0))
+        packed = [trimmed for i, _, _, trimmed in sorted(items, key=lambda item: item[0]) if i in chosen]
+
+        logger.info(f"Packed {len(packed)} of {len(docs)} chunks into the knowledge budget")
+        return packed
+
+    def _trim_example(self, text: str, problem_words: Set[str]) -> str:
+        """Keep an example's problem and answer plus its sections most similar to the problem."""
+        if count_tokens(text) <= self.example_max_tokens:
+            return text
+
+        starts = [match.start() for match in SECTION_LABEL_PATTERN.finditer(text)]
+        if not starts:
+            return truncate_to_tokens(text, self.example_max_tokens)
+
+        head = text[:starts[0]].strip()
+        sections = [text[start:end].strip() for start, end in zip(starts, starts[1:] + [len(text)])]
+        essential = [s.lower().startswith(ESSENTIAL_SECTIONS) for s in sections]
+
+        keep = {i for i, is_essential in enumerate(essential) if is_essential}
+        used = count_tokens(head) + sum(count_tokens(sections[i]) for i in keep)
+
+        # Remaining sections by word overlap with the problem, while they fit
+        optional = sorted(
+            (i for i in range(len(sections)) if i not in keep),
+            key=lambda i: -len(_words(sections[i]) & problem_words)
+        )
+        for i in optional:
+            cost = count_tokens(sections[i])
+            if used + cost <= self.example_max_tokens:
+                keep.add(i)
+                used += cost
+
+        return "\n\n".join([head] + [sections[i] for i in sorted(keep)]).strip()
+
+    @staticmethod
+    def _knapsack(items: List[tuple], budget: int) -> Set[int]:
+        """
+        0/1 knapsack: the item indices maximizing total value within budget tokens.
+
+        Args:
+            items: (index, value, tokens, doc) tuples
+            budget: Token budget
+        """
+        if budget <= 0 or not items:
+            return set()
+
+        # best[c]: best value within c tokens; take[j][c]: item j taken at capacity c
+        best = np.zeros(budget + 1)
+        take = np.zeros((len(items), budget + 1), dtype=bool)
+
+        for j, (_, value, tokens, _) in enumerate(items):
+            if tokens > budget:
+                continue
+            candidate = best[:budget + 1 - tokens] + value
+            improved = candidate > best[tokens:]
+            take[j, tokens:] = improved
+            best[tokens:] = np.where(improved, candidate, best[tokens:])
+
+        chosen, capacity = set(), budget
+        for j in range(len(items) - 1, -1, -1):
+            if take[j, capacity]:
+                chosen.add(items[j][0])
+                capacity -= items[j][2]
+
+        return chosen
@@ -0,0 +1,202 @@
+"""Exact in-memory dense index for small corpora."""
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.rag.backends.base import matches_where
+
+
+class ExactDenseIndex:
+    """
+    Brute-force nearest-neighbour search over a contiguous float32 matrix.
+
+    One matrix-vector product scores every chunk and ``argpartition`` picks
+    the top k, so a query is exact and costs O(n * dim) with no per-query
+    Python or storage overhead. Intended for corpora of up to a few tens
+    of thousands of chunks, mirroring the records of a persistent backend.
+
+    Distances follow the backend conventions: 1 - similarity for cosine
+    and dot_product, squared L2 for euclidean.
+    """
+
+    def __init__(self, dimension: Optional[int] = None, metric: str = "cosine"):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimension: Embedding dimensionality (inferred from the first add)
+            metric: cosine, euclidean or dot_product
+        """
+        self.metric = metric
+        self._matrix = np.zeros((0, dimension or 0), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._size = 0
+
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict] = []
+        self._row: Dict[str, int] = {}
+
+        # Filter masks are reused until the next write
+        self._masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _prepare(self, embeddings) -> np.ndarray:
+        vectors = np.array(embeddings, dtype=np.float32, ndmin=2, copy=True)
+        if self.metric == 'cosine':
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def _reserve(self, rows: int, dimension: int):
+        """Grow the matrix (doubling) to hold ``rows`` rows."""
+        if self._matrix.shape[1] != dimension:
+            if self._size:
+                raise ValueError(f"Embedding dimension {dimension} does not match index dimension {self._matrix.shape[1]}")
+            self._matrix = np.zeros((0, dimension), dtype=np.float32)
+
+        if rows <= len(self._matrix):
+            return
+
+        capacity = max(rows, 2 * len(self._matrix), 64)
+        matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+
+        self._matrix, self._sq_norms = matrix, sq_norms
+
+    def add(self, ids: List[str], embeddings, texts: List[str], metadatas: List[Dict]):
+        """Add records; records whose ID already exists are replaced in place."""
+        if not ids:
+            return
+
+        vectors = self._prepare(embeddings)
+        self._reserve(self._size + len(ids), vectors.shape[1])
+
+        for doc_id, vector, text, metadata in zip(ids, vectors, texts, metadatas):
+            row = self._row.get(doc_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._row[doc_id] = row
+                self.ids.append(doc_id)
+                self.texts.append(text)
+                self.metadatas.append(metadata)
+            else:
+                self.texts[row] = text
+                self.metadatas[row] = metadata
+
+            self._matrix[row] = vector
+            self._sq_norms[row] = vector @ vector
+
+        self._masks.clear()
+
+    def delete(self, ids: List[str]):
+        """Delete records by ID; the last row is moved into each freed row."""
+        for doc_id in ids:
+            row = self._row.pop(doc_id, None)
+            if row is None:
+                continue
+
+            last = self._size - 1
+            if row != last:
+                moved = self.ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._sq_norms[row] = self._sq_norms[last]
+                self.ids[row] = moved
+                self.texts[row] = self.texts[last]
+                self.metadatas[row] = self.metadatas[last]
+                self._row[moved] = row
+
+            self.ids.pop()
+            self.texts.pop()
+            self.metadatas.pop()
+            self._size = last
+
+        self._masks.clear()
+
+    def vectors(self, ids: List[str]) -> np.ndarray:
+        """
+        Stored (normalized, for cosine) embeddings of records by ID.
+
+        Raises:
+            KeyError: If an ID is not in the index
+        """
+        return self._matrix[[self._row[doc_id] for doc_id in ids]]
+
+    def _mask(self, where: Dict) -> np.ndarray:
+        key = json.dumps(where, sort_keys=True, default=str)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter((matches_where(m, where) for m in self.metadatas), dtype=bool, count=self._size)
+            self._masks[key] = mask
+        return mask
+
+    def query(self, embedding, top_k: int, where: Optional[Dict] = None) -> List[Dict]:
+        """
+        Exact nearest neighbours of one query embedding.
+
+        Returns:
+            List of {'id', 'text', 'metadata', 'distance'} dicts, nearest first
+        """
+        return self.query_batch(embedding, top_k, where=where)[0]
+
+    def query_batch(self, embeddings, top_k: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Exact nearest neighbours of several query embeddings.
+
+        All queries are scored with one matrix product and ranked with one
+        column-wise ``argpartition``.
+
+        Returns:
+            One result list per query, as ``query``
+        """
+        queries = self._prepare(embeddings)
+
+        if self._size == 0 or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        rows = np.flatnonzero(self._mask(where)) if where else None
+        matrix = self._matrix[:self._size] if rows is None else self._matrix[rows]
+
+        # (candidates, queries)
+        scores = matrix @ queries.T
+
+        if self.metric == 'euclidean':
+            # Rank by -||x - q||^2 = 2 x.q - ||x||^2 - ||q||^2
+            sq_norms = self._sq_norms[:self._size] if rows is None else self._sq_norms[rows]
+            scores = 2 * scores - sq_norms[:, None] - np.einsum('ij,ij->i', queries, queries)[None, :]
+
+        k = min(top_k, len(scores))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        else:
+            top = np.broadcast_to(np.arange(len(scores))[:, None], scores.shape)
+
+        top_scores = np.take_along_axis(scores, top, axis=0)
+        order = np.argsort(-top_scores, axis=0, kind='stable')
+        top = np.take_along_axis(top, order, axis=0)
+        top_scores = np.take_along_axis(top_scores, order, axis=0)
+
+        results = []
+        for qi in range(len(queries)):
+            hits = []
+            for i, score in zip(top[:, qi], top_scores[:, qi]):
+                row = int(rows[i]) if rows is not None else int(i)
+                score = float(score)
+                hits.append({
+                    'id': self.ids[row],
+                    'text': self.texts[row],
+                    'metadata': self.metadatas[row],
+                    'distance': -score if self.metric == 'euclidean' else 1.0 - score
+                })
+            results.append(hits)
+
+        return results
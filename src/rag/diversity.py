@@ -0,0 +1,93 @@
+"""Maximal Marginal Relevance (MMR) selection with type quotas."""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Chunk types (knowledge_builder metadata) making up each quota group
+GROUP_TYPES = {
+    'formula': ['formula'],
+    'template': ['template_overview', 'template_method'],
+    'example': ['example_solution'],
+}
+
+
+def type_group(doc_type: Optional[str]) -> str:
+    """Coarse chunk type used for quotas: formula, template, example or other."""
+    doc_type = doc_type or 'other'
+    if doc_type == 'formula':
+        return 'formula'
+    if 'template' in doc_type:
+        return 'template'
+    if 'example' in doc_type:
+        return 'example'
+    return 'other'
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.7,
+    groups: Optional[List[str]] = None,
+    quotas: Optional[Dict[str, int]] = None
+) -> List[int]:
+    """
+    Greedy MMR over a candidate set.
+
+    Each step picks the candidate maximizing
+    ``lambda * relevance - (1 - lambda) * max similarity to the picks so far``.
+    Candidate similarities come from one matrix product; each step is then
+    a few vector operations over the candidates. Quotas are hard
+    constraints: once the remaining slots are only enough for the unmet
+    quotas, only candidates of those groups are eligible.
+
+    Args:
+        relevance: (n,) relevance to the query, in [0, 1]
+        vectors: (n, dim) L2-normalized candidate embeddings
+        k: Number of candidates to select
+        lambda_mult: Relevance/diversity trade-off (1 = relevance only)
+        groups: Group of each candidate (for quotas)
+        quotas: Minimum picks per group (met as far as the candidates allow)
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    # Unmet quota per group, capped by the candidates available in it
+    group_of = np.asarray(groups if groups is not None else ['other'] * n)
+    need = {
+        group: min(count, int((group_of == group).sum()))
+        for group, count in (quotas or {}).items()
+        if count > 0
+    }
+
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)
+    selected = []
+
+    for step in range(k):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        eligible = available
+
+        unmet = [group for group, count in need.items() if count > 0]
+        if unmet and sum(need[group] for group in unmet) >= k - step:
+            eligible = available & np.isin(group_of, unmet)
+
+        pick = int(np.argmax(np.where(eligible, scores, -np.inf)))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(redundancy, similarity[pick], out=redundancy)
+
+        if need.get(group_of[pick], 0) > 0:
+            need[group_of[pick]] -= 1
+
+    return selected
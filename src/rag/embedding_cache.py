@@ -0,0 +1,246 @@
+"""Content-addressed on-disk embedding cache for knowledge-base ingestion."""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class PersistentEmbeddingCache:
+    """
+    Embedding cache keyed by chunk-text hash and model id.
+
+    Layout (one directory per model):
+        <cache_path>/<model>/index.json       {sha256(text): [shard, row]}
+        <cache_path>/<model>/shard_00000.npy  float32 matrix (rows, dim)
+
+    Every ``put_many`` call appends one shard; shards are memory-mapped
+    on read, so a warm re-ingest never loads vectors it does not need.
+    ``prune`` drops entries of texts no longer ingested, and ``compact``
+    rewrites the live rows into one shard once shards pile up or are
+    mostly superseded.
+    """
+
+    # Compact when there are more shards than this ...
+    MAX_SHARDS = 16
+
+    # ... or when fewer than this fraction of stored rows are still referenced
+    MIN_LIVE_FRACTION = 0.5
+
+    def __init__(self, cache_path: str, model_name: str):
+        """
+        Initialize cache.
+
+        Args:
+            cache_path: Root directory of the cache
+            model_name: Embedding model id (embeddings from different models never mix)
+        """
+        self.model_name = model_name
+        self.path = Path(cache_path) / model_name.replace("/", "__")
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.index_path = self.path / "index.json"
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self._shards: Dict[int, np.ndarray] = {}
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.index_path.exists():
+            self.load()
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Content hash used as cache key."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _shard_path(self, shard: int) -> Path:
+        return self.path / f"shard_{shard:05d}.npy"
+
+    def _shard(self, shard: int) -> np.ndarray:
+        if shard not in self._shards:
+            self._shards[shard] = np.load(self._shard_path(shard), mmap_mode="r")
+        return self._shards[shard]
+
+    def _shard_files(self) -> Dict[int, Path]:
+        """Shard files on disk by number, referenced or not."""
+        return {int(p.stem.split("_")[1]): p for p in self.path.glob("shard_*.npy") if ".tmp" not in p.name}
+
+    @property
+    def num_shards(self) -> int:
+        return len({shard for shard, _ in self.index.values()})
+
+    def get_many(self, texts: List[str]) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """
+        Look up embeddings for a list of texts.
+
+        Returns:
+            (embeddings, missing) where embeddings[i] is None for misses and
+            missing lists the indices that need encoding
+        """
+        embeddings: List[Optional[np.ndarray]] = []
+        missing = []
+
+        for i, text in enumerate(texts):
+            location = self.index.get(self.key(text))
+            if location is None:
+                embeddings.append(None)
+                missing.append(i)
+                self.misses += 1
+            else:
+                shard, row = location
+                embeddings.append(self._shard(shard)[row])
+                self.hits += 1
+
+        return embeddings, missing
+
+    def put_many(self, texts: List[str], embeddings: np.ndarray):
+        """Store embeddings for texts in a new shard."""
+        if not texts:
+            return
+
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        shard = max(self._shard_files(), default=-1) + 1
+
+        # Write to a temp name first so a crash never leaves a truncated shard
+        shard_path = self._shard_path(shard)
+        tmp_path = shard_path.with_suffix(".tmp.npy")
+        np.save(tmp_path, embeddings)
+        os.replace(tmp_path, shard_path)
+
+        for row, text in enumerate(texts):
+            self.index[self.key(text)] = (shard, row)
+
+        self._dirty = True
+
+    def get_or_encode(
+        self,
+        texts: List[str],
+        encode_fn: Callable[[List[str]], np.ndarray]
+    ) -> np.ndarray:
+        """
+        Return embeddings for texts, encoding (and caching) only the misses.
+
+        Args:
+            texts: Texts to embed
+            encode_fn: Function mapping a list of texts to a 2-D embedding array
+        """
+        cached, missing = self.get_many(texts)
+
+        if missing:
+            # Duplicate texts in one call only need encoding once
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            new_embeddings = np.asarray(encode_fn(unique_texts), dtype=np.float32)
+            self.put_many(unique_texts, new_embeddings)
+
+            by_text = dict(zip(unique_texts, new_embeddings))
+            for i in missing:
+                cached[i] = by_text[texts[i]]
+
+        if not cached:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        return np.vstack(cached).astype(np.float32, copy=False)
+
+    def prune(self, texts: Iterable[str]):
+        """
+        Keep only the entries of the given texts (the chunks still ingested), compact if needed and flush.
+
+        Args:
+            texts: Texts whose embeddings stay cached
+        """
+        keep = {self.key(text) for text in texts}
+        stale = [key for key in self.index if key not in keep]
+        for key in stale:
+            del self.index[key]
+
+        if stale:
+            self._dirty = True
+            logger.info(f"Pruned {len(stale)} embedding cache entries")
+
+        self.compact()
+        self.flush()
+
+    def compact(self, force: bool = False):
+        """
+        Rewrite referenced rows into a single shard and delete the old shards.
+
+        Runs when there are more than MAX_SHARDS shards or fewer than
+        MIN_LIVE_FRACTION of the stored rows are referenced (always with
+        force); otherwise only deletes shards nothing references. The new
+        index is flushed before old shards are deleted, so a crash never
+        leaves the index pointing at a missing shard.
+        """
+        files = self._shard_files()
+        referenced = {shard for shard, _ in self.index.values()}
+        total_rows = sum(len(self._shard(shard)) for shard in referenced)
+
+        needed = force or len(referenced) > self.MAX_SHARDS or len(self.index) < self.MIN_LIVE_FRACTION * total_rows
+        if needed and self.index and (len(referenced) > 1 or len(self.index) < total_rows):
+            keys = list(self.index)
+            embeddings = np.vstack([self._shard(shard)[row] for shard, row in (self.index[key] for key in keys)])
+
+            shard = max(files, default=-1) + 1
+            shard_path = self._shard_path(shard)
+            tmp_path = shard_path.with_suffix(".tmp.npy")
+            np.save(tmp_path, embeddings)
+            os.replace(tmp_path, shard_path)
+
+            self.index = {key: (shard, row) for row, key in enumerate(keys)}
+            self._dirty = True
+            self.flush()
+
+            files[shard] = shard_path
+            referenced = {shard}
+            logger.info(f"Compacted embedding cache into one shard of {len(keys)} rows")
+
+        unreferenced = {number: path for number, path in files.items() if number not in referenced}
+        if unreferenced:
+            # The index on disk must stop referencing them before they go
+            self.flush()
+            for number, path in unreferenced.items():
+                self._shards.pop(number, None)
+                path.unlink(missing_ok=True)
+
+    def flush(self):
+        """Persist the index to disk."""
+        if not self._dirty:
+            return
+
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"model": self.model_name, "entries": self.index}, f)
+        os.replace(tmp_path, self.index_path)
+
+        self._dirty = False
+
+    def load(self):
+        """Load the index from disk."""
+        with open(self.index_path, "r") as f:
+            data = json.load(f)
+
+        self.index = {key: tuple(loc) for key, loc in data.get("entries", {}).items()}
+
+        logger.info(f"Loaded embedding cache with {len(self.index)} entries")
+
+    def stats(self) -> Dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        size_bytes = sum(p.stat().st_size for p in self.path.glob("shard_*.npy"))
+
+        return {
+            "model": self.model_name,
+            "entries": len(self.index),
+            "shards": self.num_shards,
+            "size_mb": round(size_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,310 @@
+"""Process-wide embedding service with micro-batching."""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.utils.logger import get_logger
+from src.utils.config import config
+
+logger = get_logger()
+
+# embeddings.backend options
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def _load_int8_onnx(model_name: str):
+    """Load the int8 dynamically quantized ONNX graph, exporting it on first use."""
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    target = config.EMBEDDING_ONNX_QUANTIZATION
+    local_path = Path(config.EMBEDDING_ONNX_PATH) / model_name.replace("/", "__")
+    file_name = f"onnx/model_qint8_{target}.onnx"
+
+    if not (local_path / file_name).exists():
+        logger.info(f"Exporting int8 ONNX model ({target}) to {local_path}")
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save(str(local_path))
+        export_dynamic_quantized_onnx_model(model, target, str(local_path))
+
+    return SentenceTransformer(str(local_path), backend="onnx", device="cpu", model_kwargs={"file_name": file_name})
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch") -> Tuple[object, str]:
+    """
+    Load a sentence-transformers model with the given inference backend.
+
+    Backends:
+        torch: PyTorch
+        onnx: ONNX Runtime on the CPU (the graph is exported on first load)
+        onnx-int8: ONNX Runtime with int8 dynamic quantization; the quantized
+            graph is exported once to embeddings.onnx_path and reused
+
+    Falls back to PyTorch (with a warning) when ONNX Runtime or Optimum is
+    not installed or the export fails.
+
+    Args:
+        model_name: Sentence-transformers model id
+        backend: torch, onnx or onnx-int8
+
+    Returns:
+        (model, backend actually loaded)
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unsupported embeddings.backend '{backend}'. Options: {', '.join(EMBEDDING_BACKENDS)}")
+
+    if backend != 'torch':
+        try:
+            if backend == 'onnx':
+                return SentenceTransformer(model_name, backend="onnx", device="cpu"), backend
+            return _load_int8_onnx(model_name), backend
+        except Exception as e:
+            logger.warning(f"Could not load {backend} embedding backend, using PyTorch: {e}")
+
+    return SentenceTransformer(model_name), 'torch'
+
+
+class _EncodeRequest:
+    """A pending encode call waiting for the batching worker."""
+
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future = Future()
+
+
+class EmbeddingService:
+    """
+    Shared sentence-embedding model.
+
+    The model is loaded once per process. Small encode calls (typically a
+    single query) from concurrent sessions are queued and encoded together
+    in micro-batches; the worker waits at most ``max_wait_ms`` for a batch
+    to fill. Bulk calls (ingestion) bypass the queue and are encoded directly.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        normalize: Optional[bool] = None,
+        backend: Optional[str] = None,
+        model=None
+    ):
+        """
+        Initialize embedding service.
+
+        Args:
+            model_name: Sentence-transformers model id (defaults to config.EMBEDDING_MODEL)
+            batch_size: Maximum texts per micro-batch / encode batch
+            max_wait_ms: Maximum time the worker waits for a micro-batch to fill
+            normalize: L2-normalize embeddings
+            backend: Inference backend, torch, onnx or onnx-int8 (defaults to config.EMBEDDING_BACKEND)
+            model: Pre-loaded model exposing ``encode`` (skips loading)
+        """
+        self.model_name = model_name or config.EMBEDDING_MODEL
+        self.batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        self.max_wait = (config.EMBEDDING_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self.normalize = config.EMBEDDING_NORMALIZE if normalize is None else normalize
+
+        if model is None:
+            backend = backend or config.EMBEDDING_BACKEND
+            logger.info(f"Loading embedding model: {self.model_name} ({backend})")
+            model, backend = load_sentence_transformer(self.model_name, backend)
+        self.model = model
+        self.backend = backend or 'torch'
+
+        # The model is not safe for concurrent forward passes
+        self._model_lock = threading.Lock()
+
+        # Multi-process pool for bulk ingestion (started on demand)
+        self._pool = None
+        self._pool_workers = 0
+
+        self._queue: "queue.Queue[_EncodeRequest]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+        self.stats = {"requests": 0, "batches": 0, "texts": 0}
+
+        logger.info("Embedding service ready")
+
+    @property
+    def cache_key(self) -> str:
+        """
+        Model identity for embedding caches.
+
+        Quantized/ONNX outputs are cached apart from PyTorch ones, and
+        unnormalized embeddings apart from normalized ones.
+        """
+        key = self.model_name if self.backend == 'torch' else f"{self.model_name}@{self.backend}"
+        return key if self.normalize else f"{key}+raw"
+
+    @property
+    def dimension(self) -> int:
+        """Embedding dimensionality."""
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Union[str, List[str]], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Encode one text or a list of texts.
+
+        Mirrors ``SentenceTransformer.encode``: a single string returns a 1-D
+        vector, a list returns a 2-D float32 array. Output options
+        (normalization, backend) are fixed per service, so cached embeddings
+        always match ``cache_key``; other ``SentenceTransformer.encode``
+        arguments are not accepted.
+
+        Args:
+            texts: Text or list of texts
+            batch_size: Encode batch size for bulk calls
+        """
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+
+        if not items:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        self.stats["requests"] += 1
+
+        if len(items) >= self.batch_size:
+            # Bulk call: no point waiting for other requests
+            embeddings = self._encode_now(items, batch_size=batch_size)
+        else:
+            request = _EncodeRequest(items)
+            self._ensure_worker()
+            self._queue.put(request)
+            embeddings = request.future.result()
+
+        return embeddings[0] if single else embeddings
+
+    def encode_parallel(self, texts: List[str], workers: int) -> np.ndarray:
+        """
+        Encode a bulk list of texts on several CPU processes.
+
+        Uses sentence-transformers' multi-process pool, which is started on
+        first use and kept until ``stop_pool``. Falls back to a single
+        in-process encode when the list is too small to amortize the pool.
+
+        Args:
+            texts: Texts to encode
+            workers: Number of worker processes
+        """
+        if workers <= 1 or len(texts) < self.batch_size * workers:
+            return self._encode_now(texts)
+
+        if self._pool is None or self._pool_workers != workers:
+            self.stop_pool()
+            logger.info(f"Starting embedding pool with {workers} CPU workers")
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * workers)
+            self._pool_workers = workers
+
+        embeddings = self.model.encode(
+            texts,
+            pool=self._pool,
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize,
+            show_progress_bar=False
+        )
+
+        self.stats["batches"] += 1
+        self.stats["texts"] += len(texts)
+
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def stop_pool(self):
+        """Shut down the multi-process pool, if running."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+            self._pool_workers = 0
+
+    def _encode_now(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Run the model on a list of texts."""
+        with self._model_lock:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=batch_size or self.batch_size,
+                normalize_embeddings=self.normalize,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+
+        self.stats["batches"] += 1
+        self.stats["texts"] += len(texts)
+
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _ensure_worker(self):
+        """Start the micro-batching worker on first use."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run_worker,
+                    name="embedding-batcher",
+                    daemon=True
+                )
+                self._worker.start()
+
+    def _run_worker(self):
+        """Collect queued requests into micro-batches and encode them."""
+        while True:
+            batch = [self._queue.get()]
+            count = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+
+            # Wait (bounded) for concurrent requests to join the batch
+            while count < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                count += len(request.texts)
+
+            texts = [text for request in batch for text in request.texts]
+
+            try:
+                embeddings = self._encode_now(texts)
+            except Exception as e:
+                logger.error(f"Embedding batch failed: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                n = len(request.texts)
+                request.future.set_result(embeddings[offset:offset + n])
+                offset += n
+
+
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide embedding service, loading it on first use."""
+    global _service
+
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+
+    return _service
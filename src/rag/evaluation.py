@@ -0,0 +1,122 @@
+"""Retrieval quality and latency evaluation over the bundled knowledge base."""
+import math
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+from src.rag.knowledge_builder import load_example_chunks, load_formula_chunks, load_template_chunks
+
+# Chunk types that answer a problem of their topic (examples are the queries)
+RELEVANT_TYPES = ('formula', 'template_overview', 'template_method')
+
+PROBLEM_PATTERN = re.compile(r"\*\*Problem:\*\*\s*(.+)")
+
+
+def build_query_set(kb_path: Path) -> List[Dict]:
+    """
+    Labelled queries from the worked examples.
+
+    Each example's problem statement is a query; the formulas and template
+    sections of the example's topic are its relevant chunks.
+
+    Args:
+        kb_path: Knowledge base root (with formulas/, templates/, examples/)
+
+    Returns:
+        List of {'id', 'topic', 'query', 'relevant'} dicts (relevant is a set of chunk IDs)
+    """
+    relevant: Dict[str, set] = {}
+    for pattern, loader in (("formulas/*.json", load_formula_chunks), ("templates/*.md", load_template_chunks)):
+        for path in sorted(kb_path.glob(pattern)):
+            for chunk in loader(path):
+                if chunk['metadata'].get('type') in RELEVANT_TYPES:
+                    relevant.setdefault(chunk['metadata']['topic'], set()).add(chunk['id'])
+
+    queries = []
+    for path in sorted(kb_path.glob("examples/*.md")):
+        for chunk in load_example_chunks(path):
+            topic = chunk['metadata']['topic']
+            match = PROBLEM_PATTERN.search(chunk['text'])
+            if match is None or not relevant.get(topic):
+                continue
+
+            queries.append({
+                'id': chunk['id'],
+                'topic': topic,
+                'query': match.group(1).strip(),
+                'relevant': relevant[topic]
+            })
+
+    return queries
+
+
+def recall_at_k(ranked_ids: List[str], relevant: set, k: int) -> float:
+    """Fraction of the top k that is relevant, normalized by the best achievable (min(k, |relevant|))."""
+    if not relevant:
+        return 0.0
+    return sum(doc_id in relevant for doc_id in ranked_ids[:k]) / min(k, len(relevant))
+
+
+def reciprocal_rank(ranked_ids: List[str], relevant: set) -> float:
+    """1 / rank of the first relevant result (0 if none)."""
+    for rank, doc_id in enumerate(ranked_ids, 1):
+        if doc_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked_ids: List[str], relevant: set, k: int) -> float:
+    """Binary-relevance nDCG of the top k."""
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, doc_id in enumerate(ranked_ids[:k], 1) if doc_id in relevant)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(k, len(relevant)) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+def latency_summary(latencies_ms: Iterable[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean latency (ms) and sequential throughput (queries/s)."""
+    latencies = np.asarray(list(latencies_ms), dtype=np.float64)
+    if not len(latencies):
+        return {}
+
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'throughput_qps': round(1000.0 * len(latencies) / float(latencies.sum()), 1) if latencies.sum() else 0.0
+    }
+
+
+def evaluate(search: Callable[[str, int], List[str]], queries: List[Dict], k: int) -> Dict[str, float]:
+    """
+    Run every labelled query through a search function.
+
+    Args:
+        search: Function (query, k) -> ranked chunk IDs
+        queries: Labelled queries from build_query_set
+        k: Cutoff for recall and nDCG
+
+    Returns:
+        Mean quality metrics plus latency_summary
+    """
+    recalls, rranks, ndcgs, latencies = [], [], [], []
+
+    for labelled in queries:
+        start = time.perf_counter()
+        ranked_ids = search(labelled['query'], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        recalls.append(recall_at_k(ranked_ids, labelled['relevant'], k))
+        rranks.append(reciprocal_rank(ranked_ids, labelled['relevant']))
+        ndcgs.append(ndcg_at_k(ranked_ids, labelled['relevant'], k))
+
+    return {
+        'queries': len(queries),
+        f'recall@{k}': round(float(np.mean(recalls)), 4) if recalls else 0.0,
+        'mrr': round(float(np.mean(rranks)), 4) if rranks else 0.0,
+        f'ndcg@{k}': round(float(np.mean(ndcgs)), 4) if ndcgs else 0.0,
+        **latency_summary(latencies)
+    }
@@ -0,0 +1,176 @@
+"""Rank fusion strategies for hybrid retrieval."""
+import heapq
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.utils.config import config
+
+
+class Hit:
+    """
+    A retrieved chunk, keyed by its document ID.
+
+    Carries the raw score and 1-based rank from each retriever (rank 0 means
+    the retriever did not return the chunk) and the fused ``score``.
+    Metadata is shared with the source result, never copied.
+    """
+
+    __slots__ = ("id", "text", "metadata", "dense_score", "dense_rank",
+                 "sparse_score", "sparse_rank", "score")
+
+    def __init__(
+        self,
+        id: str,
+        text: str,
+        metadata: Dict,
+        dense_score: float = 0.0,
+        dense_rank: int = 0,
+        sparse_score: float = 0.0,
+        sparse_rank: int = 0
+    ):
+        self.id = id
+        self.text = text
+        self.metadata = metadata
+        self.dense_score = dense_score
+        self.dense_rank = dense_rank
+        self.sparse_score = sparse_score
+        self.sparse_rank = sparse_rank
+        self.score = 0.0
+
+    def to_dict(self) -> Dict:
+        """Result dict in the shape ``hybrid_search`` returns (a rank of 0: not returned by that retriever)."""
+        return {
+            'id': self.id,
+            'text': self.text,
+            'metadata': self.metadata,
+            'hybrid_score': self.score,
+            'dense_score': self.dense_score,
+            'sparse_score': self.sparse_score,
+            'dense_rank': self.dense_rank,
+            'sparse_rank': self.sparse_rank
+        }
+
+    def __repr__(self) -> str:
+        return f"Hit({self.id!r}, score={self.score:.4f})"
+
+
+def _merge(dense: List[Hit], sparse: List[Hit]) -> Dict[str, Hit]:
+    """Union of both result lists by ID, combining per-retriever scores."""
+    hits = {hit.id: hit for hit in dense}
+
+    for hit in sparse:
+        existing = hits.get(hit.id)
+        if existing is None:
+            hits[hit.id] = hit
+        else:
+            existing.sparse_score = hit.sparse_score
+            existing.sparse_rank = hit.sparse_rank
+
+    return hits
+
+
+def _min_max(hits: List[Hit], attr: str) -> Dict[str, float]:
+    """Scores of one result list min-max normalized to [0, 1]."""
+    if not hits:
+        return {}
+
+    scores = [getattr(hit, attr) for hit in hits]
+    low, high = min(scores), max(scores)
+    span = high - low
+
+    return {hit.id: (getattr(hit, attr) - low) / span if span > 0 else 1.0 for hit in hits}
+
+
+def rrf(dense: List[Hit], sparse: List[Hit], dense_weight: float, sparse_weight: float, rrf_k: int) -> Iterable[Hit]:
+    """Weighted reciprocal rank fusion: sum of weight / (k + rank)."""
+    hits = _merge(dense, sparse)
+
+    for hit in hits.values():
+        score = 0.0
+        if hit.dense_rank:
+            score += dense_weight / (rrf_k + hit.dense_rank)
+        if hit.sparse_rank:
+            score += sparse_weight / (rrf_k + hit.sparse_rank)
+        hit.score = score
+
+    return hits.values()
+
+
+def combsum(dense: List[Hit], sparse: List[Hit], dense_weight: float, sparse_weight: float, rrf_k: int) -> Iterable[Hit]:
+    """CombSUM: weighted sum of min-max normalized scores."""
+    dense_norm = _min_max(dense, 'dense_score')
+    sparse_norm = _min_max(sparse, 'sparse_score')
+    hits = _merge(dense, sparse)
+
+    for hit in hits.values():
+        hit.score = dense_weight * dense_norm.get(hit.id, 0.0) + sparse_weight * sparse_norm.get(hit.id, 0.0)
+
+    return hits.values()
+
+
+def combmnz(dense: List[Hit], sparse: List[Hit], dense_weight: float, sparse_weight: float, rrf_k: int) -> Iterable[Hit]:
+    """CombMNZ: CombSUM multiplied by the number of retrievers that returned the chunk."""
+    hits = combsum(dense, sparse, dense_weight, sparse_weight, rrf_k)
+
+    for hit in hits:
+        hit.score *= bool(hit.dense_rank) + bool(hit.sparse_rank)
+
+    return hits
+
+
+def dense_only(dense: List[Hit], sparse: List[Hit], dense_weight: float, sparse_weight: float, rrf_k: int) -> Iterable[Hit]:
+    """Dense ranking unchanged (sparse retrieval is skipped)."""
+    for hit in dense:
+        hit.score = hit.dense_score
+    return dense
+
+
+def sparse_only(dense: List[Hit], sparse: List[Hit], dense_weight: float, sparse_weight: float, rrf_k: int) -> Iterable[Hit]:
+    """BM25 ranking unchanged (dense retrieval is skipped)."""
+    for hit in sparse:
+        hit.score = hit.sparse_score
+    return sparse
+
+
+# Strategy name -> fusion function (config: hybrid_retrieval.fusion.strategy)
+FUSION_STRATEGIES: Dict[str, Callable[..., Iterable[Hit]]] = {
+    'rrf': rrf,
+    'combsum': combsum,
+    'combmnz': combmnz,
+    'dense': dense_only,
+    'sparse': sparse_only,
+}
+
+
+def fuse(
+    dense: List[Hit],
+    sparse: List[Hit],
+    top_k: int,
+    strategy: Optional[str] = None,
+    dense_weight: float = 0.7,
+    sparse_weight: float = 0.3,
+    rrf_k: Optional[int] = None
+) -> List[Hit]:
+    """
+    Fuse dense and sparse result lists.
+
+    Args:
+        dense: Dense hits in rank order
+        sparse: Sparse hits in rank order
+        top_k: Number of hits to return
+        strategy: Name in FUSION_STRATEGIES (defaults to config.FUSION_STRATEGY)
+        dense_weight: Weight for dense retrieval
+        sparse_weight: Weight for sparse retrieval
+        rrf_k: RRF rank constant (defaults to config.RRF_K)
+
+    Returns:
+        Top hits by fused score; ties keep dense-then-sparse order
+    """
+    strategy = strategy or config.FUSION_STRATEGY
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy '{strategy}'. Options: {', '.join(FUSION_STRATEGIES)}")
+
+    hits = FUSION_STRATEGIES[strategy](
+        dense, sparse, dense_weight, sparse_weight, config.RRF_K if rrf_k is None else rrf_k
+    )
+
+    return heapq.nlargest(top_k, hits, key=lambda hit: hit.score)
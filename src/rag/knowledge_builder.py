@@ -1,139 +1,470 @@
 """Build knowledge base from files."""
+import hashlib
 import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+from src.rag.chunking import split_text
 from src.rag.vector_store import VectorStore
+from src.rag.embedding_cache import PersistentEmbeddingCache
 from src.utils.logger import get_logger
 from src.utils.config import config
 
 logger = get_logger()
 
-def build_knowledge_base():
-    """Load and index knowledge base with semantic chunking."""
-    logger.info("Building knowledge base...")
-    
-    vs = VectorStore()
-    kb_path = Path(config.KNOWLEDGE_BASE_PATH)
-    
-    texts = []
-    metadatas = []
-    ids = []
-    doc_id = 0
-    
-    # 1. Load Formulas (Keep as is - they are already granular)
-    # -------------------------------------------------------
-    for json_file in kb_path.glob("formulas/*.json"):
-        try:
-            with open(json_file, encoding='utf-8') as f:
-                data = json.load(f)
-                topic = json_file.stem
-                for formula in data.get('formulas', []):
-                    # Build text with all available fields
-                    text_parts = [
-                        f"Formula: {formula['name']}",
-                        f"Expression: {formula['formula']}",
-                        f"Description: {formula.get('description', '')}",
-                    ]
-                    if 'example' in formula:
-                        text_parts.append(f"Example: {formula['example']}")
-                    
-                    text = "\n".join(text_parts)
-                    texts.append(text)
-                    metadatas.append({
-                        'source': json_file.name, 
-                        'type': 'formula', 
-                        'id': formula.get('id', ''),
-                        'topic': topic
-                    })
-                    ids.append(f"formula_{doc_id}")
-                    doc_id += 1
-        except Exception as e:
-            logger.error(f"Error loading {json_file}: {e}")
-    
-    # 2. Load Templates (Chunk by H2 headers '## ')
-    # -------------------------------------------------------
-    for md_file in kb_path.glob("templates/*.md"):
+MANIFEST_NAME = "kb_manifest.json"
+
+
+def chunk_id(kind: str, source: str, text: str) -> str:
+    """
+    Stable, content-addressed chunk ID.
+
+    Depends only on the chunk's source file and text, so editing one chunk
+    never changes the IDs of the others.
+    """
+    digest = hashlib.sha1(f"{source}\n{text}".encode("utf-8")).hexdigest()[:16]
+    return f"{kind}_{digest}"
+
+
+def _chunk(kind: str, source: str, text: str, metadata: Dict) -> Dict:
+    return {'id': chunk_id(kind, source, text), 'text': text, 'metadata': metadata}
+
+
+def _split_chunks(kind: str, source: str, header: str, body: str, metadata: Dict) -> List[Dict]:
+    """
+    Chunks of header + body within knowledge_base.chunk_size tokens.
+
+    A section that fits is one chunk, as before. Parts of a split section
+    record the section's ID (parent_id), their position (part, parts) and
+    where their own text starts after the repeated header and overlap
+    (body_start), so that neighbouring parts can be joined at query time.
+    """
+    pieces = split_text(body, config.CHUNK_SIZE, config.CHUNK_OVERLAP, header)
+    if len(pieces) == 1:
+        return [_chunk(kind, source, pieces[0][0], metadata)]
+
+    parent_id = chunk_id(kind, source, header + body)
+    return [
+        _chunk(kind, source, text, {
+            **metadata,
+            'parent_id': parent_id,
+            'part': i,
+            'parts': len(pieces),
+            'body_start': body_start
+        })
+        for i, (text, body_start) in enumerate(pieces)
+    ]
+
+
+def load_formula_chunks(json_file: Path) -> List[Dict]:
+    """Formulas are already granular: one chunk per formula."""
+    chunks = []
+
+    with open(json_file, encoding='utf-8') as f:
+        data = json.load(f)
+
+    topic = json_file.stem
+    for formula in data.get('formulas', []):
+        # Build text with all available fields
+        text_parts = [
+            f"Formula: {formula['name']}",
+            f"Expression: {formula['formula']}",
+            f"Description: {formula.get('description', '')}",
+        ]
+        if 'example' in formula:
+            text_parts.append(f"Example: {formula['example']}")
+
+        text = "\n".join(text_parts)
+        chunks.append(_chunk('formula', json_file.name, text, {
+            'source': json_file.name,
+            'type': 'formula',
+            'id': formula.get('id', ''),
+            'topic': topic
+        }))
+
+    return chunks
+
+
+def load_template_chunks(md_file: Path) -> List[Dict]:
+    """Templates are chunked by H2 headers ('## '), then split to the chunk size."""
+    chunks = []
+
+    with open(md_file, encoding='utf-8') as f:
+        content = f.read()
+
+    topic = md_file.stem.replace('_template', '')
+
+    # Split by H2 headers
+    sections = content.split('\n## ')
+
+    # Handle first chunk (title/intro)
+    if sections:
+        intro = sections[0].strip()
+        if intro:
+            chunks.extend(_split_chunks('template', md_file.name, f"Topic Overview: {topic}\n", intro, {
+                'source': md_file.name,
+                'type': 'template_overview',
+                'topic': topic
+            }))
+
+    # Handle subsequent sections
+    for section in sections[1:]:
+        if not section.strip(): continue
+
+        # Extract section title (first line)
+        lines = section.split('\n')
+        section_title = lines[0].strip()
+        section_body = '\n'.join(lines[1:]).strip()
+
+        header = f"Method: {section_title}\nTopic: {topic}\n\n"
+
+        chunks.extend(_split_chunks('template', md_file.name, header, section_body, {
+            'source': md_file.name,
+            'type': 'template_method',
+            'topic': topic,
+            'section': section_title
+        }))
+
+    return chunks
+
+
+def load_example_chunks(md_file: Path) -> List[Dict]:
+    """Examples are chunked by '## Example', then split to the chunk size."""
+    chunks = []
+
+    with open(md_file, encoding='utf-8') as f:
+        content = f.read()
+
+    topic = md_file.stem.replace('_examples', '')
+
+    # Split by "## Example"; the part before the first example is just the header
+    examples = content.split('## Example')
+
+    for ex in examples[1:]:
+        if not ex.strip(): continue
+
+        # reconstruct the header; every part of a split example repeats it
+        title, _, body = ex.partition('\n')
+        header = f"Example Problem ({topic}):\n## Example{title}\n"
+
+        chunks.extend(_split_chunks('example', md_file.name, header, body, {
+            'source': md_file.name,
+            'type': 'example_solution',
+            'topic': topic
+        }))
+
+    return chunks
+
+
+# Glob pattern -> chunk loader, in ingestion order
+LOADERS: List[tuple] = [
+    ("formulas/*.json", load_formula_chunks),
+    ("templates/*.md", load_template_chunks),
+    ("examples/*.md", load_example_chunks),
+]
+
+
+def iter_knowledge_files(kb_path: Path):
+    """Yield (file, loader) for every knowledge base file."""
+    for pattern, loader in LOADERS:
+        for path in sorted(kb_path.glob(pattern)):
+            yield path, loader
+
+
+def load_chunks(path: Path, loader: Callable[[Path], List[Dict]]) -> List[Dict]:
+    """Run a loader, logging (not raising) on malformed files."""
+    try:
+        return loader(path)
+    except Exception as e:
+        logger.error(f"Error loading {path}: {e}")
+        return []
+
+
+def _file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def load_manifest(manifest_path: Path) -> Dict:
+    """Load the ingestion manifest ({'files': {path: {mtime, sha256, chunk_ids}}, 'chunking': {...}})."""
+    if not manifest_path.exists():
+        return {'files': {}}
+
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: Dict, manifest_path: Path):
+    """Persist the ingestion manifest atomically."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def chunking_settings() -> Dict:
+    """Settings the chunks depend on; a change re-chunks every file on incremental ingestion."""
+    return {'chunk_size': config.CHUNK_SIZE, 'chunk_overlap': config.CHUNK_OVERLAP}
+
+
+class IngestionStats:
+    """Per-stage item counts and wall time for the ingestion pipeline."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        """Time a block and attribute ``items`` to stage ``name``."""
+        entry = self.stages.setdefault(name, {'items': 0, 'seconds': 0.0})
+        start = time.perf_counter()
         try:
-            with open(md_file, encoding='utf-8') as f:
-                content = f.read()
-                topic = md_file.stem.replace('_template', '')
-                
-                # Split by H2 headers
-                sections = content.split('\n## ')
-                
-                # Handle first chunk (title/intro)
-                if sections:
-                    intro = sections[0].strip()
-                    if intro:
-                        texts.append(f"Topic Overview: {topic}\n{intro}")
-                        metadatas.append({
-                            'source': md_file.name,
-                            'type': 'template_overview',
-                            'topic': topic
-                        })
-                        ids.append(f"template_{doc_id}")
-                        doc_id += 1
-                
-                # Handle subsequent sections
-                for i, section in enumerate(sections[1:], 1):
-                    if not section.strip(): continue
-                    
-                    # Extract section title (first line)
-                    lines = section.split('\n')
-                    section_title = lines[0].strip()
-                    section_body = '\n'.join(lines[1:]).strip()
-                    
-                    full_text = f"Method: {section_title}\nTopic: {topic}\n\n{section_body}"
-                    
-                    texts.append(full_text)
-                    metadatas.append({
-                        'source': md_file.name,
-                        'type': 'template_method',
-                        'topic': topic,
-                        'section': section_title
-                    })
-                    ids.append(f"template_{doc_id}")
-                    doc_id += 1
-        except Exception as e:
-            logger.error(f"Error loading {md_file}: {e}")
-            
-    # 3. Load Examples (Chunk by '## Example')
-    # -------------------------------------------------------
-    for md_file in kb_path.glob("examples/*.md"):
+            yield entry
+        finally:
+            entry['seconds'] += time.perf_counter() - start
+            entry['items'] += items
+
+    def report(self) -> str:
+        """Throughput table, one line per stage."""
+        lines = []
+        for name, entry in self.stages.items():
+            rate = entry['items'] / entry['seconds'] if entry['seconds'] > 0 else 0.0
+            lines.append(f"  {name:<8} {int(entry['items']):>7} items  {entry['seconds']:8.2f}s  {rate:10.1f} items/s")
+        return "\n".join(lines)
+
+
+def _parse_serial(files: List[tuple], stats: IngestionStats) -> Iterator[tuple]:
+    """Parse and chunk files in this process, yielding (path, chunks) in input order."""
+    for path, loader in files:
+        with stats.stage('parse') as entry:
+            chunks = load_chunks(path, loader)
+            entry['items'] += len(chunks)
+        yield path, chunks
+
+
+def _parse_files(files: List[tuple], workers: int, stats: IngestionStats) -> Iterator[tuple]:
+    """
+    Parse and chunk files, yielding (path, chunks) in input order.
+
+    With several workers, files are parsed in a process pool with at most
+    ``2 * workers`` files in flight, so memory stays flat regardless of
+    knowledge base size. If the pool cannot start or breaks, the files not
+    yet yielded are parsed serially.
+    """
+    if workers <= 1:
+        yield from _parse_serial(files, stats)
+        return
+
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError) as e:
+        logger.warning(f"Could not start the parsing pool, parsing serially: {e}")
+        yield from _parse_serial(files, stats)
+        return
+
+    # Files not yet yielded, and the futures of those submitted so far
+    pending = deque()
+    futures = deque()
+    remaining = iter(files)
+
+    def submit(n: int):
+        for path, loader in islice(remaining, n):
+            pending.append((path, loader))
+            futures.append(pool.submit(load_chunks, path, loader))
+
+    with pool:
         try:
-            with open(md_file, encoding='utf-8') as f:
-                content = f.read()
-                topic = md_file.stem.replace('_examples', '')
-                
-                # Split by "## Example"
-                examples = content.split('## Example')
-                
-                # Skip preamble if it doesn't contain useful info, or index it
-                # We'll focus on the actual examples
-                for i, ex in enumerate(examples[1:], 1): # Skip first part if it's just header
-                    if not ex.strip(): continue
-                    
-                    # reconstruct the header
-                    full_text = f"Example Problem ({topic}):\n## Example{ex}"
-                    
-                    texts.append(full_text)
-                    metadatas.append({
-                        'source': md_file.name,
-                        'type': 'example_solution',
-                        'topic': topic
-                    })
-                    ids.append(f"example_{doc_id}")
-                    doc_id += 1
-        except Exception as e:
-            logger.error(f"Error loading {md_file}: {e}")
-    
-    if texts:
-        logger.info(f"Ingesting {len(texts)} chunks into vector store...")
-        vs.add_documents(texts, metadatas, ids)
-    else:
+            submit(2 * workers)
+
+            while pending:
+                with stats.stage('parse') as entry:
+                    chunks = futures[0].result()
+                    entry['items'] += len(chunks)
+                path, _ = pending.popleft()
+                futures.popleft()
+                yield path, chunks
+
+                submit(1)
+            return
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Parsing pool failed, parsing the remaining files serially: {e}")
+
+    yield from _parse_serial(list(pending) + list(remaining), stats)
+
+
+def build_knowledge_base(incremental: bool = False, workers: int = 1):
+    """
+    Load and index knowledge base with semantic chunking.
+
+    Ingestion is a streaming pipeline: files are parsed and chunked (in a
+    process pool when ``workers > 1``), chunks are embedded in batches of
+    ``knowledge_base.ingest_batch_size`` and each batch is written with one
+    bounded upsert before the next is read.
+
+    Chunk IDs are content hashes, so ingestion is idempotent: documents are
+    upserted rather than appended.
+
+    Args:
+        incremental: Only re-chunk files whose mtime/hash changed since the
+            last run (per the manifest), upsert new chunks and delete
+            chunks that no longer exist. Everything else is left untouched.
+        workers: Processes for parsing and (large batches of) embedding
+    """
+    logger.info(f"Building knowledge base ({'incremental' if incremental else 'full'}, {workers} workers)...")
+    start = time.perf_counter()
+
+    # BM25 is built once at the end of ingestion, not in the background per batch
+    vs = VectorStore(background_bm25=False)
+    kb_path = Path(config.KNOWLEDGE_BASE_PATH)
+    manifest_path = Path(config.VECTOR_STORE_PATH) / MANIFEST_NAME
+
+    old_files = {}
+    if incremental:
+        manifest = load_manifest(manifest_path)
+        if manifest.get('chunking') == chunking_settings():
+            old_files = manifest['files']
+        elif manifest['files']:
+            logger.info("Chunking settings changed; re-chunking every file")
+    new_files = {}
+    stats = IngestionStats()
+
+    keep_ids = set()
+    to_parse = []
+
+    for path, loader in iter_knowledge_files(kb_path):
+        rel_path = path.relative_to(kb_path).as_posix()
+        mtime = path.stat().st_mtime
+        previous = old_files.get(rel_path)
+
+        if previous is not None:
+            # Cheap mtime check first, content hash only when the mtime moved
+            if previous['mtime'] == mtime or previous['sha256'] == _file_sha256(path):
+                new_files[rel_path] = {**previous, 'mtime': mtime}
+                keep_ids.update(previous['chunk_ids'])
+                continue
+
+        to_parse.append((path, loader))
+
+    unchanged = len(new_files)
+
+    # Chunks whose ID is already stored (e.g. a file was touched but not edited) need no work
+    existing_ids = set(vs.backend.ids())
+
+    cache = None
+    if config.EMBEDDING_CACHE_ENABLED:
+        cache = PersistentEmbeddingCache(config.EMBEDDING_CACHE_PATH, vs.embedder.cache_key)
+
+    def encode(texts: List[str]):
+        return vs.embedder.encode_parallel(texts, workers)
+
+    seen_ids = set()
+    batch: List[Dict] = []
+    added = 0
+
+    def flush_batch():
+        nonlocal added
+        if not batch:
+            return
+
+        texts = [c['text'] for c in batch]
+
+        # Only new or changed chunks hit the embedding model
+        with stats.stage('embed', len(texts)):
+            if cache is not None:
+                embeddings = cache.get_or_encode(texts, encode)
+            else:
+                embeddings = encode(texts)
+
+        with stats.stage('write', len(texts)):
+            vs.upsert_documents(
+                texts,
+                [c['metadata'] for c in batch],
+                [c['id'] for c in batch],
+                embeddings=embeddings
+            )
+
+        added += len(batch)
+        batch.clear()
+
+    try:
+        for path, file_chunks in _parse_files(to_parse, workers, stats):
+            new_files[path.relative_to(kb_path).as_posix()] = {
+                'mtime': path.stat().st_mtime,
+                'sha256': _file_sha256(path),
+                'chunk_ids': [c['id'] for c in file_chunks]
+            }
+
+            for chunk in file_chunks:
+                # Identical chunks in one file share an ID; keep the first
+                if chunk['id'] in seen_ids:
+                    logger.warning(f"Duplicate chunk skipped: {chunk['id']} ({chunk['metadata']['source']})")
+                    continue
+                seen_ids.add(chunk['id'])
+
+                # Parts of a split section are rewritten even when their text is unchanged:
+                # parent_id and parts describe the whole section, which may have been edited
+                if chunk['id'] in existing_ids and 'parent_id' not in chunk['metadata']:
+                    continue
+
+                batch.append(chunk)
+                if len(batch) >= config.INGEST_BATCH_SIZE:
+                    flush_batch()
+
+        flush_batch()
+    finally:
+        vs.embedder.stop_pool()
+        if cache is not None:
+            cache.flush()
+
+    # Anything in the collection that no current file produces is stale
+    stale_ids = sorted(existing_ids - keep_ids - seen_ids)
+
+    if stale_ids:
+        logger.info(f"Removing {len(stale_ids)} stale chunks...")
+        with stats.stage('delete', len(stale_ids)):
+            vs.delete_documents(stale_ids)
+
+    if cache is not None and (added or stale_ids):
+        # Embeddings of chunks no longer in the collection would otherwise pile up in superseded shards
+        cache.prune(vs.backend.get()['documents'])
+
+    if not keep_ids and not seen_ids:
         logger.warning("No documents found to ingest!")
-        
-    logger.info(f"Knowledge base built: {len(texts)} chunks")
+    elif not vs.bm25_in_sync():
+        # Incremental writes update a loaded BM25 index (and its partitions) in place;
+        # build it only when missing or out of sync, so the app never pays for it on a user's request
+        with stats.stage('bm25', vs.count()):
+            vs.build_bm25_index(persist=False)
     
+    # Save the vector index (FAISS) and BM25 together
+    vs.persist()
+
+    save_manifest({'files': new_files, 'chunking': chunking_settings()}, manifest_path)
+
+    if cache is not None:
+        cache_stats = cache.stats()
+        logger.info(
+            f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+            f"(hit rate {cache_stats['hit_rate']:.0%}), {cache_stats['entries']} entries, "
+            f"{cache_stats['shards']} shards, {cache_stats['size_mb']} MB"
+        )
+
+    if stats.stages:
+        logger.info("Ingestion throughput:\n" + stats.report())
+
+    total = len(keep_ids | seen_ids)
+    logger.info(
+        f"Knowledge base built: {total} chunks "
+        f"({added} added, {len(stale_ids)} removed, {unchanged} files unchanged) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
     return vs
 
 if __name__ == "__main__":
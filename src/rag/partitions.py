@@ -0,0 +1,263 @@
+"""Topic-partitioned dense and BM25 sub-indexes."""
+import re
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.rag.bm25_retriever import BM25Retriever
+from src.rag.dense_index import ExactDenseIndex
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+
+def normalize_topic(topic: str) -> str:
+    """Lower-case a topic and join its words with underscores ('Linear Algebra' -> 'linear_algebra')."""
+    return re.sub(r"\W+", "_", str(topic).strip().lower()).strip("_")
+
+
+class TopicPartition:
+    """Dense and BM25 sub-indexes over the chunks of one topic partition."""
+
+    def __init__(self, name: str, topics: List[str], metric: str, dense: bool):
+        self.name = name
+        self.topics = topics
+        self.ids = set()
+        self.dense = ExactDenseIndex(metric=metric) if dense else None
+        self.bm25: Optional[BM25Retriever] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def where(self) -> Dict:
+        """Metadata filter selecting this partition in the global index."""
+        return {'topic': {'$in': self.topics}}
+
+
+class TopicPartitions:
+    """
+    Per-topic sub-indexes, so a search with a topic hint only scores the
+    chunks of that topic.
+
+    A chunk whose metadata topic is t belongs to partition t and to every
+    alias partition listing t (``hybrid_retrieval.partitions.aliases`` maps
+    parser topics such as 'calculus' to knowledge-base topics such as
+    'integral_calculus'). Chunks without a topic live only in the global
+    index.
+
+    Dense sub-indexes are exact in-memory indexes and are only kept while
+    the corpus is small enough for exact search; otherwise a partition is
+    searched through the global index with a topic filter. BM25
+    sub-indexes are always kept.
+    """
+
+    def __init__(self, aliases: Optional[Dict[str, List[str]]] = None, metric: str = "cosine", dense: bool = True):
+        """
+        Initialize empty partitions.
+
+        Args:
+            aliases: Partition name -> knowledge-base topics it also covers
+            metric: Distance metric of the dense sub-indexes
+            dense: Keep exact dense sub-indexes
+        """
+        self.aliases = {
+            normalize_topic(alias): {normalize_topic(topic) for topic in topics}
+            for alias, topics in (aliases or {}).items()
+        }
+        self.metric = metric
+        self.dense = dense
+        self.partitions: Dict[str, TopicPartition] = {}
+
+        # Chunk ID -> names of the partitions holding it
+        self._members: Dict[str, Tuple[str, ...]] = {}
+        self._bm25_built = False
+
+    def __len__(self) -> int:
+        return len(self.partitions)
+
+    def names_for(self, topic: str) -> Tuple[str, ...]:
+        """Partitions a chunk with the given metadata topic belongs to."""
+        topic = normalize_topic(topic)
+        names = {topic} | {alias for alias, topics in self.aliases.items() if topic in topics}
+        return tuple(sorted(names))
+
+    def resolve(self, topic: Optional[str]) -> Optional[TopicPartition]:
+        """Partition for a topic hint, or None if there is no such (non-empty) partition."""
+        if not topic:
+            return None
+        return self.partitions.get(normalize_topic(topic))
+
+    def _partition(self, name: str) -> TopicPartition:
+        partition = self.partitions.get(name)
+        if partition is None:
+            topics = sorted({name} | self.aliases.get(name, set()))
+            partition = TopicPartition(name, topics, self.metric, self.dense)
+            if self._bm25_built:
+                partition.bm25 = BM25Retriever([])
+            self.partitions[name] = partition
+        return partition
+
+    def add(self, ids: List[str], embeddings, texts: List[str], metadatas: List[Dict]):
+        """
+        Add chunks, replacing chunks with the same IDs.
+
+        Args:
+            ids: Chunk IDs
+            embeddings: Chunk embeddings (may be None without dense sub-indexes)
+            texts: Chunk texts
+            metadatas: Chunk metadata; 'topic' selects the partitions
+        """
+        # A replaced chunk may have moved to another topic
+        self.delete([doc_id for doc_id in ids if doc_id in self._members])
+
+        groups = defaultdict(list)
+        for row, (doc_id, metadata) in enumerate(zip(ids, metadatas)):
+            topic = (metadata or {}).get('topic')
+            if not topic:
+                continue
+            names = self.names_for(topic)
+            self._members[doc_id] = names
+            for name in names:
+                groups[name].append(row)
+
+        if self.dense and groups:
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        for name, rows in groups.items():
+            partition = self._partition(name)
+            group_ids = [ids[i] for i in rows]
+            partition.ids.update(group_ids)
+
+            if partition.dense is not None:
+                partition.dense.add(group_ids, embeddings[rows], [texts[i] for i in rows], [metadatas[i] for i in rows])
+
+            if partition.bm25 is not None:
+                partition.bm25.add([
+                    {'id': ids[i], 'text': texts[i], 'metadata': metadatas[i]}
+                    for i in rows
+                ])
+
+    def delete(self, ids: List[str]):
+        """Delete chunks by ID; partitions left empty are dropped."""
+        removed = defaultdict(list)
+        for doc_id in ids:
+            for name in self._members.pop(doc_id, ()):
+                removed[name].append(doc_id)
+
+        for name, doc_ids in removed.items():
+            partition = self.partitions[name]
+            partition.ids.difference_update(doc_ids)
+
+            if not partition.ids:
+                del self.partitions[name]
+                continue
+
+            if partition.dense is not None:
+                partition.dense.delete(doc_ids)
+            if partition.bm25 is not None:
+                partition.bm25.delete(doc_ids)
+
+    def drop_dense(self):
+        """Discard the dense sub-indexes (the corpus outgrew exact search)."""
+        self.dense = False
+        for partition in self.partitions.values():
+            partition.dense = None
+
+    def build_bm25(self, documents: Iterable[Dict]):
+        """
+        Build the BM25 sub-index of every partition.
+
+        Args:
+            documents: Dicts with 'id', 'text' and 'metadata' keys
+        """
+        groups = defaultdict(list)
+        for doc in documents:
+            for name in self._members.get(doc['id'], ()):
+                groups[name].append(doc)
+
+        for name, partition in self.partitions.items():
+            partition.bm25 = BM25Retriever(groups.get(name, []))
+
+        self._bm25_built = True
+        logger.info(f"Built BM25 sub-indexes for {len(self.partitions)} topic partitions")
+
+    @property
+    def bm25_built(self) -> bool:
+        """Whether the BM25 sub-indexes are built (or loaded)."""
+        return self._bm25_built
+
+    def bm25_indexes(self) -> Optional[Dict[str, BM25Retriever]]:
+        """BM25 sub-index per partition name, None until built."""
+        if not self._bm25_built:
+            return None
+        return {name: partition.bm25 for name, partition in self.partitions.items()}
+
+    def attach_bm25(self, indexes: Dict[str, BM25Retriever]) -> bool:
+        """
+        Use BM25 sub-indexes built elsewhere over the same chunks (``bm25_indexes`` of another instance).
+
+        Returns:
+            True if there was a sub-index for every partition
+        """
+        if any(name not in indexes for name in self.partitions):
+            return False
+
+        for name, partition in self.partitions.items():
+            partition.bm25 = indexes[name]
+
+        self._bm25_built = True
+        return True
+
+    def save_bm25(self, path: Path, fingerprint: Callable[[List[str]], str]):
+        """
+        Persist the BM25 sub-indexes, one directory per partition.
+
+        Args:
+            path: Parent directory
+            fingerprint: Function computing a fingerprint from chunk IDs
+        """
+        if not self._bm25_built:
+            return
+
+        path = Path(path)
+        for name, partition in self.partitions.items():
+            partition.bm25.save(path / name, fingerprint(partition.bm25.ids()))
+
+        # Partitions that no longer exist
+        for stale in path.iterdir() if path.exists() else []:
+            if stale.name not in self.partitions:
+                shutil.rmtree(stale, ignore_errors=True)
+
+    def load_bm25(self, path: Path, fingerprint: Callable[[List[str]], str]) -> bool:
+        """
+        Load persisted BM25 sub-indexes if every partition is up to date.
+
+        Args:
+            path: Parent directory passed to ``save_bm25``
+            fingerprint: Function computing a fingerprint from chunk IDs
+
+        Returns:
+            True if all sub-indexes were loaded
+        """
+        path = Path(path)
+        loaded = {}
+
+        for name, partition in self.partitions.items():
+            if BM25Retriever.read_fingerprint(path / name) != fingerprint(list(partition.ids)):
+                return False
+            try:
+                loaded[name] = BM25Retriever.load(path / name)
+            except Exception as e:
+                logger.warning(f"Could not load BM25 sub-index '{name}': {e}")
+                return False
+
+        for name, bm25 in loaded.items():
+            self.partitions[name].bm25 = bm25
+
+        self._bm25_built = True
+        logger.info(f"Loaded BM25 sub-indexes for {len(loaded)} topic partitions")
+        return True
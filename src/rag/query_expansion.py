@@ -0,0 +1,159 @@
+"""Query expansion for BM25 from a math synonym table and the concept graph."""
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from src.rag.bm25_retriever import tokenize
+from src.utils.logger import get_logger
+from src.utils.config import config
+
+logger = get_logger()
+
+# Interchangeable terms; each maps to the others, in this order
+MATH_SYNONYMS: List[List[str]] = [
+    ["derivative", "differentiate", "differentiation", "derivatives", "d/dx"],
+    ["integral", "integrate", "integration", "antiderivative", "∫"],
+    ["limit", "limits", "lim"],
+    ["maximum", "maxima", "max", "extremum"],
+    ["minimum", "minima", "min", "extremum"],
+    ["slope", "gradient", "tangent"],
+    ["matrix", "matrices"],
+    ["determinant", "det"],
+    ["permutation", "permutations", "arrangement", "arrangements", "npr"],
+    ["combination", "combinations", "choose", "selection", "ncr"],
+    ["vector", "vectors"],
+    ["dot", "scalar"],
+    ["progression", "sequence", "series"],
+    ["ap", "arithmetic"],
+    ["gp", "geometric"],
+    ["complex", "imaginary", "iota"],
+    ["roots", "root", "zeros", "solutions"],
+    ["probability", "chance", "likelihood"],
+    ["mean", "expectation", "expected", "average"],
+]
+
+
+class QueryExpander:
+    """
+    Adds related terms to BM25 queries.
+
+    Expansions are precomputed per concept (a query token, or a two-token
+    phrase for multi-word concepts such as "linear algebra") into an
+    in-memory table, so expanding a query is a dictionary lookup per
+    token. Synonyms come from MATH_SYNONYMS; related concepts come from the
+    SemanticMemory concept graph (direct neighbours) and are weighted lower.
+    """
+
+    def __init__(
+        self,
+        synonyms: List[List[str]] = None,
+        concept_graph=None,
+        max_synonyms: int = 3,
+        synonym_weight: float = 0.5,
+        concept_weight: float = 0.25,
+        tokenizer: Callable[[str], List[str]] = tokenize
+    ):
+        """
+        Precompute the expansion table.
+
+        Args:
+            synonyms: Groups of interchangeable terms (defaults to MATH_SYNONYMS)
+            concept_graph: networkx graph of concepts (e.g. SemanticMemory.graph)
+            max_synonyms: Expansion terms per concept and source
+            synonym_weight: BM25 query weight of a synonym
+            concept_weight: BM25 query weight of a related concept's terms
+            tokenizer: Tokenizer of the BM25 index being queried
+        """
+        self.max_synonyms = max_synonyms
+        self._tokenize = tokenizer
+
+        # concept ("token" or "token token") -> {expansion term: weight}
+        self.table: Dict[str, Dict[str, float]] = {}
+
+        for group in MATH_SYNONYMS if synonyms is None else synonyms:
+            for term in group:
+                others = [other for other in group if other != term]
+                self._add(term, others, synonym_weight)
+
+        if concept_graph is not None:
+            for concept in concept_graph.nodes:
+                neighbours = sorted(set(concept_graph.successors(concept)) | set(concept_graph.predecessors(concept)))
+                self._add(concept.replace('_', ' '), [n.replace('_', ' ') for n in neighbours], concept_weight)
+
+        logger.info(f"Query expansion table: {len(self.table)} concepts")
+
+    def _add(self, concept: str, related: List[str], weight: float):
+        """Record up to max_synonyms related terms for a one- or two-token concept."""
+        key = " ".join(self._tokenize(concept))
+        if not key or key.count(" ") > 1:
+            return
+
+        expansions = self.table.setdefault(key, {})
+        added = 0
+        for term in related:
+            if added >= self.max_synonyms:
+                break
+            # Single characters (the "d" of "d/dx") match too much to be useful
+            tokens = [token for token in self._tokenize(term) if len(token) > 1 or not token.isalnum()]
+            tokens = [token for token in tokens if token not in key.split()]
+            if not tokens:
+                continue
+            for token in tokens:
+                expansions[token] = max(expansions.get(token, 0.0), weight)
+            added += 1
+
+    def expand(self, tokens: List[str]) -> Dict[str, float]:
+        """
+        Weighted BM25 terms for a tokenized query.
+
+        Returns:
+            term -> weight: query tokens by count, expansion terms at their
+            weight (terms already in the query are not re-weighted)
+        """
+        weights: Dict[str, float] = dict(Counter(tokens))
+        expanded: Dict[str, float] = {}
+
+        for n in (1, 2):
+            for i in range(len(tokens) - n + 1):
+                for term, weight in self.table.get(" ".join(tokens[i:i + n]), {}).items():
+                    if term not in weights:
+                        expanded[term] = max(expanded.get(term, 0.0), weight)
+
+        weights.update(expanded)
+        return weights
+
+
+_expander: Optional[QueryExpander] = None
+_expander_lock = threading.Lock()
+
+
+def get_query_expander() -> Optional[QueryExpander]:
+    """
+    Return the process-wide query expander, building its table on first use.
+
+    Returns None when query expansion is disabled.
+    """
+    global _expander
+
+    if not config.QUERY_EXPANSION_ENABLED:
+        return None
+
+    if _expander is None:
+        with _expander_lock:
+            if _expander is None:
+                graph = None
+                if config.QUERY_EXPANSION_USE_SEMANTIC_MEMORY:
+                    try:
+                        from src.memory.semantic_memory import semantic_memory
+                        graph = semantic_memory.graph
+                    except Exception as e:
+                        logger.warning(f"Concept graph unavailable, expanding with synonyms only: {e}")
+
+                _expander = QueryExpander(
+                    concept_graph=graph,
+                    max_synonyms=config.QUERY_EXPANSION_MAX_SYNONYMS,
+                    synonym_weight=config.QUERY_EXPANSION_SYNONYM_WEIGHT,
+                    concept_weight=config.QUERY_EXPANSION_CONCEPT_WEIGHT
+                )
+
+    return _expander
@@ -0,0 +1,163 @@
+"""Cross-encoder reranking of retrieved chunks."""
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.rag.cache import LRUCache, normalize_query
+from src.utils.logger import get_logger
+from src.utils.config import config
+
+logger = get_logger()
+
+
+class CrossEncoderReranker:
+    """
+    Rerank fused retrieval results with a cross-encoder.
+
+    All uncached (query, chunk) pairs of a call are scored in one batched
+    CPU forward pass. Pair scores are cached in an LRU keyed by
+    (query hash, chunk ID). Scoring runs on a worker thread under a latency
+    budget: if the budget is exceeded the fused order is kept, and the
+    scores still land in the cache when the forward pass finishes.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        top_n: Optional[int] = None,
+        budget_ms: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        model=None
+    ):
+        """
+        Initialize reranker.
+
+        Args:
+            model_name: Cross-encoder model id (defaults to reranking.model)
+            top_n: Documents kept after reranking (defaults to reranking.top_n)
+            budget_ms: Latency budget per call; 0 waits indefinitely
+            cache_size: Pair-score LRU entries (0 disables caching)
+            model: Pre-loaded model exposing ``predict`` (skips loading)
+        """
+        self.model_name = model_name or config.RERANK_MODEL
+        self.top_n = top_n or config.RERANK_TOP_N
+        self.budget = (config.RERANK_BUDGET_MS if budget_ms is None else budget_ms) / 1000.0
+
+        if model is None:
+            logger.info(f"Loading reranker model: {self.model_name}")
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(self.model_name, device="cpu")
+        self.model = model
+
+        self.cache = LRUCache(maxsize=config.RERANK_CACHE_SIZE if cache_size is None else cache_size)
+
+        # One forward pass at a time; a timed-out pass keeps running here
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+
+        self.stats = {"calls": 0, "pairs_scored": 0, "fallbacks": 0}
+
+    @staticmethod
+    def _doc_key(doc: Dict) -> str:
+        return doc.get('id') or hashlib.sha1(doc['text'].encode("utf-8")).hexdigest()
+
+    def _score(self, pairs: List[tuple], keys: List[tuple]) -> List[float]:
+        """Score pairs in one forward pass and cache the scores."""
+        scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        scores = [float(score) for score in np.asarray(scores).reshape(-1)]
+
+        for key, score in zip(keys, scores):
+            self.cache.put(key, score)
+        self.stats["pairs_scored"] += len(pairs)
+
+        return scores
+
+    def rerank(self, query: str, docs: List[Dict], top_n: Optional[int] = None) -> List[Dict]:
+        """
+        Rerank documents for a query.
+
+        Args:
+            query: Search query
+            docs: Retrieved documents in fused order
+            top_n: Documents to keep (defaults to self.top_n)
+
+        Returns:
+            Top documents by cross-encoder score (with 'rerank_score'), or the
+            first top_n documents in fused order if the budget is exceeded
+        """
+        top_n = top_n or self.top_n
+        if not docs:
+            return []
+
+        self.stats["calls"] += 1
+        start = time.perf_counter()
+
+        query_hash = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+        keys = [(query_hash, self._doc_key(doc)) for doc in docs]
+        scores = [self.cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing:
+            future = self._executor.submit(
+                self._score,
+                [(query, docs[i]['text']) for i in missing],
+                [keys[i] for i in missing]
+            )
+            try:
+                fresh = future.result(timeout=self.budget if self.budget > 0 else None)
+            except TimeoutError:
+                self.stats["fallbacks"] += 1
+                logger.warning(f"Reranking exceeded {self.budget * 1000:.0f} ms budget; keeping fused order")
+                return docs[:top_n]
+            except Exception as e:
+                self.stats["fallbacks"] += 1
+                logger.error(f"Reranking failed, keeping fused order: {e}")
+                return docs[:top_n]
+
+            for i, score in zip(missing, fresh):
+                scores[i] = score
+
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)[:top_n]
+        results = [{**docs[i], 'rerank_score': scores[i]} for i in order]
+
+        logger.info(
+            f"Reranked {len(docs)} documents to {len(results)} "
+            f"({len(docs) - len(missing)} cached) in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+        return results
+
+    def cache_stats(self) -> Dict:
+        """Pair-score cache statistics plus call/fallback counters."""
+        return {**self.cache.stats(), **self.stats}
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_failed = False
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """
+    Return the process-wide reranker, loading it on first use.
+
+    Returns None when reranking is disabled or the model cannot be loaded.
+    """
+    global _reranker, _reranker_failed
+
+    if not config.RERANK_ENABLED or _reranker_failed:
+        return None
+
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None and not _reranker_failed:
+                try:
+                    _reranker = CrossEncoderReranker()
+                except Exception as e:
+                    logger.warning(f"Could not load reranker, continuing without it: {e}")
+                    _reranker_failed = True
+
+    return _reranker
@@ -1,289 +1,982 @@
 """Vector store management."""
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from typing import List, Dict, Optional
+from collections import defaultdict
+from pathlib import Path
+import hashlib
+import math
+import threading
+import numpy as np
+from src.rag.adaptive_depth import choose_depth
+from src.rag.backends import create_backend
+from src.rag.bm25_retriever import BM25Retriever
+from src.rag.chunking import join_parts
+from src.rag.cache import LRUCache, SemanticQueryCache, TTLCache, normalize_query
+from src.rag.dense_index import ExactDenseIndex
+from src.rag.diversity import GROUP_TYPES, mmr_select, type_group
+from src.rag.fusion import Hit, fuse
+from src.rag.query_expansion import get_query_expander
+from src.rag.partitions import TopicPartition, TopicPartitions, normalize_topic
+from src.rag.embeddings import get_embedding_service
 from src.utils.logger import get_logger
 from src.utils.config import config
 
 logger = get_logger()
 
-class VectorStore:
+# Query embeddings are shared by every VectorStore in the process, so the
+# solver's knowledge search and episodic memory lookup hit the same entries.
+_query_embedding_cache = LRUCache(maxsize=config.QUERY_EMBEDDING_CACHE_SIZE)
+
+# Hybrid results, keyed by query and search parameters plus the collection version
+_result_cache = TTLCache(maxsize=config.RESULT_CACHE_SIZE, ttl=config.RESULT_CACHE_TTL)
+
+# Diverse results of recent queries, reused for near-duplicate rephrasings
+_semantic_cache = SemanticQueryCache(
+    maxsize=config.SEMANTIC_CACHE_SIZE,
+    threshold=config.SEMANTIC_CACHE_THRESHOLD,
+    ttl=config.RESULT_CACHE_TTL,
+    audit_every=config.SEMANTIC_CACHE_AUDIT_EVERY
+)
+
+# Per-collection write counters (monotonic for the life of the process)
+_collection_versions: Dict[str, int] = defaultdict(int)
+
+
+class _BM25State:
+    """BM25 index of one collection and its build bookkeeping."""
+    
     def __init__(self):
-        logger.info("Initializing ChromaDB...")
+        self.retriever: Optional[BM25Retriever] = None
+        # Topic partition name -> BM25 sub-index, from the build that produced retriever
+        self.partitions: Optional[Dict[str, BM25Retriever]] = None
+        self.build_lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.thread_lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+
+# Per-collection BM25 state: stores opened on the same collection share one
+# index and one build, like they share its version
+_bm25_states: Dict[str, _BM25State] = defaultdict(_BM25State)
+_bm25_states_lock = threading.Lock()
+
+
+def cached_query_embedding(embedder, query: str) -> np.ndarray:
+    """
+    Embed a query, reusing cached embeddings for repeated queries.
+    
+    Cache key is (model cache key, whitespace-normalized query text).
+    """
+    key = (embedder.cache_key, normalize_query(query))
+    
+    embedding = _query_embedding_cache.get(key)
+    if embedding is None:
+        embedding = embedder.encode(key[1])
+        embedding.setflags(write=False)
+        _query_embedding_cache.put(key, embedding)
+    
+    return embedding
+
+class VectorStore:
+    def __init__(self, collection_name: str = "math_knowledge", background_bm25: bool = None):
+        """
+        Open the vector store.
         
-        self.client = chromadb.PersistentClient(
-            path=config.VECTOR_STORE_PATH,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        Args:
+            collection_name: Collection name
+            background_bm25: Build a missing BM25 index on a background thread
+                (defaults to hybrid_retrieval.bm25.background_build); bulk
+                writers that build it themselves pass False
+        """
+        # Chroma or FAISS, per vector_store.type
+        self.backend = create_backend(collection_name)
         
-        self.collection = self.client.get_or_create_collection(
-            name="math_knowledge",
-            metadata={"hnsw:space": "cosine"}
-        )
+        # Small corpora are searched exactly in memory instead of through the ANN index;
+        # per-topic sub-indexes serve searches with a topic hint
+        self.exact_index = None
+        self.partitions = None
+        self._load_memory_indexes()
         
-        logger.info("Loading embedding model...")
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        # Shared, process-wide embedding model
+        self.embedder = get_embedding_service()
         
-        # Initialize BM25 retriever (lazy initialization)
-        self.bm25_retriever = None
+        # Synonym / concept expansion of BM25 queries (None when disabled)
+        self.query_expander = get_query_expander()
+        
+        # BM25 index persisted next to the vector store (built at ingest time)
+        self.bm25_path = Path(config.VECTOR_STORE_PATH) / "bm25" / self.backend.name
+        self.partitions_bm25_path = self.bm25_path.with_name(self.backend.name + "_topics")
+        self._unsaved = 0
+        
+        # Stores opened on the same collection share its version and BM25 index
+        self._collection_key = str(Path(config.VECTOR_STORE_PATH).resolve() / self.backend.name)
+        with _bm25_states_lock:
+            self._bm25 = _bm25_states[self._collection_key]
+        
+        # Single-flight BM25 builds: one build at a time per collection, shared by all sessions
+        self.background_bm25 = config.BM25_BACKGROUND_BUILD if background_bm25 is None else background_bm25
+        
+        self._load_bm25_index()
+        if self.bm25_retriever is None and self.background_bm25 and self.count():
+            self.start_bm25_build()
         
         logger.info("Vector store ready")
     
-    def add_documents(self, texts: list, metadatas: list, ids: list):
-        """Add documents to vector store."""
-        embeddings = self.embedder.encode(texts).tolist()
+    def add_documents(self, texts: list, metadatas: list, ids: list, embeddings=None):
+        """
+        Add documents to vector store.
         
-        self.collection.add(
-            documents=texts,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
+        Args:
+            texts: Document texts
+            metadatas: Metadata dict per document
+            ids: Unique ID per document
+            embeddings: Precomputed embeddings (encoded here if omitted)
+        """
+        if embeddings is None:
+            embeddings = self.embedder.encode(texts)
+        
+        self.backend.add(ids, embeddings, texts, metadatas)
+        self._exact_add(ids, embeddings, texts, metadatas)
+        if self.partitions is not None:
+            self.partitions.add(ids, embeddings, texts, metadatas)
         logger.info(f"Added {len(texts)} documents")
         
-        # Reset BM25 to force rebuild on next hybrid search
+        self._bm25_add(texts, metadatas, ids)
+    
+    def upsert_documents(self, texts: list, metadatas: list, ids: list, embeddings=None):
+        """Insert documents, overwriting any existing documents with the same IDs."""
+        if embeddings is None:
+            embeddings = self.embedder.encode(texts)
+        
+        self.backend.upsert(ids, embeddings, texts, metadatas)
+        self._exact_add(ids, embeddings, texts, metadatas)
+        if self.partitions is not None:
+            self.partitions.add(ids, embeddings, texts, metadatas)
+        logger.info(f"Upserted {len(texts)} documents")
+        
+        self._bm25_add(texts, metadatas, ids)
+    
+    def delete_documents(self, ids: list):
+        """Delete documents by ID."""
+        if not ids:
+            return
+        
+        self.backend.delete(ids)
+        if self.exact_index is not None:
+            self.exact_index.delete(ids)
+        if self.partitions is not None:
+            self.partitions.delete(ids)
+        logger.info(f"Deleted {len(ids)} documents")
+        
+        if self.bm25_retriever is not None:
+            self.bm25_retriever.delete(ids)
+        self._changed(len(ids))
+    
+    def _load_memory_indexes(self):
+        """
+        Mirror the collection into an ExactDenseIndex if it is small enough,
+        and into the topic partitions if they are enabled.
+        """
+        limit = config.EXACT_SEARCH_MAX_DOCS
+        count = self.backend.count()
+        
+        exact = 0 < limit and count <= limit
+        if limit > 0 and not exact:
+            logger.info(f"{count} documents exceed exact_search_max_docs ({limit}); using ANN search")
+        
+        if exact:
+            self.exact_index = ExactDenseIndex(metric=config.VECTOR_STORE_METRIC)
+        if config.TOPIC_PARTITIONS_ENABLED:
+            # Dense sub-indexes follow the exact index; large corpora filter the ANN index instead
+            self.partitions = TopicPartitions(config.TOPIC_ALIASES, metric=config.VECTOR_STORE_METRIC, dense=exact)
+        
+        if count and (self.exact_index is not None or self.partitions is not None):
+            records = self.backend.get(include_embeddings=exact)
+            args = (records['ids'], records.get('embeddings'), records['documents'], records['metadatas'])
+            if self.exact_index is not None:
+                self.exact_index.add(*args)
+            if self.partitions is not None:
+                self.partitions.add(*args)
+        
+        if self.exact_index is not None:
+            logger.info(f"Exact dense search over {len(self.exact_index)} documents")
+        if self.partitions is not None:
+            logger.info(f"{len(self.partitions)} topic partitions")
+    
+    def _exact_add(self, ids: list, embeddings, texts: list, metadatas: list):
+        """Apply added/replaced documents to the exact index, dropping it once the corpus outgrows it."""
+        if self.exact_index is None:
+            return
+        
+        self.exact_index.add(ids, embeddings, texts, metadatas)
+        
+        if len(self.exact_index) > config.EXACT_SEARCH_MAX_DOCS:
+            logger.info(f"Corpus exceeds exact_search_max_docs ({config.EXACT_SEARCH_MAX_DOCS}); switching to ANN search")
+            self.exact_index = None
+            if self.partitions is not None:
+                self.partitions.drop_dense()
+    
+    def _dense_index(self):
+        """Exact index when available, else the backend's ANN index."""
+        return self.exact_index if self.exact_index is not None else self.backend
+    
+    def _bm25_add(self, texts: list, metadatas: list, ids: list):
+        """Apply added/replaced documents to the BM25 index in place."""
+        if self.bm25_retriever is not None:
+            self.bm25_retriever.add([
+                {'id': doc_id, 'text': text, 'metadata': meta}
+                for doc_id, text, meta in zip(ids, texts, metadatas)
+            ])
+        elif self.background_bm25:
+            # Not built yet: build it from the collection, which now includes these documents
+            self.start_bm25_build()
+        self._changed(len(ids))
+    
+    def _changed(self, n: int):
+        """Count unsaved changes and persist every vector_store.save_frequency of them."""
+        _collection_versions[self._collection_key] += 1
+        self._unsaved += n
+        
+        if config.VECTOR_STORE_AUTO_SAVE and self._unsaved >= config.VECTOR_STORE_SAVE_FREQUENCY:
+            self.persist()
+    
+    def persist(self):
+        """Persist the backend index and the BM25 index."""
+        self.backend.persist()
+        self.save_bm25_index()
+        self._unsaved = 0
+    
+    @property
+    def version(self) -> int:
+        """
+        Collection version, bumped by every write.
+        
+        Cached results and in-flight BM25 builds from an older version are stale.
+        """
+        return _collection_versions[self._collection_key]
+    
+    def count(self) -> int:
+        """Number of documents in the collection."""
+        return self.backend.count()
+    
+    def reset(self):
+        """Delete every document (the BM25 index is rebuilt on next use)."""
+        self.backend.reset()
+        if self.exact_index is not None:
+            self.exact_index = ExactDenseIndex(metric=config.VECTOR_STORE_METRIC)
+        if self.partitions is not None:
+            self.partitions = TopicPartitions(config.TOPIC_ALIASES, metric=config.VECTOR_STORE_METRIC, dense=self.partitions.dense)
         self.bm25_retriever = None
+        _collection_versions[self._collection_key] += 1
+        self._unsaved = 0
+    
+    @property
+    def bm25_retriever(self) -> Optional[BM25Retriever]:
+        """The collection's BM25 index (None until loaded or built), shared by its stores."""
+        return self._bm25.retriever
+    
+    @bm25_retriever.setter
+    def bm25_retriever(self, retriever: Optional[BM25Retriever]):
+        # Partition sub-indexes first: a store seeing the new index attaches them
+        self._bm25.partitions = self.partitions.bm25_indexes() if retriever is not None and self.partitions is not None else None
+        self._bm25.retriever = retriever
+    
+    def save_bm25_index(self):
+        """Persist the current BM25 index (a no-op if it has not been built)."""
+        with self._bm25.save_lock:
+            retriever = self.bm25_retriever
+            if retriever is None:
+                return
+            
+            try:
+                # BM25 mirrors the collection, so its IDs fingerprint the collection too
+                retriever.save(self.bm25_path, self._fingerprint(retriever.ids()))
+                if self.partitions is not None:
+                    self.partitions.save_bm25(self.partitions_bm25_path, self._fingerprint)
+            except OSError as e:
+                logger.warning(f"Could not persist BM25 index: {e}")
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query through the process-wide query embedding cache."""
+        return cached_query_embedding(self.embedder, query)
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed several queries; cache misses are encoded in one call.
+        
+        Returns:
+            (len(queries), dim) float32 matrix
+        """
+        keys = [(self.embedder.cache_key, normalize_query(query)) for query in queries]
+        embeddings = [_query_embedding_cache.get(key) for key in keys]
+        
+        missing = list(dict.fromkeys(key for key, emb in zip(keys, embeddings) if emb is None))
+        if missing:
+            encoded = dict(zip(missing, self.embedder.encode([key[1] for key in missing])))
+            for key, embedding in encoded.items():
+                embedding.setflags(write=False)
+                _query_embedding_cache.put(key, embedding)
+            embeddings = [encoded[key] if emb is None else emb for key, emb in zip(keys, embeddings)]
+        
+        return np.vstack(embeddings) if embeddings else np.zeros((0, self.embedder.dimension), dtype=np.float32)
+    
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Get retrieval cache statistics."""
+        return {
+            'query_embeddings': _query_embedding_cache.stats(),
+            'results': {**_result_cache.stats(), 'version': self.version},
+            'semantic': _semantic_cache.stats()
+        }
+    
+    def clear_caches(self):
+        """Drop cached query embeddings and results (e.g. before cold-cache benchmarks)."""
+        _query_embedding_cache.clear()
+        _result_cache.clear()
+        _semantic_cache.clear()
+    
+    @staticmethod
+    def _with_scores(results: list) -> list:
+        for doc in results:
+            doc['score'] = 1 - doc['distance']  # Convert distance to similarity
+        return results
     
     def search(self, query: str, top_k: int = None) -> list:
         """Search similar documents using dense vectors only."""
         if top_k is None:
             top_k = config.TOP_K
         
-        query_embedding = self.embedder.encode(query).tolist()
+        return self._with_scores(self._dense_index().query(self.embed_query(query), top_k))
+    
+    def search_batch(self, queries: List[str], top_k: int = None) -> List[list]:
+        """Dense search for several queries: one encode call and one index query."""
+        if top_k is None:
+            top_k = config.TOP_K
         
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
-        )
+        if not queries:
+            return []
         
-        documents = []
-        if results['documents']:
-            for i in range(len(results['documents'][0])):
-                documents.append({
-                    'text': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i],
-                    'score': 1 - results['distances'][0][i]  # Convert distance to similarity
-                })
-        
-        return documents
+        results = self._dense_index().query_batch(self.embed_queries(queries), top_k)
+        return [self._with_scores(docs) for docs in results]
 
     def search_with_filter(self, query: str, filter_dict: dict, top_k: int = 3) -> list:
         """Search with metadata filtering."""
-        query_embedding = self.embedder.encode(query).tolist()
-        
         try:
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                where=filter_dict
-            )
+            results = self._dense_index().query(self.embed_query(query), top_k, where=filter_dict)
         except Exception as e:
             logger.warning(f"Error in search_with_filter: {e}")
             return []
-            
-        documents = []
-        if results['documents']:
-            for i in range(len(results['documents'][0])):
-                documents.append({
-                    'text': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i],
-                    'score': 1 - results['distances'][0][i]
-                })
-        
-        return documents
+        
+        return self._with_scores(results)
+    
+    def search_with_filter_batch(self, queries: List[str], filter_dict: dict, top_k: int = 3) -> List[list]:
+        """Filtered dense search for several queries sharing one filter."""
+        if not queries:
+            return []
+        
+        try:
+            results = self._dense_index().query_batch(self.embed_queries(queries), top_k, where=filter_dict)
+        except Exception as e:
+            logger.warning(f"Error in search_with_filter_batch: {e}")
+            return [[] for _ in queries]
+        
+        return [self._with_scores(docs) for docs in results]
     
     def hybrid_search(
         self, 
         query: str, 
         top_k: int = None,
         dense_weight: float = 0.7,
-        sparse_weight: float = 0.3
+        sparse_weight: float = 0.3,
+        strategy: str = None,
+        topic: str = None
     ) -> List[Dict]:
         """
         Hybrid search combining dense vectors and BM25 sparse retrieval.
         
-        Uses reciprocal rank fusion to combine results.
+        Results are fused by document ID with a strategy from
+        src.rag.fusion (weighted RRF by default; see
+        hybrid_retrieval.fusion in rag_config.yaml).
+        
+        With a topic hint only that topic's partition is scored; the whole
+        corpus is searched instead when the topic has no partition or its
+        best dense score is below hybrid_retrieval.partitions.fallback_min_score.
         
         Args:
             query: Search query
             top_k: Number of results to return
             dense_weight: Weight for dense retrieval (0-1)
             sparse_weight: Weight for sparse retrieval (0-1)
+            strategy: Fusion strategy (rrf, combsum, combmnz, dense, sparse)
+            topic: Topic hint (e.g. the parser's topic)
             
         Returns:
             List of documents ranked by hybrid score
         """
+        logger.info(f"Hybrid search ({strategy or config.FUSION_STRATEGY}, topic: {topic or 'all'}): '{query[:50]}...'")
+        
+        results = self._hybrid_batch([query], top_k, dense_weight, sparse_weight, strategy, topic)[0]
+        
+        logger.info(f"Hybrid search returned {len(results)} results")
+        
+        return results
+    
+    def hybrid_search_batch(
+        self,
+        queries: List[str],
+        top_k: int = None,
+        dense_weight: float = 0.7,
+        sparse_weight: float = 0.3,
+        strategy: str = None,
+        topic: str = None
+    ) -> List[List[Dict]]:
+        """
+        Hybrid search for several queries sharing one topic hint.
+        
+        Queries are encoded in one call, searched with one dense index
+        query and scored with one vectorized BM25 pass.
+        
+        Returns:
+            One result list per query, as ``hybrid_search``
+        """
+        logger.info(f"Hybrid search ({strategy or config.FUSION_STRATEGY}, topic: {topic or 'all'}) for {len(queries)} queries")
+        
+        return self._hybrid_batch(queries, top_k, dense_weight, sparse_weight, strategy, topic)
+    
+    def _hybrid_batch(
+        self,
+        queries: List[str],
+        top_k: int,
+        dense_weight: float,
+        sparse_weight: float,
+        strategy: str,
+        topic: str = None
+    ) -> List[List[Dict]]:
+        """Hybrid results per query, served from the result cache where possible."""
         if top_k is None:
             top_k = config.TOP_K
         
-        logger.info(f"Hybrid search: '{query[:50]}...'")
+        strategy = strategy or config.FUSION_STRATEGY
+        params = (top_k, dense_weight, sparse_weight, strategy, topic and normalize_topic(topic))
+        keys = [(self._collection_key, self.version, normalize_query(query), params) for query in queries]
+        
+        # Callers may annotate results (e.g. rerank scores), so hits are copies
+        results = [_result_cache.get(key) for key in keys]
+        results = [None if docs is None else [dict(doc) for doc in docs] for docs in results]
+        misses = [i for i, docs in enumerate(results) if docs is None]
+        if misses:
+            computed = self._hybrid_uncached([queries[i] for i in misses], top_k, dense_weight, sparse_weight, strategy, topic)
+            for i, docs in zip(misses, computed):
+                # Dense-only stand-ins are not cached: BM25 becoming ready does not bump the version
+                if not any(doc.get('dense_only') for doc in docs):
+                    _result_cache.put(keys[i], [dict(doc) for doc in docs])
+                results[i] = docs
         
-        # 1. Dense retrieval (vector search)
-        dense_results = self.search(query, top_k=top_k * 2)  # Get more for fusion
+        return results
+    
+    def _hybrid_uncached(
+        self,
+        queries: List[str],
+        top_k: int,
+        dense_weight: float,
+        sparse_weight: float,
+        strategy: str,
+        topic: str = None
+    ) -> List[List[Dict]]:
+        partition = self.partitions.resolve(topic) if self.partitions is not None else None
+        
+        # BM25 still being built: serve dense-only results (flagged) instead of waiting.
+        # They are still fused (over dense ranks alone), so hybrid_score keeps its
+        # scale for thresholds and depth cut-offs downstream.
+        retriever = None
+        dense_only = False
+        if strategy != 'dense':
+            retriever = self._bm25_ready()
+            if retriever is not None and partition is not None:
+                retriever = partition.bm25
+            if retriever is None:
+                logger.info("BM25 index is being built; serving dense-only results")
+                dense_only = True
+                if strategy == 'sparse':
+                    strategy = 'dense'
+        
+        # 1. Dense retrieval (vector search); more candidates than needed for fusion
+        dense_results = [[] for _ in queries]
+        if strategy != 'sparse':
+            dense_results = self._dense_batch(queries, top_k * 2, partition)
         
         # 2. Sparse retrieval (BM25)
-        if self.bm25_retriever is None:
-            self._build_bm25_index()
-        
-        sparse_results = self.bm25_retriever.search(query, top_k=top_k * 2)
-        
-        # 3. Reciprocal Rank Fusion (RRF)
-        # RRF score = sum(1 / (k + rank)) for each retrieval method
-        # k = 60 is a common default
-        k = 60
-        
-        # Calculate scores for dense results
-        dense_scores = {}
-        for rank, doc in enumerate(dense_results, 1):
-            doc_text = doc['text']
-            dense_scores[doc_text] = 1.0 / (k + rank)
-        
-        # Calculate scores for sparse results  
-        sparse_scores = {}
-        for rank, (doc, _) in enumerate(sparse_results, 1):
-            doc_text = doc['text']
-            sparse_scores[doc_text] = 1.0 / (k + rank)
-        
-        # Combine scores with weights
-        combined_scores = {}
-        all_docs = {}
-        
-        # Add dense results
-        for doc in dense_results:
-            text = doc['text']
-            all_docs[text] = doc
-            combined_scores[text] = dense_weight * dense_scores.get(text, 0)
-        
-        # Add sparse results
-        for doc, _ in sparse_results:
-            text = doc['text']
-            if text not in all_docs:
-                all_docs[text] = doc
-            combined_scores[text] = combined_scores.get(text, 0) + sparse_weight * sparse_scores.get(text, 0)
-        
-        # Sort by combined score
-        ranked_texts = sorted(
-            combined_scores.keys(),
-            key=lambda x: combined_scores[x],
-            reverse=True
-        )[:top_k]
-        
-        # Build final results
+        sparse_results = [[] for _ in queries]
+        if strategy != 'dense' and not dense_only:
+            sparse_results = retriever.search_batch(queries, top_k=top_k * 2, expander=self.query_expander)
+        
+        # 3. Weak in-topic matches are searched again over the whole corpus
+        fallback = {}
+        if partition is not None:
+            weak = [
+                i for i, (dense_docs, sparse_docs) in enumerate(zip(dense_results, sparse_results))
+                if self._weak_partition_match(dense_docs, sparse_docs, strategy)
+            ]
+            if weak:
+                logger.info(f"Topic '{partition.name}': {len(weak)} of {len(queries)} queries fall back to global search")
+                fallback = dict(zip(weak, self._hybrid_batch(
+                    [queries[i] for i in weak], top_k, dense_weight, sparse_weight, strategy
+                )))
+        
+        # 4. Fuse by document ID; only the final top_k become dicts
         results = []
-        for text in ranked_texts:
-            doc = all_docs[text].copy()
-            doc['hybrid_score'] = combined_scores[text]
-            doc['dense_score'] = dense_scores.get(text, 0)
-            doc['sparse_score'] = sparse_scores.get(text, 0)
-            results.append(doc)
+        for i, (dense_docs, sparse_docs) in enumerate(zip(dense_results, sparse_results)):
+            if i in fallback:
+                results.append(fallback[i])
+                continue
+            
+            dense_hits = [
+                Hit(doc['id'], doc['text'], doc['metadata'], dense_score=doc['score'], dense_rank=rank)
+                for rank, doc in enumerate(dense_docs, 1)
+            ]
+            sparse_hits = [
+                Hit(doc['id'], doc['text'], doc['metadata'], sparse_score=score, sparse_rank=rank)
+                for rank, (doc, score) in enumerate(sparse_docs, 1)
+            ]
+            
+            hits = fuse(dense_hits, sparse_hits, top_k, strategy, dense_weight, sparse_weight)
+            results.append([hit.to_dict() for hit in hits])
         
-        logger.info(f"Hybrid search returned {len(results)} results")
+        if dense_only:
+            for docs in results:
+                for doc in docs:
+                    doc['dense_only'] = True
         
         return results
 
+    def _dense_batch(self, queries: List[str], top_k: int, partition: TopicPartition = None) -> List[list]:
+        """Dense search over the whole corpus or one topic partition."""
+        if partition is None:
+            return self.search_batch(queries, top_k=top_k)
+        
+        embeddings = self.embed_queries(queries)
+        if partition.dense is not None:
+            results = partition.dense.query_batch(embeddings, top_k)
+        else:
+            results = self._dense_index().query_batch(embeddings, top_k, where=partition.where)
+        
+        return [self._with_scores(docs) for docs in results]
+    
+    @staticmethod
+    def _weak_partition_match(dense_docs: list, sparse_docs: list, strategy: str) -> bool:
+        """Whether a partition's results are too weak to trust (no hits, or a low best dense score)."""
+        if strategy == 'sparse':
+            return not sparse_docs
+        
+        return not dense_docs or dense_docs[0]['score'] < config.PARTITION_FALLBACK_SCORE
+    
     def search_diverse(
         self, 
         query: str, 
         top_k: int = 5,
         dense_weight: float = 0.7,
-        sparse_weight: float = 0.3
+        sparse_weight: float = 0.3,
+        topic: str = None,
+        adaptive: bool = None
     ) -> List[Dict]:
         """
         Search for documents and ensure diversity across types (formula, template, example).
         
+        The top ``top_k * diversity.fetch_factor`` hybrid results are
+        reduced to top_k by Maximal Marginal Relevance, with at least
+        diversity.quotas of each type: a type missing from the candidates
+        is filled with its nearest chunks by a type-filtered dense lookup
+        instead of over-fetching.
+        
+        With adaptive depth, the number of results is chosen per query from
+        the scores of the top_k fused candidates (see src.rag.adaptive_depth).
+        When fewer are worth keeping, the over-fetched candidates are dropped
+        before MMR and only that many results are returned.
+        
+        Near-duplicates of a recent query (cosine similarity of at least
+        caching.semantic_cache_threshold) reuse that query's results.
+        
         Args:
             query: Search query
-            top_k: Total number of results to return
+            top_k: Total number of results to return (at most, with adaptive depth)
             dense_weight: Weight for dense retrieval
             sparse_weight: Weight for sparse retrieval
+            topic: Topic hint restricting the search to one partition
+            adaptive: Choose the depth per query (defaults to diversity.adaptive_depth.enabled)
             
         Returns:
             List of diverse documents
         """
-        # 1. Fetch more results initially to insure we have candidates from all categories
-        candidates = self.hybrid_search(
-            query, 
-            top_k=top_k * 3, 
-            dense_weight=dense_weight, 
-            sparse_weight=sparse_weight
-        )
+        return self.search_diverse_batch([query], top_k, dense_weight, sparse_weight, topic, adaptive)[0]
+    
+    def search_diverse_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        dense_weight: float = 0.7,
+        sparse_weight: float = 0.3,
+        topic: str = None,
+        adaptive: bool = None
+    ) -> List[List[Dict]]:
+        """Diverse search for several queries (see ``search_diverse``)."""
+        if adaptive is None:
+            adaptive = config.ADAPTIVE_DEPTH_ENABLED
+        
+        def compute(queries: List[str]) -> List[List[Dict]]:
+            candidates = self.hybrid_search_batch(
+                queries,
+                top_k=self._diverse_fetch(top_k),
+                dense_weight=dense_weight,
+                sparse_weight=sparse_weight,
+                topic=topic
+            )
+            
+            results = []
+            for query, docs in zip(queries, candidates):
+                depth = self._adaptive_depth(docs[:top_k], top_k) if adaptive else top_k
+                if depth < top_k:
+                    # Decisive scores: candidates past the cut-off are not considered
+                    docs = docs[:depth]
+                    logger.info(f"Adaptive depth: {depth} of {top_k} results")
+                results.append(self._diversify(docs + self._quota_fill(query, docs, topic), depth))
+            
+            return results
         
-        if not candidates:
+        if not queries:
             return []
+        
+        return self._semantic_cached(queries, (top_k, dense_weight, sparse_weight, topic, adaptive), compute)
+    
+    def _semantic_cached(self, queries: List[str], params: tuple, compute) -> List[List[Dict]]:
+        """
+        Serve queries close to a recently answered one from the semantic cache.
+        
+        Args:
+            queries: Search queries
+            params: Search parameters the results depend on
+            compute: Function computing results for a list of queries
             
-        # 2. Group by type
-        # We look for: 'formula', 'template_method' (or template_*), 'example_solution'
-        by_type = {
-            'formula': [],
-            'template': [],
-            'example': [],
-            'other': []
-        }
+        Returns:
+            One result list per query
+        """
+        if _semantic_cache.maxsize <= 0:
+            return compute(queries)
+        
+        top_k, dense_weight, sparse_weight, topic, adaptive = params
+        key = (self._collection_key, self.version, top_k, dense_weight, sparse_weight, topic and normalize_topic(topic), adaptive)
+        embeddings = self.embed_queries(queries)
+        
+        # audited: query index -> (cache row, reused results)
+        results, audited = [], {}
+        for i, embedding in enumerate(embeddings):
+            row, reused = _semantic_cache.lookup(embedding, key)
+            if reused is not None and _semantic_cache.should_audit():
+                # Recompute this hit to check the reuse was right
+                audited[i], reused = (row, reused), None
+            results.append(None if reused is None else [dict(doc) for doc in reused])
+        
+        misses = [i for i, docs in enumerate(results) if docs is None]
+        if misses:
+            for i, docs in zip(misses, compute([queries[i] for i in misses])):
+                row = None
+                if i in audited:
+                    row, reused = audited[i]
+                    if _semantic_cache.audit([doc['id'] for doc in reused], [doc['id'] for doc in docs]):
+                        logger.warning(f"Semantic cache reused results for a different query: '{queries[i][:50]}...'")
+                # Dense-only stand-ins are not cached: BM25 becoming ready does not bump the version.
+                # An audited entry is refreshed in place rather than duplicated.
+                if not any(doc.get('dense_only') for doc in docs):
+                    _semantic_cache.put(embeddings[i], key, [dict(doc) for doc in docs], row=row)
+                results[i] = docs
+        
+        return results
+    
+    @staticmethod
+    def _diverse_fetch(top_k: int) -> int:
+        """Fused candidates fetched for diverse search."""
+        return max(top_k, math.ceil(top_k * config.DIVERSITY_FETCH_FACTOR))
+    
+    @staticmethod
+    def _adaptive_depth(candidates: List[Dict], top_k: int) -> int:
+        """Results worth keeping out of the top_k fused candidates."""
+        return choose_depth(
+            [doc.get('hybrid_score') or 0.0 for doc in candidates],
+            # Sparse-only hits have no dense score to hold against the floor
+            [doc.get('dense_score') if doc.get('dense_rank', 1) else None for doc in candidates],
+            min_k=config.ADAPTIVE_DEPTH_MIN_K,
+            max_k=top_k,
+            min_score=config.MIN_SCORE,
+            min_gap=config.ADAPTIVE_DEPTH_MIN_GAP
+        )
+    
+    def _quota_fill(self, query: str, candidates: List[Dict], topic: str = None) -> List[Dict]:
+        """
+        Nearest chunks of each quota type the candidates lack, ranked below every candidate.
         
-        for doc in candidates:
-            dtype = doc.get('metadata', {}).get('type', 'other')
-            if dtype == 'formula':
-                by_type['formula'].append(doc)
-            elif 'template' in dtype:
-                by_type['template'].append(doc)
-            elif 'example' in dtype:
-                by_type['example'].append(doc)
+        Searches the topic's partition when there is one, else the whole corpus.
+        """
+        present = {type_group(doc.get('metadata', {}).get('type')) for doc in candidates}
+        missing = [
+            group for group, count in config.DIVERSITY_QUOTAS.items()
+            if count > 0 and group not in present and group in GROUP_TYPES
+        ]
+        if not missing:
+            return []
+        
+        partition = self.partitions.resolve(topic) if self.partitions is not None else None
+        embedding = self.embed_query(query)
+        floor = min((doc.get('hybrid_score') or 0.0 for doc in candidates), default=0.0)
+        seen = {doc['id'] for doc in candidates}
+        
+        fill = []
+        for group in missing:
+            where = {'type': {'$in': GROUP_TYPES[group]}}
+            if partition is not None and partition.dense is not None:
+                docs = partition.dense.query(embedding, config.DIVERSITY_QUOTAS[group], where=where)
             else:
-                by_type['other'].append(doc)
+                if partition is not None:
+                    where = {'$and': [partition.where, where]}
+                docs = self._dense_index().query(embedding, config.DIVERSITY_QUOTAS[group], where=where)
+            
+            for rank, doc in enumerate(self._with_scores(docs), 1):
+                if doc['id'] not in seen:
+                    seen.add(doc['id'])
+                    hit = Hit(doc['id'], doc['text'], doc['metadata'], dense_score=doc['score'], dense_rank=rank)
+                    hit.score = floor
+                    fill.append(hit.to_dict())
+        
+        return fill
+    
+    def merge_neighbours(self, docs: List[Dict]) -> List[Dict]:
+        """
+        Join retrieved parts of one split section back into a single result.
         
-        # 3. Select at least one of each (if available)
-        diverse_results = []
-        seen_texts = set()
+        Only sections with several parts among the results are merged: the
+        parts from the first to the last one retrieved (fetching any in
+        between) become one result, in place of the best-ranked part.
         
-        # Priority 1: Top Formula
-        if by_type['formula']:
-            doc = by_type['formula'][0]
-            diverse_results.append(doc)
-            seen_texts.add(doc['text'])
+        Args:
+            docs: Search results, best first
             
-        # Priority 2: Top Template
-        if by_type['template']:
-            doc = by_type['template'][0]
-            diverse_results.append(doc)
-            seen_texts.add(doc['text'])
+        Returns:
+            Results with the parts of each section merged
+        """
+        parts_by_parent = defaultdict(list)
+        for doc in docs:
+            parent_id = doc.get('metadata', {}).get('parent_id')
+            if parent_id:
+                parts_by_parent[parent_id].append(doc)
+        
+        merged, absorbed = {}, set()
+        for parent_id, parts in parts_by_parent.items():
+            if len(parts) < 2:
+                continue
             
-        # Priority 3: Top Example
-        if by_type['example']:
-            doc = by_type['example'][0]
-            diverse_results.append(doc)
-            seen_texts.add(doc['text'])
+            numbers = [doc['metadata']['part'] for doc in parts]
+            first, last = min(numbers), max(numbers)
+            span = {doc['metadata']['part']: doc for doc in parts}
+            if len(span) < last - first + 1:
+                # Any vector will do: the filter selects the section's parts
+                embedding = self._candidate_vectors(parts[:1])[0]
+                siblings = self._dense_index().query(embedding, parts[0]['metadata']['parts'], where={'parent_id': parent_id})
+                for doc in siblings:
+                    span.setdefault(doc['metadata']['part'], doc)
             
-        # 4. Fill remaining slots with the best remaining candidates regardless of type
-        # Sort remaining candidates by their hybrid score
-        remaining = [c for c in candidates if c['text'] not in seen_texts]
-        
-        # Already sorted by hybrid_score from hybrid_search call
-        for doc in remaining:
-            if len(diverse_results) >= top_k:
-                break
-            diverse_results.append(doc)
+            if not all(number in span for number in range(first, last + 1)):
+                continue
             
+            best = parts[0]
+            merged[id(best)] = {
+                **best,
+                'text': join_parts([span[number] for number in range(first, last + 1)]),
+                'metadata': {**best['metadata'], 'part': first, 'merged_parts': last - first + 1}
+            }
+            absorbed.update(id(doc) for doc in parts[1:])
+        
+        if merged:
+            logger.info(f"Merged the parts of {len(merged)} split sections")
+        
+        return [merged.get(id(doc), doc) for doc in docs if id(doc) not in absorbed]
+    
+    def _candidate_vectors(self, candidates: List[Dict]) -> np.ndarray:
+        """Normalized embeddings of result documents (stored ones when available, else re-encoded)."""
+        ids = [doc['id'] for doc in candidates]
+        vectors = None
+        if self.exact_index is not None:
+            try:
+                vectors = self.exact_index.vectors(ids)
+            except KeyError:
+                pass
+        if vectors is None:
+            vectors = self.backend.vectors(ids)
+        if vectors is None:
+            vectors = np.asarray(self.embedder.encode([doc['text'] for doc in candidates]), dtype=np.float32)
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    
+    def _diversify(self, candidates: List[Dict], top_k: int) -> List[Dict]:
+        """Pick top_k candidates by MMR, meeting the per-type quotas where possible."""
+        if not candidates:
+            return []
+        
+        # Fused scores scaled to [0, 1] as MMR relevance
+        scores = np.array([doc.get('hybrid_score') or 0.0 for doc in candidates], dtype=np.float32)
+        span = scores.max() - scores.min()
+        relevance = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+        
+        picks = mmr_select(
+            relevance,
+            self._candidate_vectors(candidates),
+            top_k,
+            lambda_mult=config.DIVERSITY_LAMBDA,
+            groups=[type_group(doc.get('metadata', {}).get('type')) for doc in candidates],
+            quotas=config.DIVERSITY_QUOTAS
+        )
+        diverse_results = [candidates[i] for i in picks]
+        
         logger.info(f"Diverse search returned {len(diverse_results)} results across {len(set(d['metadata'].get('type') for d in diverse_results))} categories")
         
         return diverse_results
     
-    def _build_bm25_index(self):
-        """Build BM25 index from all documents in collection."""
+    @staticmethod
+    def _fingerprint(ids: list) -> str:
+        ids = sorted(ids)
+        digest = hashlib.sha1("\n".join(ids).encode("utf-8")).hexdigest()
+        return f"{len(ids)}:{digest}"
+    
+    def collection_fingerprint(self) -> str:
+        """
+        Fingerprint of the collection contents.
+        
+        Chunk IDs are content hashes, so the sorted ID list identifies the
+        exact set of documents.
+        """
+        return self._fingerprint(self.backend.ids())
+    
+    def bm25_in_sync(self) -> bool:
+        """Whether the BM25 index is built and holds exactly the collection's documents."""
+        retriever = self.bm25_retriever
+        return retriever is not None and self._fingerprint(retriever.ids()) == self.collection_fingerprint()
+    
+    def _load_bm25_index(self):
+        """Load the persisted BM25 index if it matches the current collection."""
+        # Already loaded or built by another store on this collection
+        if self.bm25_in_sync():
+            self._attach_partition_bm25()
+            return
+        
+        saved = BM25Retriever.read_fingerprint(self.bm25_path)
+        if saved is None:
+            return
+        
+        if saved != self.collection_fingerprint():
+            logger.info("Persisted BM25 index is stale; it will be rebuilt")
+            return
+        
+        try:
+            retriever = BM25Retriever.load(self.bm25_path)
+            logger.info(f"Loaded BM25 index with {len(retriever.documents)} documents")
+        except Exception as e:
+            logger.warning(f"Could not load BM25 index, will rebuild: {e}")
+            return
+        
+        if self.partitions is not None and not self.partitions.load_bm25(self.partitions_bm25_path, self._fingerprint):
+            self.partitions.build_bm25(retriever.documents)
+        self.bm25_retriever = retriever
+    
+    def _attach_partition_bm25(self):
+        """Give this store's topic partitions the BM25 sub-indexes built by another store on the collection."""
+        if self.partitions is None or self.partitions.bm25_built:
+            return
+        
+        retriever = self.bm25_retriever
+        if retriever is not None and not self.partitions.attach_bm25(self._bm25.partitions or {}):
+            # Partitions differ from the building store's: build them from the shared documents
+            self.partitions.build_bm25(retriever.documents)
+    
+    def _bm25_ready(self) -> Optional[BM25Retriever]:
+        """
+        The BM25 index, or None while it is being built in the background.
+        
+        Without background builds the index is built here, once: concurrent
+        callers wait for the same build instead of starting their own.
+        """
+        retriever = self.bm25_retriever
+        if retriever is not None:
+            self._attach_partition_bm25()
+            return retriever
+        
+        if self.background_bm25:
+            self.start_bm25_build()
+            return None
+        
+        with self._bm25.build_lock:
+            if self.bm25_retriever is None:
+                self._build_bm25()
+        return self.bm25_retriever
+    
+    def start_bm25_build(self) -> bool:
+        """
+        Start building the BM25 index on a background thread.
+        
+        Returns:
+            False if a build of this collection is already running (from any store)
+        """
+        with self._bm25.thread_lock:
+            if self._bm25.thread is not None and self._bm25.thread.is_alive():
+                return False
+            
+            self._bm25.thread = threading.Thread(target=self._run_bm25_build, name="bm25-build", daemon=True)
+            self._bm25.thread.start()
+            return True
+    
+    def wait_for_bm25(self, timeout: float = None) -> bool:
+        """
+        Wait for a running background BM25 build.
+        
+        Returns:
+            True if the BM25 index is ready
+        """
+        thread = self._bm25.thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.bm25_retriever is not None
+    
+    def _run_bm25_build(self):
+        try:
+            while True:
+                version = self.version
+                with self._bm25.build_lock:
+                    self._build_bm25()
+                if self.version == version:
+                    break
+                logger.info("Collection changed during the BM25 build; rebuilding")
+        except Exception as e:
+            logger.error(f"Background BM25 build failed: {e}")
+    
+    def build_bm25_index(self, persist: bool = True):
+        """Build BM25 index from all documents in collection and save it to disk (blocks until built)."""
+        with self._bm25.build_lock:
+            self._build_bm25(persist)
+    
+    def _build_bm25(self, persist: bool = True):
         logger.info("Building BM25 index...")
         
-        # Get all documents from ChromaDB
-        all_results = self.collection.get()
+        # Get all documents from the vector store
+        all_results = self.backend.get()
         
         documents = [
-            {'text': doc, 'metadata': meta}
-            for doc, meta in zip(all_results['documents'], all_results['metadatas'])
+            {'id': doc_id, 'text': doc, 'metadata': meta}
+            for doc_id, doc, meta in zip(all_results['ids'], all_results['documents'], all_results['metadatas'])
         ]
         
-        # Import here to avoid circular dependency
-        from src.rag.bm25_retriever import BM25Retriever
-        self.bm25_retriever = BM25Retriever(documents)
+        retriever = BM25Retriever(documents)
+        if self.partitions is not None:
+            self.partitions.build_bm25(documents)
+        
+        # Swapped in only when complete: queries never see a partial index
+        self.bm25_retriever = retriever
+        
+        if persist and documents:
+            self.save_bm25_index()
         
         logger.info(f"BM25 index built with {len(documents)} documents")
@@ -53,11 +53,70 @@ class Config:
         self.TOP_K = int(self._get("hybrid_retrieval.top_k", "TOP_K_RETRIEVAL", "5"))
         self.CHUNK_SIZE = int(self._get("knowledge_base.chunk_size", "CHUNK_SIZE", "512"))
         self.CHUNK_OVERLAP = int(self._get("knowledge_base.chunk_overlap", "CHUNK_OVERLAP", "50"))
+        self.INGEST_BATCH_SIZE = int(self._get("knowledge_base.ingest_batch_size", "INGEST_BATCH_SIZE", "256"))
+        self.BM25_K1 = float(self._get("hybrid_retrieval.bm25.k1", "BM25_K1", "1.5"))
+        self.BM25_B = float(self._get("hybrid_retrieval.bm25.b", "BM25_B", "0.75"))
+        self.BM25_BACKGROUND_BUILD = self._get_bool("hybrid_retrieval.bm25.background_build", "BM25_BACKGROUND_BUILD", True)
         self.BM25_WEIGHT = float(self._get("hybrid_retrieval.bm25.weight", "BM25_WEIGHT", "0.3"))
         self.DENSE_WEIGHT = float(self._get("hybrid_retrieval.dense.weight", "DENSE_WEIGHT", "0.7"))
+        self.FUSION_STRATEGY = self._get("hybrid_retrieval.fusion.strategy", "FUSION_STRATEGY", "rrf")
+        self.RRF_K = int(self._get("hybrid_retrieval.fusion.rrf_k", "RRF_K", "60"))
+        self.TOPIC_PARTITIONS_ENABLED = self._get_bool("hybrid_retrieval.partitions.enabled", "TOPIC_PARTITIONS_ENABLED", True)
+        self.PARTITION_FALLBACK_SCORE = float(self._get("hybrid_retrieval.partitions.fallback_min_score", "PARTITION_FALLBACK_SCORE", "0.3"))
+        self.TOPIC_ALIASES = self._get_from_yaml("hybrid_retrieval.partitions.aliases") or {}
+        self.QUERY_EMBEDDING_CACHE_SIZE = int(self._get("caching.query_embedding_cache_size", "QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+        self.DIVERSITY_LAMBDA = float(self._get("diversity.lambda", "DIVERSITY_LAMBDA", "0.7"))
+        self.DIVERSITY_FETCH_FACTOR = float(self._get("diversity.fetch_factor", "DIVERSITY_FETCH_FACTOR", "1.5"))
+        self.DIVERSITY_QUOTAS = self._get_from_yaml("diversity.quotas") or {"formula": 1, "template": 1, "example": 1}
+        self.MIN_SCORE = float(self._get("hybrid_retrieval.min_score", "MIN_SCORE", "0.3"))
+        self.ADAPTIVE_DEPTH_ENABLED = self._get_bool("diversity.adaptive_depth.enabled", "ADAPTIVE_DEPTH_ENABLED", True)
+        self.ADAPTIVE_DEPTH_MIN_K = int(self._get("diversity.adaptive_depth.min_k", "ADAPTIVE_DEPTH_MIN_K", "3"))
+        self.ADAPTIVE_DEPTH_MIN_GAP = float(self._get("diversity.adaptive_depth.min_gap", "ADAPTIVE_DEPTH_MIN_GAP", "0.25"))
+        self.RESULT_CACHE_SIZE = int(self._get("caching.result_cache_size", "RESULT_CACHE_SIZE", "512"))
+        self.RESULT_CACHE_TTL = float(self._get("caching.result_cache_ttl_seconds", "RESULT_CACHE_TTL", "600"))
+        self.SEMANTIC_CACHE_SIZE = int(self._get("caching.semantic_cache_size", "SEMANTIC_CACHE_SIZE", "256"))
+        self.SEMANTIC_CACHE_THRESHOLD = float(self._get("caching.semantic_cache_threshold", "SEMANTIC_CACHE_THRESHOLD", "0.97"))
+        self.SEMANTIC_CACHE_AUDIT_EVERY = int(self._get("caching.semantic_cache_audit_every", "SEMANTIC_CACHE_AUDIT_EVERY", "20"))
+        
+        # Query expansion
+        self.QUERY_EXPANSION_ENABLED = self._get_bool("query_expansion.enabled", "QUERY_EXPANSION_ENABLED", False)
+        self.QUERY_EXPANSION_MAX_SYNONYMS = int(self._get("query_expansion.max_synonyms", "QUERY_EXPANSION_MAX_SYNONYMS", "3"))
+        self.QUERY_EXPANSION_USE_SEMANTIC_MEMORY = self._get_bool("query_expansion.use_semantic_memory", "QUERY_EXPANSION_USE_SEMANTIC_MEMORY", True)
+        self.QUERY_EXPANSION_SYNONYM_WEIGHT = float(self._get("query_expansion.synonym_weight", "QUERY_EXPANSION_SYNONYM_WEIGHT", "0.5"))
+        self.QUERY_EXPANSION_CONCEPT_WEIGHT = float(self._get("query_expansion.concept_weight", "QUERY_EXPANSION_CONCEPT_WEIGHT", "0.25"))
+        
+        # Context packing
+        self.CONTEXT_PACKING_ENABLED = self._get_bool("context_packing.enabled", "CONTEXT_PACKING_ENABLED", True)
+        self.CONTEXT_BUDGETS = {
+            "knowledge": 1500, "memory": 400, "web": 800, "tool": 300,
+            **(self._get_from_yaml("context_packing.budgets") or {})
+        }
+        self.CONTEXT_OVERLAP_THRESHOLD = float(self._get("context_packing.overlap_threshold", "CONTEXT_OVERLAP_THRESHOLD", "0.8"))
+        self.CONTEXT_EXAMPLE_MAX_TOKENS = int(self._get("context_packing.example_max_tokens", "CONTEXT_EXAMPLE_MAX_TOKENS", "350"))
+        
+        # Reranking
+        self.RERANK_ENABLED = self._get_bool("reranking.enabled", "RERANK_ENABLED", False)
+        self.RERANK_MODEL = self._get("reranking.model", "RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.RERANK_TOP_N = int(self._get("reranking.top_n", "RERANK_TOP_N", "3"))
+        self.RERANK_BUDGET_MS = float(self._get("reranking.budget_ms", "RERANK_BUDGET_MS", "300"))
+        self.RERANK_CACHE_SIZE = int(self._get("reranking.cache_size", "RERANK_CACHE_SIZE", "4096"))
+        
+        # Vector store backend
+        self.VECTOR_STORE_TYPE = self._get("vector_store.type", "VECTOR_STORE_TYPE", "chromadb")
+        self.FAISS_INDEX_TYPE = self._get("vector_store.index_type", "FAISS_INDEX_TYPE", "IVFFlat")
+        self.FAISS_NLIST = int(self._get("vector_store.nlist", "FAISS_NLIST", "100"))
+        self.FAISS_NPROBE = int(self._get("vector_store.nprobe", "FAISS_NPROBE", "10"))
+        self.VECTOR_STORE_METRIC = self._get("vector_store.distance_metric", "VECTOR_STORE_METRIC", "cosine")
+        self.EXACT_SEARCH_MAX_DOCS = int(self._get("vector_store.exact_search_max_docs", "EXACT_SEARCH_MAX_DOCS", "20000"))
+        
+        # Vector store persistence
+        self.VECTOR_STORE_AUTO_SAVE = self._get_bool("vector_store.auto_save", "VECTOR_STORE_AUTO_SAVE", True)
+        self.VECTOR_STORE_SAVE_FREQUENCY = int(self._get("vector_store.save_frequency", "VECTOR_STORE_SAVE_FREQUENCY", "100"))
         
         # Memory
         self.MEMORY_COLLECTION = self._get("memory.collection_name", "MEMORY_COLLECTION_NAME", "math_solutions")
+        self.MEMORY_INDEX = self._get("memory.index", "MEMORY_INDEX", "chromadb")
+        self.MEMORY_RESCORE_FACTOR = int(self._get("memory.rescore_factor", "MEMORY_RESCORE_FACTOR", "10"))
         
         # HITL Configuration
         self.HITL_ENABLED = self._get_bool("hitl.enabled", "HITL_ENABLED", True)
@@ -65,6 +124,14 @@ class Config:
         
         # Embedding Model
         self.EMBEDDING_MODEL = self._get("embeddings.model", "EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        self.EMBEDDING_BACKEND = self._get("embeddings.backend", "EMBEDDING_BACKEND", "torch")
+        self.EMBEDDING_ONNX_QUANTIZATION = self._get("embeddings.onnx_quantization", "EMBEDDING_ONNX_QUANTIZATION", "avx2")
+        self.EMBEDDING_ONNX_PATH = self._get("embeddings.onnx_path", "EMBEDDING_ONNX_PATH", "./data/onnx_models")
+        self.EMBEDDING_BATCH_SIZE = int(self._get("embeddings.batch_size", "EMBEDDING_BATCH_SIZE", "32"))
+        self.EMBEDDING_NORMALIZE = self._get_bool("embeddings.normalize", "EMBEDDING_NORMALIZE", True)
+        self.EMBEDDING_MAX_WAIT_MS = float(self._get("embeddings.max_wait_ms", "EMBEDDING_MAX_WAIT_MS", "5"))
+        self.EMBEDDING_CACHE_ENABLED = self._get_bool("embeddings.cache_enabled", "EMBEDDING_CACHE_ENABLED", True)
+        self.EMBEDDING_CACHE_PATH = self._get("embeddings.cache_path", "EMBEDDING_CACHE_PATH", "./data/embedding_cache")
         
     def _load_yaml_configs(self):
         """Load all YAML configuration files."""
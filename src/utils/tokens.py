@@ -0,0 +1,92 @@
+"""Prompt token counting."""
+import math
+import re
+import threading
+from typing import List
+
+# Words and numbers, or single non-space symbols (LaTeX and math notation are symbol-heavy)
+_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken's cl100k_base (close to the Llama 3 BPE) if installed and loadable, else None."""
+    global _encoding, _encoding_loaded
+
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    _encoding = None
+                _encoding_loaded = True
+
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate BPE token count without a tokenizer.
+
+    Letters count one token per four characters (at least one per word),
+    digit runs one per three digits, and every other non-space character
+    one token.
+    """
+    count = 0
+    for piece in _PIECES.findall(text):
+        if piece[0].isalpha():
+            count += max(1, math.ceil(len(piece) / 4))
+        elif piece[0].isdigit():
+            count += math.ceil(len(piece) / 3)
+        else:
+            count += 1
+    return count
+
+
+def count_tokens(text: str) -> int:
+    """
+    Number of prompt tokens in text.
+
+    Uses tiktoken when available, otherwise ``estimate_tokens``.
+    """
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Longest prefix of whole lines within max_tokens.
+
+    A first line longer than the budget is cut at a word boundary.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    kept: List[str] = []
+    used = 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1  # Newline
+        if used + cost > max_tokens:
+            if not kept:
+                # Shrink proportionally to the overshoot until the words fit
+                words = line.split()
+                while words and count_tokens(" ".join(words)) > max_tokens:
+                    words = words[:len(words) * max_tokens // count_tokens(" ".join(words))]
+                kept.append(" ".join(words))
+            break
+        kept.append(line)
+        used += cost
+
+    return "\n".join(kept).rstrip()